@@ -1,7 +1,7 @@
 import os
 import logging
 import pathlib
-from flask import Flask, jsonify, request, current_app, send_from_directory
+from flask import Flask, jsonify, request, current_app
 from flask_cors import CORS
 from config import config
 from models import db
@@ -10,6 +10,12 @@ from sqlalchemy import text
 from flask_migrate import Migrate
 from routes.pipeline_routes import pipeline_bp
 from routes.quote_routes import quote_bp
+from utils.pipeline_summary import rebuild_pipeline_summary_command
+from utils.pipeline_events import prune_pipeline_events_command
+from utils.pdf_cache import gc_quote_pdfs_command, send_stored_file
+from utils.storage import verify_uploads_command
+from utils.ingestion import ingest_uploads_command
+from utils.json_provider import FastJSONProvider
 
 migrate = Migrate()
 
@@ -42,6 +48,7 @@ def create_app(config_name='default'):
     """
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_object(config[config_name])
+    app.json = FastJSONProvider(app)
 
     app.config['UPLOAD_FOLDER'] = os.path.join(app.instance_path, 'uploads')
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -68,6 +75,13 @@ def create_app(config_name='default'):
     app.register_blueprint(pipeline_bp)
     app.register_blueprint(quote_bp)  
     
+    # CLI commands
+    app.cli.add_command(rebuild_pipeline_summary_command)
+    app.cli.add_command(prune_pipeline_events_command)
+    app.cli.add_command(gc_quote_pdfs_command)
+    app.cli.add_command(verify_uploads_command)
+    app.cli.add_command(ingest_uploads_command)
+    
     # Create database tables
     with app.app_context():
         try:
@@ -144,8 +158,7 @@ def create_app(config_name='default'):
     
     @app.route('/uploads/<filename>')
     def serve_uploaded_pdf(filename):
-        upload_folder = os.path.join(app.instance_path, 'uploads')
-        return send_from_directory(upload_folder, filename)
+        return send_stored_file(filename)
 
     return app
 
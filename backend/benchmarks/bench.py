@@ -0,0 +1,434 @@
+"""
+Micro-benchmarks for the backend hot paths
+
+Run from the backend directory:
+
+    python -m benchmarks.bench                       # run and write benchmarks/baseline.json
+    python -m benchmarks.bench --output new.json     # run and write elsewhere
+    python -m benchmarks.bench --compare benchmarks/baseline.json --threshold 0.15
+    python -m benchmarks.bench --only calculate_quote --scales 10 1000
+
+Inputs are synthetic and seeded, so runs on the same machine are comparable.
+The committed benchmarks/baseline.json is a reference run of the suite as
+first added, before the optimizations it measures; timings are machine
+specific, so regenerate it at that commit on your own machine for a strict
+comparison. Benchmarks missing from the baseline are reported as new.
+Each benchmark is timed as the median per-call time over several repeats.
+Compare mode exits with status 1 when any benchmark is slower than the
+baseline by more than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+from flask import Flask
+
+from models import PricingForm, ProjectPipeline
+from utils.quote_calculator import (
+    calculate_quote, calculate_quotes_batch, calculate_database_cost,
+    calculate_integration_cost, calculate_data_file_cost
+)
+from utils.validators import PricingFormSchema, pricing_form_validator, validate_form_data
+
+SCALES = (10, 1000, 100000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+BENCHMARKS = []
+
+
+def benchmark(name, scales=SCALES):
+    """
+    Register a benchmark
+
+    The decorated function takes a scale and returns the zero-argument
+    callable to time, so input construction stays out of the measurement.
+    """
+    def register(setup):
+        BENCHMARKS.append((name, scales, setup))
+        return setup
+    return register
+
+
+# Synthetic inputs
+
+def make_calculation_input(scale, seed=0):
+    rng = random.Random(seed)
+    tiers = [500, 5000, 50000, 500000, 5000000, 50000000]
+    per_source = max(1, scale // 10)
+    return {
+        'num_dashboards': 3,
+        'num_widgets': 25,
+        'drilldowns_per_widget': 2,
+        'data_sources': [
+            {'type': rng.choice(['csv', 'json', 'xlsx', 'pdf']), 'size_mb': 20.0 / scale}
+            for _ in range(scale)
+        ],
+        'database_sources': [
+            {'type': 'PostgreSQL', 'tables_info': [
+                {'record_count': rng.choice(tiers)} for _ in range(per_source)
+            ]}
+            for _ in range(max(1, scale // per_source))
+        ],
+        'integrations': [
+            {'db_tables': [{'record_count': rng.choice(tiers)}]} for _ in range(scale)
+        ],
+        'include_logo': True,
+        'widget_brand_color': True,
+        'localize_headings': True,
+        'support_plan': 'priority',
+        'support_hours': 12,
+        'bi_developer_level': 'mid',
+        'bi_dev_months': 3
+    }
+
+
+def make_form_data(scale, seed=0):
+    rng = random.Random(seed)
+    return {
+        'pricing_analyst_name': 'pricing analyst',
+        'client_name': 'Benchmark Client',
+        'client_type': 'B2B',
+        'industry_sector': 'Retail',
+        'company_size': 250,
+        'country': 'Germany',
+        'email': 'analyst@example.com',
+        'project_title': 'Benchmark Project',
+        'subscription_plan': 'Enterprise Growth (Monthly)',
+        'number_of_widgets': 25,
+        'number_of_integrations': 3,
+        'expected_deliverables': [
+            {'type': 'Dashboard', 'quantity': rng.randint(1, 5), 'widgets': rng.randint(1, 20)}
+            for _ in range(scale)
+        ],
+        'data_sources': [rng.choice(['CSV', 'JSON', 'Excel', 'API']) for _ in range(scale)],
+        'databases': [rng.choice(['MySQL', 'PostgreSQL', 'Snowflake']) for _ in range(scale)],
+        'customization_needs': ['Branding', 'Custom Colors'],
+        'interactivity_needed': ['Filtering', 'Drill-down'],
+        'support_plan_required': 'Priority',
+        'start_date': '2026-01-01',
+        'end_date': '2026-06-30'
+    }
+
+
+def make_pricing_form(scale, seed=0):
+    data = make_form_data(scale, seed)
+    form = PricingForm.from_dict(data)
+    form.id = 1
+    form.created_at = form.updated_at = datetime(2026, 1, 1)
+    return form
+
+
+def make_quote_data(client_name='Benchmark Client', project_title='Benchmark Project'):
+    quote = calculate_quote(make_calculation_input(10))
+    return {
+        'total': quote['total'],
+        'breakdown': quote['breakdown'],
+        'valid_until': quote['valid_until'],
+        'client_name': client_name,
+        'project_title': project_title,
+        'form_data': {'client_name': client_name, 'project_title': project_title}
+    }
+
+
+# Quote engine
+
+@benchmark('calculate_quote')
+def bench_calculate_quote(scale):
+    data = make_calculation_input(scale)
+    return lambda: calculate_quote(data)
+
+
+@benchmark('calculate_quotes_batch')
+def bench_calculate_quotes_batch(scale):
+    forms = [make_calculation_input(10, seed) for seed in range(scale)]
+    return lambda: calculate_quotes_batch(forms)
+
+
+@benchmark('calculate_database_cost')
+def bench_calculate_database_cost(scale):
+    sources = make_calculation_input(scale)['database_sources']
+    return lambda: calculate_database_cost(sources)
+
+
+@benchmark('calculate_integration_cost')
+def bench_calculate_integration_cost(scale):
+    integrations = make_calculation_input(scale)['integrations']
+    return lambda: calculate_integration_cost(integrations)
+
+
+@benchmark('calculate_data_file_cost')
+def bench_calculate_data_file_cost(scale):
+    files = make_calculation_input(scale)['data_sources']
+    return lambda: calculate_data_file_cost(files)
+
+
+# Validation
+
+@benchmark('validate_form_data')
+def bench_validate_form_data(scale):
+    data = make_form_data(scale)
+    return lambda: validate_form_data(dict(data))
+
+
+@benchmark('validate_form_data[marshmallow]')
+def bench_validate_form_data_marshmallow(scale):
+    """The same validation through a PricingFormSchema built per call, for comparison"""
+    data = make_form_data(scale)
+    return lambda: validate_form_data(dict(data), compiled=False)
+
+
+@benchmark('CompiledSchema.load')
+def bench_compiled_schema_load(scale):
+    data = make_form_data(scale)
+    context = {'start_date': data['start_date']}
+    return lambda: pricing_form_validator.load(dict(data), context)
+
+
+@benchmark('PricingFormSchema.load')
+def bench_schema_load(scale):
+    data = make_form_data(scale)
+    schema = PricingFormSchema(context={'start_date': data['start_date']})
+    return lambda: schema.load(dict(data))
+
+
+# Models
+
+@benchmark('PricingForm.to_dict')
+def bench_form_to_dict(scale):
+    form = make_pricing_form(scale)
+    return form.to_dict
+
+
+@benchmark('PricingForm.from_dict')
+def bench_form_from_dict(scale):
+    data = make_form_data(scale)
+    return lambda: PricingForm.from_dict(data)
+
+
+@benchmark('ProjectPipeline.to_dict')
+def bench_pipeline_to_dict(scale):
+    item = ProjectPipeline(
+        id=1, form_id=1, current_stage='Quote Generated',
+        created_at=datetime(2026, 1, 1), updated_at=datetime(2026, 1, 2),
+        quote_amount=1000.0
+    )
+    item.pricing_form = make_pricing_form(scale)
+    return item.to_dict
+
+
+# JSON responses
+
+def make_forms_page(scale):
+    return {'forms': [make_pricing_form(10, seed=i).to_dict() for i in range(scale)], 'total': scale}
+
+
+@benchmark('DefaultJSONProvider.dumps[forms]', scales=(10, 1000))
+def bench_default_json_provider(scale):
+    from flask.json.provider import DefaultJSONProvider
+    provider = DefaultJSONProvider(Flask('benchmarks'))
+    page = make_forms_page(scale)
+    return lambda: provider.dumps(page)
+
+
+@benchmark('FastJSONProvider.dumps[forms]', scales=(10, 1000))
+def bench_fast_json_provider(scale):
+    from utils.json_provider import FastJSONProvider
+    provider = FastJSONProvider(Flask('benchmarks'))
+    page = make_forms_page(scale)
+    return lambda: provider.dumps(page)
+
+
+# PDF rendering
+
+def _pdf_app():
+    """Minimal app for the PDF renderers: upload storage, its index and the quote routes for url_for"""
+    from models import db
+    from routes.quote_routes import quote_bp
+    root = tempfile.mkdtemp(prefix='quote-bench-')
+    app = Flask('benchmarks', root_path=root)
+    app.config['UPLOAD_FOLDER'] = os.path.join(root, 'uploads')
+    app.config['SERVER_NAME'] = 'localhost'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    app.register_blueprint(quote_bp)
+    return app
+
+
+@benchmark('pdf_generator.render_pdf[quote]', scales=(1,))
+def bench_render_quote_layout(scale):
+    from utils.pdf_generator import render_pdf
+    path = os.path.join(tempfile.mkdtemp(prefix='quote-bench-'), 'quote.pdf')
+    quote = make_quote_data()
+    return lambda: render_pdf('quote', quote, path)
+
+
+@benchmark('pdf_generator.render_pdf[project_quote]', scales=(1,))
+def bench_render_project_quote_layout(scale):
+    from utils.pdf_generator import render_pdf
+    path = os.path.join(tempfile.mkdtemp(prefix='quote-bench-'), 'quote.pdf')
+    quote = make_quote_data()
+    return lambda: render_pdf('project_quote', quote, path)
+
+
+@benchmark('pdf_generator.render_pdf[quote, cold template]', scales=(1,))
+def bench_render_quote_cold_template(scale):
+    """Every static cell laid out again, i.e. the per-render cost without the template cache"""
+    from utils.pdf_generator import TEMPLATE, render_pdf
+    path = os.path.join(tempfile.mkdtemp(prefix='quote-bench-'), 'quote.pdf')
+    quote = make_quote_data()
+
+    def render():
+        TEMPLATE.clear()
+        return render_pdf('quote', quote, path)
+    return render
+
+
+# The generate_* wrappers below are content-addressed, so after the first
+# call they measure the cache-hit path (hash + stat), not a render.
+
+@benchmark('pdf_generator.generate_quote_pdf', scales=(1,))
+def bench_utils_pdf(scale):
+    from utils.pdf_generator import generate_quote_pdf
+    app = _pdf_app()
+    quote = make_quote_data()
+
+    def render():
+        with app.app_context():
+            return generate_quote_pdf(dict(quote))
+    return render
+
+
+@benchmark('quote_routes.generate_quote_pdf', scales=(1,))
+def bench_routes_pdf(scale):
+    from routes.quote_routes import generate_quote_pdf
+    app = _pdf_app()
+    quote = make_quote_data()
+
+    def render():
+        with app.app_context():
+            return generate_quote_pdf(dict(quote))
+    return render
+
+
+# Runner
+
+def time_callable(fn, repeat, min_time):
+    """Return per-call timings for `repeat` runs of enough loops to last min_time"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter() - start) / loops)
+    return loops, timings
+
+
+def run(only=None, scales=None, repeat=5, min_time=0.1):
+    results = {}
+    for name, bench_scales, setup in BENCHMARKS:
+        if only and not any(o in name for o in only):
+            continue
+        for scale in bench_scales:
+            if scales and len(bench_scales) > 1 and scale not in scales:
+                continue
+            key = f"{name}[{scale}]"
+            fn = setup(scale)
+            loops, timings = time_callable(fn, repeat, min_time)
+            results[key] = {
+                'scale': scale,
+                'loops': loops,
+                'repeat': repeat,
+                'min': min(timings),
+                'median': statistics.median(timings),
+                'mean': statistics.fmean(timings)
+            }
+            print(f"{key:<48} {format_seconds(results[key]['median']):>12}  ({loops} loops x {repeat})")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table and return the names of regressed benchmarks"""
+    regressions = []
+    print(f"\n{'benchmark':<48} {'baseline':>12} {'current':>12} {'change':>9}")
+    for key, result in results.items():
+        base = baseline.get('results', {}).get(key)
+        if not base:
+            print(f"{key:<48} {'-':>12} {format_seconds(result['median']):>12} {'new':>9}")
+            continue
+        change = result['median'] / base['median'] - 1 if base['median'] else 0.0
+        flag = ''
+        if change > threshold:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print(f"{key:<48} {format_seconds(base['median']):>12} "
+              f"{format_seconds(result['median']):>12} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def format_seconds(seconds):
+    for unit, factor in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * factor >= 1:
+            return f"{seconds * factor:.3f} {unit}"
+    return f"{seconds * 1e9:.1f} ns"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help=f"where to write results (default {DEFAULT_BASELINE} unless comparing)")
+    parser.add_argument('--compare', metavar='BASELINE', help="compare against a stored baseline")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="relative slowdown flagged as a regression (default 0.10)")
+    parser.add_argument('--only', nargs='+', help="run benchmarks whose name contains any of these")
+    parser.add_argument('--scales', nargs='+', type=int, help=f"subset of {SCALES}")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.1, help="seconds per repeat")
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter('ignore')  # fpdf font substitution notices
+    results = run(args.only, args.scales, args.repeat, args.min_time)
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+
+    output = args.output or (None if args.compare else DEFAULT_BASELINE)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"\nWrote {len(results)} results to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
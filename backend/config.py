@@ -26,6 +26,51 @@ class Config:
     RATELIMIT_DEFAULT = "100 per day;30 per hour;5 per minute"
     RATELIMIT_STORAGE_URI = "memory://"
 
+    # Pipeline server-sent events
+    PIPELINE_EVENTS_POLL_SECONDS = float(os.environ.get('PIPELINE_EVENTS_POLL_SECONDS', 1.0))
+    PIPELINE_EVENTS_HEARTBEAT_SECONDS = 15
+    PIPELINE_EVENTS_MAX_STREAM_SECONDS = 300  # clients reconnect with Last-Event-ID
+    PIPELINE_EVENTS_RETENTION = timedelta(days=2)
+    # How long events after a missing id wait for the transaction holding it to commit
+    PIPELINE_EVENTS_GAP_GRACE_SECONDS = float(os.environ.get('PIPELINE_EVENTS_GAP_GRACE_SECONDS', 2.0))
+
+    # Pipeline quote export
+    PIPELINE_EXPORT_BATCH_SIZE = 200
+    PIPELINE_EXPORT_RENDER_AHEAD = 8  # missing PDFs rendering ahead of the entry being written
+
+    # Batch quoting
+    QUOTE_BATCH_CHUNK_SIZE = 200
+    QUOTE_BATCH_MAX_ROWS = int(os.environ.get('QUOTE_BATCH_MAX_ROWS', 50000))
+    QUOTE_SWEEP_MAX_CELLS = int(os.environ.get('QUOTE_SWEEP_MAX_CELLS', 10000))
+
+    # Batch form validation
+    FORM_VALIDATE_CHUNK_SIZE = 100
+    FORM_VALIDATE_MAX_ROWS = int(os.environ.get('FORM_VALIDATE_MAX_ROWS', 50000))
+    # Spare cores by default; 0 validates on the request thread
+    FORM_VALIDATE_WORKERS = int(os.environ.get('FORM_VALIDATE_WORKERS', min(4, (os.cpu_count() or 1) - 1)))
+    FORM_VALIDATE_PARALLEL_MIN_ROWS = 500  # smaller batches are not worth the pool overhead
+
+    # Background PDF rendering
+    PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', 2))  # 0 renders on the request thread
+    PDF_RENDER_MAX_QUEUE = int(os.environ.get('PDF_RENDER_MAX_QUEUE', 100))
+    PDF_RENDER_TIMEOUT_SECONDS = 120
+    PDF_CACHE_GC_MIN_AGE_SECONDS = 24 * 3600  # unreferenced quote PDFs used more recently are kept
+
+    # Serving PDFs
+    PDF_MAX_AGE_SECONDS = 3600
+    PDF_SENDFILE_MODE = os.environ.get('PDF_SENDFILE_MODE')  # 'x-sendfile' or 'x-accel-redirect' behind a proxy
+    PDF_ACCEL_REDIRECT_PREFIX = os.environ.get('PDF_ACCEL_REDIRECT_PREFIX', '/internal-uploads/')
+
+    # Form uploads, enforced while the request body streams in
+    UPLOAD_MAX_FILE_BYTES = int(os.environ.get('UPLOAD_MAX_FILE_BYTES', 25 * 1024 * 1024))
+    UPLOAD_MAX_REQUEST_BYTES = int(os.environ.get('UPLOAD_MAX_REQUEST_BYTES', 100 * 1024 * 1024))
+    UPLOAD_MAX_FIELD_BYTES = 1024 * 1024  # a single non-file form field
+    INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 1))  # profiling of uploaded data files; 0 runs inline
+
+    # Streamed JSON collections (?stream=true)
+    JSON_STREAM_BATCH_SIZE = 200  # rows fetched per round trip while the response is written
+    JSON_STREAM_MAX_PER_PAGE = int(os.environ.get('JSON_STREAM_MAX_PER_PAGE', 5000))
+
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
 
@@ -0,0 +1,74 @@
+"""Add stage_transitions table and backfill from change_log
+
+Revision ID: 8c3e1f2a9b47
+Revises: 50f7b44dbea2
+Create Date: 2026-10-18 09:12:41.207315
+
+"""
+from datetime import datetime
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3e1f2a9b47'
+down_revision = '50f7b44dbea2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    stage_transitions = op.create_table('stage_transitions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('pipeline_id', sa.Integer(), nullable=False),
+        sa.Column('stage', sa.String(length=50), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.Column('changed_by', sa.String(length=255), nullable=True),
+        sa.ForeignKeyConstraint(['pipeline_id'], ['project_pipeline.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stage_transitions', schema=None) as batch_op:
+        batch_op.create_index('ix_stage_transitions_pipeline_id_changed_at', ['pipeline_id', 'changed_at'], unique=False)
+        batch_op.create_index('ix_stage_transitions_stage_changed_at', ['stage', 'changed_at'], unique=False)
+
+    # Backfill from the JSON change_log blobs
+    project_pipeline = sa.table('project_pipeline',
+        sa.column('id', sa.Integer),
+        sa.column('change_log', sa.JSON),
+        sa.column('updated_at', sa.DateTime)
+    )
+    connection = op.get_bind()
+    rows = []
+    for pipeline_id, change_log, updated_at in connection.execute(
+        sa.select(project_pipeline.c.id, project_pipeline.c.change_log, project_pipeline.c.updated_at)
+    ):
+        if isinstance(change_log, str):
+            try:
+                change_log = json.loads(change_log)
+            except json.JSONDecodeError:
+                continue
+        for entry in change_log or []:
+            if not isinstance(entry, dict) or not entry.get('stage'):
+                continue
+            try:
+                changed_at = datetime.fromisoformat(entry['changed_at'])
+            except (KeyError, TypeError, ValueError):
+                changed_at = updated_at or datetime.utcnow()
+            rows.append({
+                'pipeline_id': pipeline_id,
+                'stage': entry['stage'],
+                'changed_at': changed_at,
+                'changed_by': entry.get('changed_by')
+            })
+    if rows:
+        op.bulk_insert(stage_transitions, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('stage_transitions', schema=None) as batch_op:
+        batch_op.drop_index('ix_stage_transitions_stage_changed_at')
+        batch_op.drop_index('ix_stage_transitions_pipeline_id_changed_at')
+
+    op.drop_table('stage_transitions')
@@ -0,0 +1,41 @@
+"""Add pdf_jobs table for background PDF rendering
+
+Revision ID: a9d3e5f71c20
+Revises: f3a5c8d21e64
+Create Date: 2026-10-18 16:12:44.301527
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3e5f71c20'
+down_revision = 'f3a5c8d21e64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pdf_jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('layout', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('form_id', sa.Integer(), nullable=True),
+        sa.Column('pdf_url', sa.String(length=255), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('render_ms', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['form_id'], ['pricing_forms.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('pdf_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pdf_jobs_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pdf_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pdf_jobs_created_at'))
+
+    op.drop_table('pdf_jobs')
@@ -0,0 +1,137 @@
+"""Add stored_files index and move uploads into sharded directories
+
+Revision ID: b5e1c9a7d3f2
+Revises: a9d3e5f71c20
+Create Date: 2026-10-18 18:05:12.774310
+
+"""
+import hashlib
+import os
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e1c9a7d3f2'
+down_revision = 'a9d3e5f71c20'
+branch_labels = None
+depends_on = None
+
+INSERT_BATCH_SIZE = 1000
+
+stored_files = sa.table('stored_files',
+    sa.column('storage_key', sa.String),
+    sa.column('kind', sa.String),
+    sa.column('relative_path', sa.String),
+    sa.column('size', sa.BigInteger),
+    sa.column('checksum', sa.String),
+    sa.column('mtime', sa.DateTime),
+    sa.column('created_at', sa.DateTime)
+)
+form_documents = sa.table('form_documents',
+    sa.column('id', sa.Integer),
+    sa.column('file_path', sa.String)
+)
+
+
+def _shard_relative_path(filename):
+    # Frozen copy of utils.storage.shard_relative_path
+    digest = hashlib.sha256(filename.encode('utf-8')).hexdigest()
+    return os.path.join(digest[:2], digest[2:4], filename)
+
+
+def _checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _repoint_documents(connection, moved):
+    """Rewrite form_documents.file_path for files that changed location"""
+    if not moved:
+        return
+    for doc_id, file_path in connection.execute(sa.select(form_documents.c.id, form_documents.c.file_path)):
+        new_path = moved.get(os.path.basename(file_path or ''))
+        if new_path and new_path != file_path:
+            connection.execute(
+                form_documents.update().where(form_documents.c.id == doc_id).values(file_path=new_path)
+            )
+
+
+def upgrade():
+    op.create_table('stored_files',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('storage_key', sa.String(length=255), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('relative_path', sa.String(length=255), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('checksum', sa.String(length=64), nullable=False),
+        sa.Column('mtime', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('storage_key')
+    )
+    with op.batch_alter_table('stored_files', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stored_files_kind'), ['kind'], unique=False)
+        batch_op.create_index(batch_op.f('ix_stored_files_mtime'), ['mtime'], unique=False)
+
+    # Move the flat uploads folder into ab/cd/ shards and index every file
+    root = current_app.config['UPLOAD_FOLDER']
+    if not os.path.isdir(root):
+        return
+    connection = op.get_bind()
+    now = datetime.utcnow()
+    moved = {}
+    rows = []
+    for entry in os.scandir(root):
+        if not entry.is_file() or entry.name.endswith('.tmp'):
+            continue
+        relative_path = _shard_relative_path(entry.name)
+        path = os.path.join(root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(entry.path, path)
+        moved[entry.name] = path
+
+        stat = os.stat(path)
+        rows.append({
+            'storage_key': entry.name,
+            'kind': 'quote_pdf' if entry.name.startswith('quote_') and entry.name.endswith('.pdf') else 'upload',
+            'relative_path': relative_path,
+            'size': stat.st_size,
+            'checksum': _checksum(path),
+            'mtime': datetime.utcfromtimestamp(stat.st_mtime),
+            'created_at': now
+        })
+        if len(rows) >= INSERT_BATCH_SIZE:
+            op.bulk_insert(stored_files, rows)
+            rows = []
+    if rows:
+        op.bulk_insert(stored_files, rows)
+    _repoint_documents(connection, moved)
+
+
+def downgrade():
+    # Move indexed files back to the flat layout
+    root = current_app.config['UPLOAD_FOLDER']
+    connection = op.get_bind()
+    moved = {}
+    for storage_key, relative_path in connection.execute(
+        sa.select(stored_files.c.storage_key, stored_files.c.relative_path)
+    ):
+        path = os.path.join(root, relative_path)
+        if os.path.isfile(path):
+            flat_path = os.path.join(root, storage_key)
+            os.replace(path, flat_path)
+            moved[storage_key] = flat_path
+    _repoint_documents(connection, moved)
+
+    with op.batch_alter_table('stored_files', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stored_files_mtime'))
+        batch_op.drop_index(batch_op.f('ix_stored_files_kind'))
+
+    op.drop_table('stored_files')
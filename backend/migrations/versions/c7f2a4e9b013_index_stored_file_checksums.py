@@ -0,0 +1,25 @@
+"""Index stored_files.checksum for upload deduplication
+
+Revision ID: c7f2a4e9b013
+Revises: b5e1c9a7d3f2
+Create Date: 2026-10-18 19:12:40.518227
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7f2a4e9b013'
+down_revision = 'b5e1c9a7d3f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('stored_files', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stored_files_checksum'), ['checksum'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('stored_files', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stored_files_checksum'))
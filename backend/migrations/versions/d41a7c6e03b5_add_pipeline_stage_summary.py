@@ -0,0 +1,40 @@
+"""Add pipeline_stage_summary rollup table
+
+Revision ID: d41a7c6e03b5
+Revises: 8c3e1f2a9b47
+Create Date: 2026-10-18 11:03:18.550912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a7c6e03b5'
+down_revision = '8c3e1f2a9b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pipeline_stage_summary',
+        sa.Column('stage', sa.String(length=50), nullable=False),
+        sa.Column('item_count', sa.Integer(), nullable=False),
+        sa.Column('quote_amount_total', sa.Float(), nullable=False),
+        sa.Column('contract_amount_total', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('stage')
+    )
+
+    # Seed the rollup from the current pipeline
+    op.execute(
+        "INSERT INTO pipeline_stage_summary "
+        "(stage, item_count, quote_amount_total, contract_amount_total, updated_at) "
+        "SELECT current_stage, COUNT(id), COALESCE(SUM(quote_amount), 0), "
+        "COALESCE(SUM(contract_amount), 0), CURRENT_TIMESTAMP "
+        "FROM project_pipeline GROUP BY current_stage"
+    )
+
+
+def downgrade():
+    op.drop_table('pipeline_stage_summary')
@@ -0,0 +1,38 @@
+"""Add ingestion results to form_documents
+
+Revision ID: d4b8e2f6a951
+Revises: c7f2a4e9b013
+Create Date: 2026-10-18 20:31:07.236184
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4b8e2f6a951'
+down_revision = 'c7f2a4e9b013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('form_documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ingest_status', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('ingest_error', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('ingested_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('size_bytes', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('row_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('column_count', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_form_documents_ingest_status'), ['ingest_status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('form_documents', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_form_documents_ingest_status'))
+        batch_op.drop_column('column_count')
+        batch_op.drop_column('row_count')
+        batch_op.drop_column('size_bytes')
+        batch_op.drop_column('ingested_at')
+        batch_op.drop_column('ingest_error')
+        batch_op.drop_column('ingest_status')
@@ -0,0 +1,35 @@
+"""Add pipeline_events table for the SSE stream
+
+Revision ID: e7b2904c5d18
+Revises: d41a7c6e03b5
+Create Date: 2026-10-18 13:37:05.114260
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b2904c5d18'
+down_revision = 'd41a7c6e03b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pipeline_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('pipeline_events', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pipeline_events_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pipeline_events', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pipeline_events_created_at'))
+
+    op.drop_table('pipeline_events')
@@ -0,0 +1,95 @@
+"""Store pricing form list fields in native JSON columns
+
+Revision ID: e9c4a1f7b260
+Revises: d4b8e2f6a951
+Create Date: 2026-10-18 21:44:53.518027
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9c4a1f7b260'
+down_revision = 'd4b8e2f6a951'
+branch_labels = None
+depends_on = None
+
+COPY_BATCH_SIZE = 1000
+
+JSON_FIELDS = ('expected_deliverables', 'target_audience', 'data_sources',
+               'required_integrations', 'interactivity_needed', 'user_access_levels',
+               'customization_needs', 'delivery_model', 'databases')
+
+
+def _json_type():
+    return sa.JSON(none_as_null=True).with_variant(postgresql.JSONB(none_as_null=True), 'postgresql')
+
+
+def _from_text(value):
+    # Text that never held valid JSON was served as a plain string; keep it one
+    if value is None:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _to_text(value):
+    return None if value is None else json.dumps(value)
+
+
+def _copy_columns(source_suffix, target_suffix, source_type, target_type, convert):
+    """Copy every list field into its sibling column, COPY_BATCH_SIZE rows at a time"""
+    forms = sa.table('pricing_forms',
+        sa.column('id', sa.Integer),
+        *[sa.column(f"{field}{source_suffix}", source_type) for field in JSON_FIELDS],
+        *[sa.column(f"{field}{target_suffix}", target_type) for field in JSON_FIELDS]
+    )
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(forms.c.id, *[forms.c[f"{field}{source_suffix}"] for field in JSON_FIELDS])
+            .where(forms.c.id > last_id)
+            .order_by(forms.c.id)
+            .limit(COPY_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        for row in rows:
+            values = {
+                f"{field}{target_suffix}": convert(value)
+                for field, value in zip(JSON_FIELDS, row[1:])
+            }
+            if any(value is not None for value in values.values()):
+                connection.execute(forms.update().where(forms.c.id == row.id).values(**values))
+        last_id = rows[-1].id
+
+
+def _swap_columns(new_suffix, new_type, old_type, convert):
+    with op.batch_alter_table('pricing_forms', schema=None) as batch_op:
+        for field in JSON_FIELDS:
+            batch_op.add_column(sa.Column(f"{field}{new_suffix}", new_type, nullable=True))
+
+    _copy_columns('', new_suffix, old_type, new_type, convert)
+
+    with op.batch_alter_table('pricing_forms', schema=None) as batch_op:
+        for field in JSON_FIELDS:
+            batch_op.drop_column(field)
+    with op.batch_alter_table('pricing_forms', schema=None) as batch_op:
+        for field in JSON_FIELDS:
+            batch_op.alter_column(f"{field}{new_suffix}", new_column_name=field,
+                                  existing_type=new_type, existing_nullable=True)
+
+
+def upgrade():
+    _swap_columns('_json', _json_type(), sa.Text(), _from_text)
+
+
+def downgrade():
+    _swap_columns('_text', sa.Text(), _json_type(), _to_text)
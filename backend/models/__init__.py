@@ -1 +1 @@
-from .models import db, PricingForm, ProjectPipeline
\ No newline at end of file
+from .models import db, PricingForm, ProjectPipeline, StageTransition, PipelineStageSummary, PipelineEvent, PdfJob, StoredFile
\ No newline at end of file
@@ -1,9 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 import json
 
 db = SQLAlchemy()
 
+# JSON column, JSONB on PostgreSQL; None is stored as SQL NULL, not JSON null
+JSONColumn = db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql')
+
 class PricingForm(db.Model):
     
     """
@@ -40,34 +44,34 @@ class PricingForm(db.Model):
     project_title = db.Column(db.String(255), nullable=False)
     project_description = db.Column(db.Text, nullable=True)
     business_objective = db.Column(db.Text, nullable=True)
-    expected_deliverables = db.Column(db.Text, nullable=True)  # Stored as JSON string
+    expected_deliverables = db.Column(JSONColumn, nullable=True)
     subscription_plan = db.Column(db.String(50), nullable=False)
-    target_audience = db.Column(db.Text, nullable=True)  # Stored as JSON string
+    target_audience = db.Column(JSONColumn, nullable=True)
     number_of_integrations = db.Column(db.Integer, nullable=True)
     number_of_widgets = db.Column(db.Integer, nullable=True)
     
     # Technical Scope
-    data_sources = db.Column(db.Text, nullable=True)  # Stored as JSON string
+    data_sources = db.Column(JSONColumn, nullable=True)
     volume_of_data = db.Column(db.String(50), nullable=True)  # Small, Medium, Large
-    required_integrations = db.Column(db.Text, nullable=True)  # Stored as JSON string
+    required_integrations = db.Column(JSONColumn, nullable=True)
     api_name = db.Column(db.String(255), nullable=True)
     api_available = db.Column(db.Boolean, default=False, nullable=True)
     api_documented = db.Column(db.Boolean, default=False, nullable=True)
     api_test_kit_link = db.Column(db.Text, nullable=True)
-    databases = db.Column(db.Text, nullable=True)  # Stored as JSON string
+    databases = db.Column(JSONColumn, nullable=True)
     cloud_storage_name = db.Column(db.String(255), nullable=True)
     google_spreadsheet = db.Column(db.String(500), nullable=True)
     
     # Features & Functionalities
-    interactivity_needed = db.Column(db.Text, nullable=True)  # Stored as JSON string
-    user_access_levels = db.Column(db.Text, nullable=True)  # Stored as JSON string
-    customization_needs = db.Column(db.Text, nullable=True)  # Stored as JSON string
+    interactivity_needed = db.Column(JSONColumn, nullable=True)
+    user_access_levels = db.Column(JSONColumn, nullable=True)
+    customization_needs = db.Column(JSONColumn, nullable=True)
     
     # Pricing Factors
     engagement_type = db.Column(db.String(50), nullable=True)  # One-time Project, Monthly Retainer, Subscription
     start_date = db.Column(db.Date, nullable=True)
     end_date = db.Column(db.Date, nullable=True)
-    delivery_model = db.Column(db.Text, nullable=True)  # Stored as JSON string
+    delivery_model = db.Column(JSONColumn, nullable=True)
     support_plan_required = db.Column(db.String(50), nullable=True)  # Basic, Priority, Dedicated Account Manager
     
     # Competitive / Value-based Inputs
@@ -94,6 +98,8 @@ class PricingForm(db.Model):
     quote_total = db.Column(db.Float, nullable=True)
     quote_breakdown = db.Column(db.JSON, nullable=True)  # Stores detailed cost breakdown
     quote_pdf_url = db.Column(db.String(500), nullable=True)  # PDF storage path
+    quote_pricing_version = db.Column(db.String(50), nullable=True)  # Pricing rules the breakdown was priced with
+    quote_valid_until = db.Column(db.Date, nullable=True)  # Validity date printed on the quote PDF
     # Demo client fields
     wants_demo = db.Column(db.Boolean, default=False)
     company_website = db.Column(db.String(255))
@@ -127,35 +133,15 @@ class PricingForm(db.Model):
     # Relationship to documents
     documents = db.relationship('FormDocument', backref='pricing_form', lazy=True)
 
+    JSON_FIELDS = ('expected_deliverables', 'target_audience', 'data_sources',
+                   'required_integrations', 'interactivity_needed', 'user_access_levels',
+                   'customization_needs', 'delivery_model', 'databases')
+
 
     def to_dict(self):
         """Convert model to dictionary for JSON serialization"""
-        result = {c.name: getattr(self, c.name) for c in self.__table__.columns}
-        
-        # Convert datetime objects to strings
-        if self.created_at:
-            result['created_at'] = self.created_at.isoformat()
-        if self.updated_at:
-            result['updated_at'] = self.updated_at.isoformat()
-        if self.start_date:
-            result['start_date'] = self.start_date.isoformat()
-        if self.end_date:
-            result['end_date'] = self.end_date.isoformat()
-            
-        # Parse JSON strings back to lists/objects
-        json_fields = ['expected_deliverables', 'target_audience', 'data_sources', 
-                      'required_integrations', 'interactivity_needed', 'user_access_levels', 
-                      'customization_needs', 'delivery_model', 'databases']
-                      
-        for field in json_fields:
-            if result[field]:
-                try:
-                    result[field] = json.loads(result[field])
-                except json.JSONDecodeError:
-                    # Keep as string if parsing fails
-                    pass
-                    
-        return result
+        # Dates and datetimes are encoded by the app's JSON provider
+        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
     
     @staticmethod
     def from_dict(data):
@@ -163,15 +149,14 @@ class PricingForm(db.Model):
         # Create a copy to avoid modifying the original
         form_data = data.copy()
         
-        # Convert lists/objects to JSON strings for storage
-        json_fields = ['expected_deliverables', 'target_audience', 'data_sources', 
-                     'required_integrations', 'interactivity_needed', 'user_access_levels', 
-                     'customization_needs', 'delivery_model', 'databases']
-                     
-        for field in json_fields:
-            if field in form_data and form_data[field] is not None:
-                if not isinstance(form_data[field], str):
-                    form_data[field] = json.dumps(form_data[field])
+        # JSON columns take lists/objects as they are; decode JSON text input
+        for field in PricingForm.JSON_FIELDS:
+            if isinstance(form_data.get(field), str):
+                try:
+                    form_data[field] = json.loads(form_data[field])
+                except json.JSONDecodeError:
+                    # Keep as string if parsing fails
+                    pass
                     
         # Handle date fields
         date_fields = ['start_date', 'end_date']
@@ -201,28 +186,36 @@ class ProjectPipeline(db.Model):
     quote_amount = db.Column(db.Float, nullable=True)
     contract_amount = db.Column(db.Float, nullable=True)
     delivery_date = db.Column(db.DateTime, nullable=True)
-    change_log = db.Column(db.JSON, nullable=True)
+    change_log = db.Column(db.JSON, nullable=True)  # Legacy, superseded by stage_transitions
     quote_details = db.Column(db.JSON, nullable=True)  
     
     # Relationship
     pricing_form = db.relationship('PricingForm', backref='pipeline')
+    transitions = db.relationship('StageTransition', backref='pipeline_item', lazy='dynamic',
+                                  order_by='StageTransition.changed_at')
     
-    def to_dict(self):
+    def to_dict(self, include_project_details=True, include_change_log=False):
         result = {
             'id': self.id,
             'form_id': self.form_id,
             'current_stage': self.current_stage,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
             'notes': self.notes,
             'quote_amount': self.quote_amount,
             'contract_amount': self.contract_amount,
-            'delivery_date': self.delivery_date.isoformat() if self.delivery_date else None,
-            'change_log': self.change_log,
+            'delivery_date': self.delivery_date,
             'quote_details': self.quote_details,
-            'project_details': self.pricing_form.to_dict() if self.pricing_form else None
         }
         
+        # Stage history lives in its own table and is only queried on request
+        if include_change_log:
+            result['change_log'] = [t.to_dict() for t in self.transitions]
+        
+        # The board view embeds the form once as form_data, so callers can skip it here
+        if include_project_details:
+            result['project_details'] = self.pricing_form.to_dict() if self.pricing_form else None
+        
         # Include quote details from pricing form if available
         if self.pricing_form and self.pricing_form.quote_breakdown:
             try:
@@ -232,6 +225,105 @@ class ProjectPipeline(db.Model):
                 
         return result
     
+class StageTransition(db.Model):
+    """
+    Append-only history of pipeline stage changes
+    """
+    __tablename__ = 'stage_transitions'
+    __table_args__ = (
+        db.Index('ix_stage_transitions_pipeline_id_changed_at', 'pipeline_id', 'changed_at'),
+        db.Index('ix_stage_transitions_stage_changed_at', 'stage', 'changed_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    pipeline_id = db.Column(db.Integer, db.ForeignKey('project_pipeline.id'), nullable=False)
+    stage = db.Column(db.String(50), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    changed_by = db.Column(db.String(255), nullable=True)
+    
+    def to_dict(self):
+        return {
+            'stage': self.stage,
+            'changed_at': self.changed_at,
+            'changed_by': self.changed_by
+        }
+    
+class PipelineStageSummary(db.Model):
+    """
+    Per-stage rollup of pipeline counts and amounts, maintained on every pipeline write
+    """
+    __tablename__ = 'pipeline_stage_summary'
+    
+    stage = db.Column(db.String(50), primary_key=True)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    quote_amount_total = db.Column(db.Float, nullable=False, default=0)
+    contract_amount_total = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'stage': self.stage,
+            'count': self.item_count,
+            'quote_amount_total': self.quote_amount_total,
+            'contract_amount_total': self.contract_amount_total
+        }
+    
+class PipelineEvent(db.Model):
+    """
+    Outbox of pipeline changes, written in the same transaction as the change
+    and read by the SSE stream in every worker
+    """
+    __tablename__ = 'pipeline_events'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+class PdfJob(db.Model):
+    """
+    A quote PDF rendered in the background; clients poll it until pdf_url is set
+    """
+    __tablename__ = 'pdf_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    layout = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, done, failed
+    form_id = db.Column(db.Integer, db.ForeignKey('pricing_forms.id'), nullable=True)
+    pdf_url = db.Column(db.String(255), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    render_ms = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'form_id': self.form_id,
+            'pdf_url': self.pdf_url,
+            'error': self.error,
+            'render_ms': self.render_ms,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+    
+class StoredFile(db.Model):
+    """
+    Index of the sharded upload storage: cleanup, quota and integrity jobs
+    query sizes and checksums here instead of walking the filesystem
+    """
+    __tablename__ = 'stored_files'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    storage_key = db.Column(db.String(255), unique=True, nullable=False)  # filename, as used in URLs
+    kind = db.Column(db.String(20), nullable=False, index=True)  # upload, quote_pdf
+    relative_path = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    checksum = db.Column(db.String(64), nullable=False, index=True)  # sha256, uploads are deduplicated on it
+    mtime = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
 class FormDocument(db.Model):
     __tablename__ = 'form_documents'
     
@@ -240,4 +332,27 @@ class FormDocument(db.Model):
     file_path = db.Column(db.String(255))
     file_name = db.Column(db.String(255))
     file_type = db.Column(db.String(50))
-    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Filled in by background ingestion of CSV/XLSX/JSON uploads
+    ingest_status = db.Column(db.String(20), nullable=True, index=True)  # queued, done, failed, skipped
+    ingest_error = db.Column(db.Text, nullable=True)
+    ingested_at = db.Column(db.DateTime, nullable=True)
+    size_bytes = db.Column(db.BigInteger, nullable=True)
+    row_count = db.Column(db.Integer, nullable=True)
+    column_count = db.Column(db.Integer, nullable=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'form_id': self.form_id,
+            'file_name': self.file_name,
+            'file_type': self.file_type,
+            'uploaded_at': self.uploaded_at,
+            'ingest_status': self.ingest_status,
+            'ingest_error': self.ingest_error,
+            'ingested_at': self.ingested_at,
+            'size_bytes': self.size_bytes,
+            'row_count': self.row_count,
+            'column_count': self.column_count
+        }
\ No newline at end of file
@@ -1,17 +1,31 @@
+import copy
 import json
-from flask import Blueprint, request, jsonify, current_app
-from werkzeug.utils import secure_filename
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context, url_for
+from werkzeug.exceptions import RequestEntityTooLarge
 from sqlalchemy.exc import SQLAlchemyError
 from routes.pipeline_routes import create_pipeline_item
 from models import db, PricingForm
 from models.models import FormDocument
-from utils.validators import validate_form_data
-from utils.quote_calculator import calculate_quote 
-from utils.pdf_generator import generate_quote_pdf
+from utils.validators import (
+    FORM_FIELDS, form_field_group, validate_form_data, validate_partial_form_data
+)
+from utils.json_patch import JsonPatchError, JsonPatchTestFailed, apply_patch, patch_root_keys
+from utils.form_batch import validate_rows
+from utils.quote_batch import NDJSON_MIMETYPES, iter_ndjson
+from utils.quote_calculator import (
+    BREAKDOWN_COMPONENTS, form_to_calculation_input, dirty_components,
+    patch_quote_breakdown, get_pricing_rules, quote_valid_until
+)
+from utils.quote_cache import cached_calculate_quote
+from utils.pdf_generator import quote_pdf_filename, render_pdf_bytes, reuse_cached_pdf
+from utils.pdf_cache import send_pdf_bytes
+from utils.storage import storage_path
+from utils.uploads import discard_uploads, parse_multipart_stream, store_upload
+from utils.ingestion import enqueue_ingestion, ingested_data_files
+from utils.json_provider import stream_page
+from utils.pdf_jobs import enqueue_pdf_render, start_pdf_renders
 import logging
-import uuid
-import os
-from datetime import datetime
+from datetime import date, datetime
 
 # Create a Blueprint for form routes
 form_bp = Blueprint('forms', __name__, url_prefix='/api')
@@ -75,82 +89,91 @@ def submit_form():
       500:
         description: Server error
     """
+    uploads = []
     try:
         if request.is_json:
             data = request.get_json()
+        elif request.mimetype == 'multipart/form-data':
+            fields, uploads = parse_multipart_stream(request)
+            data = fields.to_dict()
+            # The form UI sends its fields as one JSON 'data' part next to the files
+            if 'data' in data:
+                data = json.loads(data['data'])
         else:
             data = request.form.to_dict()
-        files = request.files.getlist('files')
         
         # Validate form data
-        errors = validate_form_data(data)
-        if errors:
-            return jsonify({'success': False, 'errors': errors}), 400
-        
-        # Create new form entry
-        new_form = PricingForm(
-            # Existing fields...
-            wants_demo=data.get('wantsDemo') == 'true',
-            company_website=data.get('companyWebsite'),
-            use_case_description=data.get('useCaseDescription'),
-            reference_links=data.get('referenceLinks'),
-            number_of_verticals=data.get('numberOfVerticals'),
-            demo_verticals=','.join(data.get('demoVerticals', [])),
-            custom_vertical=data.get('customVertical'),
-            demo_scheduled_at=datetime.fromisoformat(data.get('demoScheduledAt')) if data.get('demoScheduledAt') else None,
-            timezone=data.get('timezone'),
-            country=data.get('country'),
-            city=data.get('city'),
-            meeting_link=data.get('meetingLink'),
-            next_steps=data.get('nextSteps'),
-            client_suggestions=data.get('clientSuggestions'),
-            wants_business_analysis=data.get('wantsBusinessAnalysis') == 'true',
-            problem_statement=data.get('problemStatement'),
-            case_description=data.get('caseDescription'),
-            stakeholders=data.get('stakeholders'),
-            visualization_goal=data.get('visualizationGoal'),
-            resources_status=data.get('resourcesStatus'),
-            has_support_team=data.get('hasSupportTeam'),
-            has_complex_math=data.get('hasComplexMath'),
-            client_type_tag=data.get('clientTypeTag')
-        )
+        is_valid, result = validate_form_data(data)
+        if not is_valid:
+            discard_uploads(uploads)
+            return jsonify({'success': False, 'errors': result}), 400
+        
+        # Create new form entry from the validated fields
+        new_form = PricingForm(**result)
         
         db.session.add(new_form)
         db.session.commit()
         
-        # Handle file uploads
-        if files:
-            upload_folder = os.path.join(current_app.instance_path, 'uploads')
-            os.makedirs(upload_folder, exist_ok=True)
-            
-            for file in files:
-                if file.filename == '':
-                    continue
-                
-                filename = secure_filename(file.filename)
-                unique_id = uuid.uuid4().hex
-                new_filename = f"{unique_id}_{filename}"
-                file_path = os.path.join(upload_folder, new_filename)
-                
-                file.save(file_path)
-                
+        # Handle file uploads; identical content is stored once and shared
+        if uploads:
+            documents = []
+            for upload in uploads:
                 new_doc = FormDocument(
                     form_id=new_form.id,
-                    file_path=file_path,
-                    file_name=filename,
-                    file_type=filename.split('.')[-1].lower()
+                    file_path=store_upload(upload),
+                    file_name=upload.filename,
+                    file_type=upload.file_type
                 )
                 db.session.add(new_doc)
+                documents.append(new_doc)
             
             db.session.commit()
+            
+            # Derive sizes and row/column counts of data files for quoting
+            enqueue_ingestion(documents)
         
         return jsonify({'success': True, 'form_id': new_form.id}), 201
     
+    except RequestEntityTooLarge:
+        return jsonify({'success': False, 'error': 'Upload too large'}), 413
+    except ValueError as e:
+        db.session.rollback()
+        discard_uploads(uploads)
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
+        discard_uploads(uploads)
         current_app.logger.error(f"Form submission error: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@form_bp.route('/forms/validate-batch', methods=['POST'])
+def validate_form_batch():
+    """
+    Validate many draft forms without saving them
+    
+    Accepts a JSON array or an NDJSON body (Content-Type application/x-ndjson).
+    Streams one NDJSON line per form in input order: its index, whether it
+    is valid and, if not, the same error map POST /api/forms would return.
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        rows = iter_ndjson(request.stream)
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return jsonify({"error": "Expected a JSON array or NDJSON body"}), 400
+    
+    chunk_size = current_app.config['FORM_VALIDATE_CHUNK_SIZE']
+    max_rows = current_app.config['FORM_VALIDATE_MAX_ROWS']
+    
+    def generate():
+        for index, errors in validate_rows(rows, chunk_size, max_rows):
+            line = {'index': index, 'valid': errors is None}
+            if errors is not None:
+                line['errors'] = errors
+            yield json.dumps(line) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @form_bp.route('/forms', methods=['GET'])
 def get_all_forms():
     """
@@ -170,6 +193,13 @@ def get_all_forms():
         type: integer
         description: Number of items per page
         default: 20
+      - name: stream
+        in: query
+        type: boolean
+        description: >
+          Write forms as they are fetched; allows per_page up to JSON_STREAM_MAX_PER_PAGE.
+          A failure after the response has started ends the forms array early and adds an "error" member
+        default: false
     responses:
       200:
         description: List of forms
@@ -180,11 +210,17 @@ def get_all_forms():
         # Add pagination
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        stream = request.args.get('stream', 'false').lower() == 'true'
+        
+        query = PricingForm.query.order_by(PricingForm.created_at.desc())
+        if stream:
+            per_page = min(per_page, current_app.config['JSON_STREAM_MAX_PER_PAGE'])
+            return stream_page(query, page, per_page, PricingForm.to_dict, key='forms')
         
         # Limit per_page to prevent excessive queries
         per_page = min(per_page, 100)
         
-        pagination = PricingForm.query.order_by(PricingForm.created_at.desc()).paginate(
+        pagination = query.paginate(
             page=page, per_page=per_page, error_out=False
         )
         
@@ -238,6 +274,14 @@ def get_form_by_id(form_id):
         current_app.logger.error(f"Unexpected error: {str(e)}")
         return jsonify({"error": "Unexpected error occurred"}), 500
 
+@form_bp.route('/forms/<int:form_id>/documents', methods=['GET'])
+def get_form_documents(form_id):
+    """Uploaded documents of a form with their ingestion results"""
+    if not db.session.get(PricingForm, form_id):
+        return jsonify({"error": "Form not found"}), 404
+    documents = FormDocument.query.filter_by(form_id=form_id).order_by(FormDocument.id).all()
+    return jsonify({'documents': [doc.to_dict() for doc in documents]}), 200
+
 @form_bp.route('/forms/<int:form_id>', methods=['PUT'])
 def update_form(form_id):
     """
@@ -283,7 +327,7 @@ def update_form(form_id):
         if not form:
             return jsonify({"error": "Form not found"}), 404
             
-        data = json.loads(request.form['data'])
+        data = request.get_json()
         
         # Validate input data
         is_valid, result = validate_form_data(data)
@@ -291,14 +335,19 @@ def update_form(form_id):
             return jsonify({"error": "Validation failed", "details": result}), 400
         
         # Update form fields from validated data
+        changed_fields = set()
         for key, value in result.items():
+            if getattr(form, key, None) != value:
+                changed_fields.add(key)
             setattr(form, key, value)
             
+        quote_status = refresh_form_quote(form, changed_fields)
         db.session.commit()
         
         return jsonify({
             "message": "Form updated successfully",
-            "form": form.to_dict()
+            "form": form.to_dict(),
+            "quote_status": quote_status
         }), 200
         
     except SQLAlchemyError as e:
@@ -310,6 +359,170 @@ def update_form(form_id):
         current_app.logger.error(f"Unexpected error: {str(e)}")
         return jsonify({"error": "Unexpected error occurred"}), 500
 
+@form_bp.route('/forms/<int:form_id>', methods=['PATCH'])
+def patch_form(form_id):
+    """
+    Apply a JSON Patch (RFC 6902) to a form, e.g. for draft autosave
+    
+    Only the fields the patch touches are validated, together with the
+    fields that share a rule with them (start_date/end_date, the demo
+    fields, ...), and only columns whose value changed are written.
+    
+    ---
+    tags:
+      - Forms
+    consumes:
+      - application/json-patch+json
+    parameters:
+      - name: form_id
+        in: path
+        type: integer
+        required: true
+      - in: body
+        name: body
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              op:
+                type: string
+                enum: [add, remove, replace, move, copy, test]
+              path:
+                type: string
+              from:
+                type: string
+              value: {}
+    responses:
+      200:
+        description: Patch applied; lists the changed columns
+      400:
+        description: Invalid patch or validation failed
+      404:
+        description: Form not found
+      409:
+        description: A test operation failed
+    """
+    operations = request.get_json(silent=True)
+    try:
+        touched = patch_root_keys(operations)
+    except JsonPatchError as e:
+        return jsonify({"error": "Invalid JSON Patch", "details": str(e)}), 400
+    
+    try:
+        form = db.session.get(PricingForm, form_id)
+        if not form:
+            return jsonify({"error": "Form not found"}), 404
+        
+        # The patch only sees the fields it touches and their rule groups
+        group = form_field_group(touched & FORM_FIELDS)
+        original = _form_document(form, group)
+        document = copy.deepcopy(original)
+        try:
+            apply_patch(document, operations)
+        except JsonPatchTestFailed as e:
+            return jsonify({"error": "Patch test failed", "details": str(e)}), 409
+        except JsonPatchError as e:
+            return jsonify({"error": "Invalid JSON Patch", "details": str(e)}), 400
+        
+        changed = {
+            key for key in touched
+            if (key in document) != (key in original) or document.get(key) != original.get(key)
+        }
+        if not changed:
+            return jsonify({"message": "No changes", "changed": [], "quote_status": "unchanged"}), 200
+        
+        try:
+            is_valid, result = validate_partial_form_data(document, changed)
+        except (TypeError, ValueError, AttributeError) as e:
+            # e.g. an unparseable start_date read by the end_date rule
+            return jsonify({"error": "Validation failed", "details": {"_schema": [str(e)]}}), 400
+        if not is_valid:
+            return jsonify({"error": "Validation failed", "details": result}), 400
+        
+        # Removed members clear their column; pre_load may also fill in currency
+        changed_fields = set()
+        for key in group | changed:
+            if key in result:
+                value = result[key]
+            elif key in changed:
+                value = None
+            else:
+                continue
+            if getattr(form, key) != value:
+                setattr(form, key, value)
+                changed_fields.add(key)
+        
+        quote_status = refresh_form_quote(form, changed_fields)
+        db.session.commit()
+        
+        return jsonify({
+            "message": "Form updated successfully",
+            "changed": sorted(changed_fields),
+            "updated_at": form.updated_at,
+            "quote_status": quote_status
+        }), 200
+        
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Database error: {str(e)}")
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Unexpected error: {str(e)}")
+        return jsonify({"error": "Unexpected error occurred"}), 500
+
+def _form_document(form, keys):
+    """The given form fields as JSON values, like PricingForm.to_dict() renders them"""
+    document = {}
+    for key in keys:
+        value = getattr(form, key)
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        document[key] = value
+    return document
+
+def refresh_form_quote(form, changed_fields):
+    """
+    Bring a stored quote up to date after the given columns changed
+    
+    Only the breakdown components fed by the changed columns are re-priced.
+    A quote priced under an older rules version is recalculated in full.
+    The stored PDF no longer matches a patched quote, so its URL is cleared.
+    
+    Returns:
+        str: 'none' (no stored quote), 'unchanged', 'patched', 'recalculated' or 'error'
+    """
+    if form.quote_breakdown is None or not isinstance(form.quote_breakdown, dict):
+        return 'none'
+        
+    rules = get_pricing_rules()
+    stale_rules = (
+        form.quote_pricing_version != rules.version or
+        set(form.quote_breakdown) != set(BREAKDOWN_COMPONENTS)
+    )
+    components = set(BREAKDOWN_COMPONENTS) if stale_rules else dirty_components(changed_fields, rules)
+    if not components:
+        return 'unchanged'
+        
+    try:
+        total, breakdown = patch_quote_breakdown(
+            {} if stale_rules else form.quote_breakdown,
+            form_to_calculation_input(form.to_dict(), ingested_data_files(form.id)),
+            components,
+            rules
+        )
+    except ValueError as e:
+        current_app.logger.info(f"Could not re-price form {form.id}: {str(e)}")
+        return 'error'
+        
+    form.quote_total = total
+    form.quote_breakdown = breakdown
+    form.quote_pricing_version = rules.version
+    form.quote_valid_until = date.fromisoformat(quote_valid_until(rules))
+    form.quote_pdf_url = None
+    return 'recalculated' if stale_rules else 'patched'
+
 @form_bp.route('/forms/<int:form_id>', methods=['DELETE'])
 def delete_form(form_id):
     """
@@ -378,6 +591,13 @@ def search_forms():
         type: integer
         description: Number of items per page
         default: 20
+      - name: stream
+        in: query
+        type: boolean
+        description: >
+          Write forms as they are fetched; allows per_page up to JSON_STREAM_MAX_PER_PAGE.
+          A failure after the response has started ends the forms array early and adds an "error" member
+        default: false
     responses:
       200:
         description: Search results
@@ -388,9 +608,10 @@ def search_forms():
         query = request.args.get('q', '')
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        stream = request.args.get('stream', 'false').lower() == 'true'
         
         # Limit per_page to prevent excessive queries
-        per_page = min(per_page, 100)
+        per_page = min(per_page, current_app.config['JSON_STREAM_MAX_PER_PAGE'] if stream else 100)
         
         # Build search query
         search_query = PricingForm.query
@@ -402,8 +623,12 @@ def search_forms():
                 (PricingForm.pricing_analyst_name.ilike(f'%{query}%'))
             )
         
+        search_query = search_query.order_by(PricingForm.created_at.desc())
+        if stream:
+            return stream_page(search_query, page, per_page, PricingForm.to_dict, {"query": query}, key='forms')
+        
         # Execute query with pagination
-        pagination = search_query.order_by(PricingForm.created_at.desc()).paginate(
+        pagination = search_query.paginate(
             page=page, per_page=per_page, error_out=False
         )
         
@@ -474,18 +699,37 @@ def generate_quote(form_id):
         return jsonify({"error": "Form not found"}), 404
     
     # Calculate quote
-    quote_data = calculate_quote(form.to_dict())
-    
-    # Generate PDF
-    pdf_url = generate_quote_pdf(quote_data)
+    calculation_data = form_to_calculation_input(form.to_dict(), ingested_data_files(form.id))
+    quote_data = cached_calculate_quote(calculation_data)
+    if not quote_data['success']:
+        return jsonify({"error": quote_data['error']}), 400
     
-    # Update form with quote
+    # Update form with quote; the PDF URL is set when the render job finishes
     form.quote_total = quote_data['total']
     form.quote_breakdown = quote_data['breakdown']
-    form.quote_pdf_url = pdf_url
+    form.quote_pricing_version = quote_data['pricing_version']
+    form.quote_valid_until = date.fromisoformat(quote_data['valid_until'])
+    form.quote_pdf_url = None
+    filename = quote_pdf_filename('quote', quote_data)
+    
+    # ?format=pdf answers with the document itself, rendered in memory
+    if request.args.get('format') == 'pdf':
+        if reuse_cached_pdf(storage_path(filename)):
+            form.quote_pdf_url = url_for('quote.serve_pdf', filename=filename)
+        db.session.commit()
+        return send_pdf_bytes(render_pdf_bytes('quote', quote_data), filename, etag=filename[:-len('.pdf')])
+    
+    # Queue PDF with the form changes
+    pdf_job = enqueue_pdf_render(
+        'quote', quote_data,
+        storage_path(filename),
+        url_for('quote.serve_pdf', filename=filename), form_id=form_id
+    )
     db.session.commit()
+    start_pdf_renders()
     
     return jsonify({
         "quote": quote_data,
-        "pdf_url": pdf_url
+        "pdf_url": pdf_job['pdf_url'],
+        "pdf_job": pdf_job
     }), 200
\ No newline at end of file
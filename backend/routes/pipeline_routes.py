@@ -1,26 +1,115 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from sqlalchemy import insert, update
 from sqlalchemy.exc import SQLAlchemyError
-from routes.quote_routes import generate_form_quote
-from models import db, ProjectPipeline, PricingForm
+from sqlalchemy.orm import joinedload
+from routes.quote_routes import quote_form
+from models import db, ProjectPipeline, PricingForm, StageTransition, PipelineStageSummary
+from utils.pipeline_summary import summary_snapshot, apply_summary_change, apply_bulk_stage_move
+from utils.pipeline_events import (
+    STAGE_CHANGE, QUOTE_UPDATE, NEW_ITEM,
+    record_pipeline_event, record_pipeline_events, latest_event_id, stream_pipeline_events
+)
+from utils.quote_export import stream_quote_export
+from utils.pdf_jobs import start_pdf_renders
+from utils.json_provider import stream_json_array
+from werkzeug.utils import secure_filename
 from datetime import datetime
 import logging
 
 pipeline_bp = Blueprint('pipeline', __name__, url_prefix='/api')
 
+BOARD_DEFAULT_LIMIT = 50
+BOARD_MAX_LIMIT = 200
+BULK_TRANSITION_MAX_IDS = 500
+
 # Get all pipeline items
 @pipeline_bp.route('/pipeline', methods=['GET'])
 def get_pipeline_items():
+    if request.args.get('view') == 'board':
+        return get_pipeline_board()
     try:
+        include_change_log = request.args.get('include_change_log', 'false').lower() == 'true'
+        if request.args.get('stream', 'false').lower() == 'true':
+            # Items are written as they are fetched, forms loaded in the same query
+            pipeline_items = ProjectPipeline.query.options(joinedload(ProjectPipeline.pricing_form)) \
+                .order_by(ProjectPipeline.id.asc()) \
+                .yield_per(current_app.config['JSON_STREAM_BATCH_SIZE'])
+            return stream_json_array(_pipeline_item_data(item, include_change_log) for item in pipeline_items)
+        
         pipeline_items = ProjectPipeline.query.all()
+        result = [_pipeline_item_data(item, include_change_log) for item in pipeline_items]
+        
+        return jsonify(result), 200
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error: {str(e)}")
+        return jsonify({"error": "Database error"}), 500
+
+def _pipeline_item_data(item, include_change_log):
+    item_data = item.to_dict(include_change_log=include_change_log)
+    # Include the full form data
+    if item.pricing_form:
+        item_data['form_data'] = item.pricing_form.to_dict()
+    return item_data
+
+def get_pipeline_board():
+    """
+    Cursor-paginated pipeline board
+    
+    Query params:
+        cursor (int): id of the last item from the previous page
+        limit (int): page size, capped at BOARD_MAX_LIMIT
+        stage (str): only return items in this stage
+        
+    Forms are loaded in the same query as the page and embedded once as form_data.
+    """
+    try:
+        cursor = request.args.get('cursor', type=int)
+        limit = request.args.get('limit', BOARD_DEFAULT_LIMIT, type=int)
+        limit = max(1, min(limit, BOARD_MAX_LIMIT))
+        stage = request.args.get('stage')
+        
+        query = ProjectPipeline.query.options(joinedload(ProjectPipeline.pricing_form))
+        if stage:
+            query = query.filter(ProjectPipeline.current_stage == stage)
+        if cursor is not None:
+            query = query.filter(ProjectPipeline.id > cursor)
+            
+        # Fetch one extra row to know whether another page exists
+        pipeline_items = query.order_by(ProjectPipeline.id.asc()).limit(limit + 1).all()
+        has_more = len(pipeline_items) > limit
+        pipeline_items = pipeline_items[:limit]
+        
         result = []
         for item in pipeline_items:
-            item_data = item.to_dict()
-            # Include the full form data
-            if item.pricing_form:
-                item_data['form_data'] = item.pricing_form.to_dict()
+            item_data = item.to_dict(include_project_details=False)
+            item_data['form_data'] = item.pricing_form.to_dict() if item.pricing_form else None
             result.append(item_data)
+            
+        return jsonify({
+            "items": result,
+            "next_cursor": pipeline_items[-1].id if has_more else None,
+            "has_more": has_more,
+            "stage": stage
+        }), 200
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error: {str(e)}")
+        return jsonify({"error": "Database error"}), 500
+
+# Per-stage counts and amounts for the board header
+@pipeline_bp.route('/pipeline/summary', methods=['GET'])
+def get_pipeline_summary():
+    try:
+        rows = PipelineStageSummary.query.filter(PipelineStageSummary.item_count > 0).all()
+        stages = [row.to_dict() for row in rows]
         
-        return jsonify(result), 200
+        return jsonify({
+            "stages": stages,
+            "totals": {
+                "count": sum(s['count'] for s in stages),
+                "quote_amount_total": sum(s['quote_amount_total'] for s in stages),
+                "contract_amount_total": sum(s['contract_amount_total'] for s in stages)
+            }
+        }), 200
     except SQLAlchemyError as e:
         current_app.logger.error(f"Database error: {str(e)}")
         return jsonify({"error": "Database error"}), 500
@@ -35,6 +124,8 @@ def update_pipeline_item(item_id):
         if not item:
             return jsonify({"error": "Pipeline item not found"}), 404
             
+        before = summary_snapshot(item)
+            
         # Track if stage is changing to "Quote Generated"
         stage_changing_to_quote = (
             'current_stage' in data and 
@@ -57,30 +148,188 @@ def update_pipeline_item(item_id):
             item.delivery_date = datetime.fromisoformat(data['delivery_date'])
             
         # If moving to Quote Generated stage and no quote exists, generate one
+        # in this transaction; its PDF render starts after the commit
         if stage_changing_to_quote and not item.pricing_form.quote_total:
-            # Generate quote automatically
-            quote_result = generate_form_quote(item.pricing_form.id)
-            if not isinstance(quote_result, tuple):  # If successful
-                item.quote_amount = quote_result['total']
+            quote_result, pdf_job = quote_form(item.pricing_form)
+            if pdf_job is not None:  # If successful
+                item.quote_amount = item.pricing_form.quote_total
             
-        # Update change log
+        # Record the stage change as a single appended row
         if 'current_stage' in data:
-            change_log = item.change_log or []
-            change_log.append({
-                'stage': data['current_stage'],
-                'changed_at': datetime.utcnow().isoformat(),
+            db.session.add(StageTransition(
+                pipeline_id=item.id,
+                stage=data['current_stage'],
+                changed_at=datetime.utcnow(),
+                changed_by=data.get('changed_by', 'system')
+            ))
+            
+        after = summary_snapshot(item)
+        if before[0] != after[0]:
+            record_pipeline_event(STAGE_CHANGE, {
+                'id': item.id,
+                'from_stage': before[0],
+                'stage': after[0],
                 'changed_by': data.get('changed_by', 'system')
             })
-            item.change_log = change_log
+        if before[1:] != after[1:]:
+            record_pipeline_event(QUOTE_UPDATE, {
+                'id': item.id,
+                'quote_amount': item.quote_amount,
+                'contract_amount': item.contract_amount
+            })
+        apply_summary_change(before, after)
+        db.session.commit()
+        start_pdf_renders()
+        include_change_log = request.args.get('include_change_log', 'false').lower() == 'true'
+        return jsonify(item.to_dict(include_change_log=include_change_log)), 200
+        
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Database error: {str(e)}")
+        return jsonify({"error": "Database error"}), 500
+
+# Move many pipeline items to one stage
+@pipeline_bp.route('/pipeline/bulk-transition', methods=['POST'])
+def bulk_transition_pipeline_items():
+    """
+    Move a list of pipeline items to a target stage in a single transaction
+    
+    Body:
+        ids (list[int]): pipeline item ids
+        stage (str): target stage
+        changed_by (str): recorded on each stage transition
+        
+    Unlike the single-item PUT, this does not auto-generate quotes for items
+    moved into "Quote Generated".
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    stage = data.get('stage')
+    changed_by = data.get('changed_by', 'system')
+    
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+        return jsonify({"error": "ids must be a non-empty list of integers"}), 400
+    if len(ids) > BULK_TRANSITION_MAX_IDS:
+        return jsonify({"error": f"At most {BULK_TRANSITION_MAX_IDS} ids can be moved at once"}), 400
+    if not isinstance(stage, str) or not stage:
+        return jsonify({"error": "stage is required"}), 400
+        
+    try:
+        ids = list(dict.fromkeys(ids))
+        rows = db.session.query(
+            ProjectPipeline.id,
+            ProjectPipeline.current_stage,
+            ProjectPipeline.quote_amount,
+            ProjectPipeline.contract_amount
+        ).filter(ProjectPipeline.id.in_(ids)).all()
+        current = {row.id: row for row in rows}
+        moving = [row for row in rows if row.current_stage != stage]
+        
+        if moving:
+            now = datetime.utcnow()
+            moving_ids = [row.id for row in moving]
+            db.session.execute(
+                update(ProjectPipeline)
+                .where(ProjectPipeline.id.in_(moving_ids))
+                .values(current_stage=stage, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.execute(insert(StageTransition), [
+                {'pipeline_id': item_id, 'stage': stage, 'changed_at': now, 'changed_by': changed_by}
+                for item_id in moving_ids
+            ])
+            apply_bulk_stage_move([summary_snapshot(row) for row in moving], stage)
+            record_pipeline_events(STAGE_CHANGE, [
+                {'id': row.id, 'from_stage': row.current_stage, 'stage': stage, 'changed_by': changed_by}
+                for row in moving
+            ])
             
         db.session.commit()
-        return jsonify(item.to_dict()), 200
+        
+        results = []
+        for item_id in ids:
+            row = current.get(item_id)
+            if row is None:
+                results.append({'id': item_id, 'status': 'not_found'})
+            elif row.current_stage == stage:
+                results.append({'id': item_id, 'status': 'unchanged'})
+            else:
+                results.append({'id': item_id, 'status': 'moved', 'from_stage': row.current_stage})
+                
+        return jsonify({
+            "stage": stage,
+            "moved": len(moving),
+            "results": results
+        }), 200
         
     except SQLAlchemyError as e:
         db.session.rollback()
         current_app.logger.error(f"Database error: {str(e)}")
         return jsonify({"error": "Database error"}), 500
 
+# Live stream of pipeline changes
+@pipeline_bp.route('/pipeline/events', methods=['GET'])
+def stream_pipeline_changes():
+    """
+    Server-Sent Events stream of stage-change, quote-update and new-item events
+    
+    Reconnecting clients send Last-Event-ID (or ?last_event_id=) and receive
+    only the events they missed; new clients start from the latest event.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else latest_event_id()
+    except ValueError:
+        return jsonify({"error": "Invalid Last-Event-ID"}), 400
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error: {str(e)}")
+        return jsonify({"error": "Database error"}), 500
+        
+    return Response(
+        stream_with_context(stream_pipeline_events(last_event_id)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Keep nginx from buffering the stream
+        }
+    )
+
+# Download every quote PDF in a stage
+@pipeline_bp.route('/pipeline/export/quotes', methods=['GET'])
+def export_stage_quotes():
+    """
+    Stream a ZIP of the quote PDFs for all pipeline items in ?stage=
+    
+    The archive is built while it downloads; missing PDFs are rendered in
+    parallel just ahead of the entry being written.
+    """
+    stage = request.args.get('stage')
+    if not stage:
+        return jsonify({"error": "stage is required"}), 400
+        
+    filename = f"quotes-{secure_filename(stage) or 'stage'}-{datetime.utcnow():%Y-%m-%d}.zip"
+    return Response(
+        stream_with_context(stream_quote_export(stage)),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+# Get stage history for a pipeline item
+@pipeline_bp.route('/pipeline/<int:item_id>/change-log', methods=['GET'])
+def get_pipeline_change_log(item_id):
+    try:
+        item = ProjectPipeline.query.get(item_id)
+        if not item:
+            return jsonify({"error": "Pipeline item not found"}), 404
+            
+        return jsonify([t.to_dict() for t in item.transitions]), 200
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error: {str(e)}")
+        return jsonify({"error": "Database error"}), 500
+
 # Automatically create pipeline item when form is submitted
 def create_pipeline_item(form_id):
     try:
@@ -95,6 +344,13 @@ def create_pipeline_item(form_id):
             current_stage='Pricing Submissions'
         )
         db.session.add(pipeline_item)
+        db.session.flush()
+        apply_summary_change(None, summary_snapshot(pipeline_item))
+        record_pipeline_event(NEW_ITEM, {
+            'id': pipeline_item.id,
+            'form_id': form_id,
+            'stage': pipeline_item.current_stage
+        })
         db.session.commit()
         return pipeline_item
     except SQLAlchemyError as e:
@@ -1,10 +1,18 @@
-from flask import Blueprint, request, jsonify, current_app, send_from_directory
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from werkzeug.exceptions import NotFound
 from models import db, PricingForm
-from datetime import datetime, timedelta
+from utils.quote_calculator import form_to_calculation_input, get_pricing_rules
+from utils.quote_cache import cached_calculate_quote, quote_cache
+from utils.ingestion import ingested_data_files
+from utils.quote_batch import NDJSON_MIMETYPES, iter_ndjson, price_rows
+from utils.quote_sweep import sweep_quotes
+from utils.validators import validate_quote_input
+from utils.pdf_generator import quote_pdf_filename, render_pdf, render_pdf_bytes, reuse_cached_pdf
+from utils.pdf_cache import send_pdf_bytes, send_stored_file
+from utils.storage import QUOTE_PDF, index_stored_file, storage_path
+from utils.pdf_jobs import enqueue_pdf_render, get_pdf_job, pdf_metrics, start_pdf_renders
+from datetime import date
 import json
-import os
-from fpdf import FPDF
-import uuid
 
 quote_bp = Blueprint('quote', __name__, url_prefix='/api')
 
@@ -17,57 +25,151 @@ def generate_form_quote(form_id):
         if not form:
             return jsonify({"error": "Form not found"}), 404
 
-        # Transform form data for calculation
-        calculation_data = {
-            'num_dashboards': len(form.expected_deliverables) if form.expected_deliverables else 0,
-            'num_widgets': form.number_of_widgets or 0,
-            'data_sources': form.data_sources or [],
-            'database_tables': [{'records': db.records or 0} for db in form.databases] if form.databases else [],
-            'num_apis': form.number_of_integrations or 0,
-            'features': form.interactivity_needed or [],
-            'include_logo': 'branding' in (form.customization_needs or []),
-            'custom_colors': 'colors' in (form.customization_needs or []),
-            'custom_fonts': 'fonts' in (form.customization_needs or []),
-            'support_plan': form.support_plan_required or 'basic',
-            'support_hours': 10 if form.support_plan_required == 'priority' else 0,
-            'support_months': 1 if form.support_plan_required == 'dedicated' else 0
-        }
-
-        # Calculate the quote
-        quote_result = calculate_quote(calculation_data)
-        
-        # Generate PDF
-        pdf_url = generate_quote_pdf({
-            'total': quote_result['total'],
-            'breakdown': quote_result['breakdown'],
-            'valid_until': quote_result['valid_until'],
-            'form_data': {
-                'client_name': form.client_name,
-                'project_title': form.project_title
-            }
-        })
-
-        # Update form with quote data
-        form.quote_total = quote_result['total']
-        form.quote_breakdown = json.dumps(quote_result['breakdown'])
-        form.quote_pdf_url = pdf_url
-        form.quote_generated_at = datetime.utcnow()
+        quote_result, pdf_job = quote_form(form)
+        if pdf_job is None:
+            return jsonify({"error": quote_result['error']}), 400
         db.session.commit()
+        start_pdf_renders()
 
         return jsonify({
             'total': quote_result['total'],
             'breakdown': quote_result['breakdown'],
-            'pdf_url': pdf_url,
-            'valid_until': quote_result['valid_until']
+            'pdf_url': pdf_job['pdf_url'],
+            'pdf_job': pdf_job,
+            'valid_until': quote_result['valid_until'],
+            'pricing_version': quote_result['pricing_version']
         })
 
     except Exception as e:
         current_app.logger.error(f"Form quote generation error: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+def quote_form(form):
+    """
+    Price a form and queue its PDF in the current transaction
+    
+    The caller commits and then calls start_pdf_renders().
+    
+    Returns:
+        tuple: (quote result, PDF job reference); the reference is None when
+            pricing failed and the form is left unchanged
+    """
+    # Transform form data for calculation
+    calculation_data = form_to_calculation_input(form.to_dict(), ingested_data_files(form.id))
+
+    # Calculate the quote
+    quote_result = cached_calculate_quote(calculation_data)
+    if not quote_result['success']:
+        return quote_result, None
+
+    # Update form with quote data; the PDF URL is set when the render job finishes
+    form.quote_total = quote_result['total']
+    form.quote_breakdown = quote_result['breakdown']
+    form.quote_pricing_version = quote_result['pricing_version']
+    form.quote_valid_until = date.fromisoformat(quote_result['valid_until'])
+    form.quote_pdf_url = None
+
+    pdf_job = queue_quote_pdf({
+        'total': quote_result['total'],
+        'breakdown': quote_result['breakdown'],
+        'valid_until': quote_result['valid_until'],
+        'form_data': {
+            'client_name': form.client_name,
+            'project_title': form.project_title
+        }
+    }, form_id=form.id)
+    return quote_result, pdf_job
+
+@quote_bp.route('/pricing-rules', methods=['GET'])
+def get_current_pricing_rules():
+    """Return the active pricing rules table and its version"""
+    rules = get_pricing_rules()
+    return jsonify({
+        'version': rules.version,
+        'rules': rules.table
+    })
+
+@quote_bp.route('/quotes/cache-stats', methods=['GET'])
+def get_quote_cache_stats():
+    """Hit/miss counters of this worker's quote cache"""
+    return jsonify(quote_cache.stats())
+
+@quote_bp.route('/quotes/batch', methods=['POST'])
+def generate_batch_quotes():
+    """
+    Price many calculation inputs and stream the results as NDJSON
+    
+    Accepts a JSON array or an NDJSON body (Content-Type application/x-ndjson).
+    Each output line carries the input's index and either the quote or its
+    errors; a bad row never aborts the batch. PDFs are only queued with ?pdf=true.
+    """
+    include_pdf = request.args.get('pdf', 'false').lower() == 'true'
+    
+    if request.mimetype in NDJSON_MIMETYPES:
+        rows = iter_ndjson(request.stream)
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return jsonify({"error": "Expected a JSON array or NDJSON body"}), 400
+            
+    chunk_size = current_app.config['QUOTE_BATCH_CHUNK_SIZE']
+    max_rows = current_app.config['QUOTE_BATCH_MAX_ROWS']
+    
+    def generate():
+        for index, row, result in price_rows(rows, chunk_size, max_rows):
+            line = {'index': index, **result}
+            if include_pdf and result.get('success'):
+                pdf_job = queue_quote_pdf({
+                    'total': result['total'],
+                    'breakdown': result['breakdown'],
+                    'valid_until': result['valid_until'],
+                    'form_data': {
+                        'client_name': row.get('client_name', ''),
+                        'project_title': row.get('project_title', '')
+                    }
+                })
+                db.session.commit()
+                start_pdf_renders()
+                line['pdf_url'] = pdf_job['pdf_url']
+                line['pdf_job'] = pdf_job
+            yield json.dumps(line) + '\n'
+            
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@quote_bp.route('/quotes/sweep', methods=['POST'])
+def generate_quote_sweep():
+    """
+    What-if grid of quote totals over ranges of negotiable parameters
+    
+    Body:
+        base (dict): calculation input the grid varies around
+        ranges (dict): parameter -> list of values or {"start", "stop", "step"}
+        max_cells (int): optional, lower than QUOTE_SWEEP_MAX_CELLS
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "No data provided"}), 400
+        
+    is_valid, base = validate_quote_input(data.get('base') or {})
+    if not is_valid:
+        return jsonify({"error": "Validation failed", "details": base}), 400
+        
+    max_cells = current_app.config['QUOTE_SWEEP_MAX_CELLS']
+    if isinstance(data.get('max_cells'), int) and data['max_cells'] > 0:
+        max_cells = min(max_cells, data['max_cells'])
+        
+    try:
+        return jsonify(sweep_quotes(base, data.get('ranges'), max_cells)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
 @quote_bp.route('/generate-quote', methods=['POST'])
 def generate_direct_quote():
-    """Generate quote directly from posted data"""
+    """
+    Generate quote directly from posted data
+    
+    Returns the quote with a PDF job, or with ?format=pdf the PDF itself.
+    """
     try:
         data = request.get_json()
         
@@ -76,10 +178,11 @@ def generate_direct_quote():
             return jsonify({"error": "No data provided"}), 400
 
         # Calculate the quote
-        quote_result = calculate_quote(data)
+        quote_result = cached_calculate_quote(data)
+        if not quote_result['success']:
+            return jsonify({"error": quote_result['error']}), 400
 
-        # Generate PDF
-        pdf_url = generate_quote_pdf({
+        pdf_data = {
             'total': quote_result['total'],
             'breakdown': quote_result['breakdown'],
             'valid_until': quote_result['valid_until'],
@@ -87,133 +190,65 @@ def generate_direct_quote():
                 'client_name': data.get('client_name', ''),
                 'project_title': data.get('project_title', '')
             }
-        })
+        }
+        
+        # ?format=pdf answers with the document itself, rendered in memory
+        if request.args.get('format') == 'pdf':
+            filename = quote_pdf_filename('project_quote', pdf_data)
+            return send_pdf_bytes(
+                render_pdf_bytes('project_quote', pdf_data), filename,
+                etag=filename[:-len('.pdf')]
+            )
+
+        # Queue PDF
+        pdf_job = queue_quote_pdf(pdf_data)
+        db.session.commit()
+        start_pdf_renders()
 
         return jsonify({
             'total': quote_result['total'],
             'breakdown': quote_result['breakdown'],
-            'pdf_url': pdf_url,
-            'valid_until': quote_result['valid_until']
+            'pdf_url': pdf_job['pdf_url'],
+            'pdf_job': pdf_job,
+            'valid_until': quote_result['valid_until'],
+            'pricing_version': quote_result['pricing_version']
         })
 
     except Exception as e:
         current_app.logger.error(f"Direct quote generation error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-def calculate_quote(data):
-    """Calculate quote breakdown from input data"""
-    breakdown = {
-        'dashboards': data.get('num_dashboards', 0) * 1000,
-        'widgets': data.get('num_widgets', 0) * 20,
-        'data_files': len(data.get('data_sources', [])) * 40,
-        'database_tables': calculate_database_costs(data.get('database_tables', [])),
-        'apis': data.get('num_apis', 0) * 1200,
-        'features': len(data.get('features', [])) * 20,
-        'branding': calculate_branding_costs(data),
-        'support': calculate_support_costs(data)
-    }
-
-    total = sum(breakdown.values())
-
-    return {
-        'total': total,
-        'breakdown': breakdown,
-        'valid_until': (datetime.now() + timedelta(days=30)).isoformat()
-    }
-
-def calculate_database_costs(tables):
-    """Calculate database costs based on record counts"""
-    cost = 0
-    for table in tables:
-        records = table.get('records', 0)
-        if records < 1000:
-            cost += 40
-        elif records < 10000:
-            cost += 100
-        elif records < 100000:
-            cost += 200
-        elif records < 1000000:
-            cost += 300
-        else:
-            cost += 700
-    return cost
-
-def calculate_branding_costs(data):
-    """Calculate branding customization costs"""
-    cost = 0
-    if data.get('include_logo', False):
-        cost += 40
-    if data.get('custom_colors', False):
-        cost += data.get('num_widgets', 0) * 20
-        cost += data.get('num_dashboards', 0) * 20
-    if data.get('custom_fonts', False):
-        cost += data.get('num_widgets', 0) * 20
-    return cost
-
-def calculate_support_costs(data):
-    """Calculate support plan costs"""
-    plan = data.get('support_plan', 'basic')
-    if plan == 'priority':
-        return 40 * data.get('support_hours', 0)
-    elif plan == 'dedicated':
-        return 400 * data.get('support_months', 0)
-    return 0
+@quote_bp.route('/quotes/jobs/metrics', methods=['GET'])
+def get_pdf_job_metrics():
+    """PDF render queue depth and render times"""
+    return jsonify(pdf_metrics())
+
+@quote_bp.route('/quotes/jobs/<job_id>', methods=['GET'])
+def get_pdf_job_status(job_id):
+    """Status of a PDF render job; pdf_url is set once it is done"""
+    job = get_pdf_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+def queue_quote_pdf(quote_data, form_id=None):
+    """Queue the Project Quote PDF in the current transaction and return the job reference"""
+    filename = quote_pdf_filename('project_quote', quote_data)
+    return enqueue_pdf_render(
+        'project_quote', quote_data, storage_path(filename),
+        f"/uploads/{filename}", form_id=form_id
+    )
 
 def generate_quote_pdf(quote_data):
     """Generate PDF quote document"""
     try:
-        # Create PDF
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        
-        # Add title
-        pdf.set_font("Arial", 'B', 16)
-        pdf.cell(200, 10, txt="Project Quote", ln=1, align='C')
-        pdf.ln(10)
-        
-        # Add client/project info
-        pdf.set_font("Arial", size=12)
-        if quote_data.get('form_data', {}).get('client_name'):
-            pdf.cell(200, 10, txt=f"Client: {quote_data['form_data']['client_name']}", ln=1)
-        if quote_data.get('form_data', {}).get('project_title'):
-            pdf.cell(200, 10, txt=f"Project: {quote_data['form_data']['project_title']}", ln=1)
-        pdf.ln(10)
-        
-        # Add quote details
-        pdf.set_font("Arial", 'B', 14)
-        pdf.cell(200, 10, txt=f"Total: ${quote_data['total']:,}", ln=1)
-        pdf.ln(10)
-        
-        # Add breakdown table
-        pdf.set_font("Arial", 'B', 12)
-        pdf.cell(120, 10, "Item", border=1)
-        pdf.cell(50, 10, "Cost", border=1, align='R')
-        pdf.ln()
-        
-        pdf.set_font("Arial", size=10)
-        for item, cost in quote_data['breakdown'].items():
-            pdf.cell(120, 10, item.replace('_', ' ').title(), border=1)
-            pdf.cell(50, 10, f"${cost:,}", border=1, align='R')
-            pdf.ln()
-        
-        # Add total row
-        pdf.set_font("Arial", 'B', 12)
-        pdf.cell(120, 10, "TOTAL", border=1)
-        pdf.cell(50, 10, f"${quote_data['total']:,}", border=1, align='R')
-        pdf.ln()
-        
-        # Add validity
-        pdf.ln(10)
-        pdf.cell(200, 10, txt=f"Valid until: {quote_data['valid_until'][:10]}", ln=1)
-        
-        # Save to uploads folder
-        upload_folder = os.path.join(current_app.root_path, 'instance', 'uploads')
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        filename = f"quote_{uuid.uuid4().hex}.pdf"
-        filepath = os.path.join(upload_folder, filename)
-        pdf.output(filepath)
+        # Save to upload storage
+        filename = quote_pdf_filename('project_quote', quote_data)
+        filepath = storage_path(filename)
+        if not reuse_cached_pdf(filepath):
+            render_pdf('project_quote', quote_data, filepath)
+            index_stored_file(filename, kind=QUOTE_PDF, path=filepath)
+            db.session.commit()
         
         return f"/uploads/{filename}"
         
@@ -223,10 +258,9 @@ def generate_quote_pdf(quote_data):
     
 @quote_bp.route('/instance/uploads/<filename>')
 def serve_pdf(filename):
-    """Serve generated PDF files from the uploads directory"""
+    """Serve generated PDF files from upload storage"""
     try:
-        upload_folder = os.path.join(current_app.root_path, 'instance', 'uploads')
-        return send_from_directory(upload_folder, filename)
-    except FileNotFoundError:
+        return send_stored_file(filename, mimetype='application/pdf')
+    except NotFound:
         current_app.logger.error(f"PDF not found: {filename}")
         return jsonify({"error": "File not found"}), 404
\ No newline at end of file
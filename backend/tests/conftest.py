@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import event
+from app import create_app
+from config import TestingConfig
+from models import db, PricingForm, ProjectPipeline
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """App on a throwaway SQLite database and upload folder; background work runs inline"""
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setattr(TestingConfig, 'PDF_RENDER_WORKERS', 0)
+    monkeypatch.setattr(TestingConfig, 'INGEST_WORKERS', 0)
+    monkeypatch.setattr(TestingConfig, 'FORM_VALIDATE_WORKERS', 0)
+    app = create_app('testing')
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_form(app):
+    """Insert a minimal valid form with its pipeline item"""
+    def make(**fields):
+        values = {
+            'pricing_analyst_name': 'pricing analyst',
+            'client_name': 'Client',
+            'client_type': 'B2B',
+            'industry_sector': 'Retail',
+            'project_title': 'Project',
+            'subscription_plan': 'Starter Lite (Monthly)',
+            'data_sources': ['CSV'],
+            'databases': ['MySQL'],
+            'number_of_widgets': 3
+        }
+        values.update(fields)
+        form = PricingForm(**values)
+        db.session.add(form)
+        db.session.flush()
+        db.session.add(ProjectPipeline(form_id=form.id, current_stage='Pricing Submissions'))
+        db.session.commit()
+        return form
+    return make
+
+
+@pytest.fixture
+def count_queries(app):
+    """List that collects every SQL statement executed while the test runs"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', record)
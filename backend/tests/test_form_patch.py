@@ -0,0 +1,31 @@
+import datetime
+
+from models import db, PricingForm
+
+
+JSON_PATCH = 'application/json-patch+json'
+
+
+def _patch(client, form_id, operations):
+    return client.patch(f'/api/forms/{form_id}', json=operations, content_type=JSON_PATCH)
+
+
+def test_patch_validates_the_touched_field(client, make_form):
+    form = make_form(start_date=datetime.date(2026, 11, 1), end_date=datetime.date(2027, 1, 31))
+
+    response = _patch(client, form.id, [{'op': 'replace', 'path': '/start_date', 'value': '2026-12-01'}])
+
+    assert response.status_code == 200, response.json
+    assert response.json['changed'] == ['start_date']
+    assert db.session.get(PricingForm, form.id).start_date == datetime.date(2026, 12, 1)
+
+
+def test_patch_rejects_an_unparseable_start_date_next_to_an_end_date(client, make_form):
+    form = make_form(start_date=datetime.date(2026, 11, 1), end_date=datetime.date(2027, 1, 31))
+
+    response = _patch(client, form.id, [{'op': 'replace', 'path': '/start_date', 'value': '01/12/2026'}])
+
+    assert response.status_code == 400
+    assert response.json['error'] == 'Validation failed'
+    db.session.expire_all()
+    assert db.session.get(PricingForm, form.id).start_date == datetime.date(2026, 11, 1)
@@ -0,0 +1,128 @@
+import hashlib
+import io
+import json
+import os
+
+from models import db, PricingForm, StoredFile
+from models.models import FormDocument
+from utils.uploads import INCOMING_DIR
+from utils.storage import storage_root
+
+
+FORM_FIELDS = {
+    'pricing_analyst_name': 'pricing analyst',
+    'client_name': 'Upload Client',
+    'client_type': 'B2B',
+    'industry_sector': 'Retail',
+    'project_title': 'Upload Project',
+    'subscription_plan': 'Starter Lite (Monthly)',
+    'data_sources': '["CSV"]'
+}
+
+# What the form UI posts: the fields as one JSON 'data' part, untouched inputs left blank
+FRONTEND_DATA = dict(
+    FORM_FIELDS,
+    data_sources=['CSV'],
+    country='Germany', city='', currency='', email='buyer@example.com', phone_number='',
+    company_size=120, annual_revenue=0, budget_range=0, number_of_integrations=0,
+    start_date='2026-11-01', end_date='2027-01-31', expected_deliverables=[], target_audience=[],
+    has_bi_team=False, volume_of_data='Small (<1M)', support_plan_required='Basic',
+    wants_demo=True, company_website='https://demo.example', use_case_description='Sales demo',
+    demo_scheduled_at='2026-11-05T10:00:00', reference_links='https://a.example,https://b.example',
+    number_of_verticals='', demo_verticals=['Retail', 'Finance'], custom_vertical='',
+    timezone='Europe/Berlin', meeting_link='https://meet.example/demo', next_steps='Send the deck',
+    client_suggestions='', wants_business_analysis=False, case_description='', stakeholders='',
+    resources_status='', has_support_team='', has_complex_math='', client_type_tag='demo'
+)
+
+CSV_CONTENT = b'region,revenue\nnorth,10\nsouth,20\neast,30\n'
+
+
+def _incoming_files():
+    incoming = os.path.join(storage_root(), INCOMING_DIR)
+    return os.listdir(incoming) if os.path.isdir(incoming) else []
+
+
+def _post_form(client, fields, files=()):
+    data = dict(fields)
+    data['files'] = [(io.BytesIO(content), name) for name, content in files]
+    return client.post('/api/forms', data=data, content_type='multipart/form-data')
+
+
+def test_submit_form_with_upload_stores_and_profiles_the_file(client):
+    response = _post_form(client, FORM_FIELDS, [('sales.csv', CSV_CONTENT)])
+    assert response.status_code == 201, response.json
+
+    form = db.session.get(PricingForm, response.json['form_id'])
+    assert form.client_name == 'Upload Client'
+    assert form.data_sources == ['CSV']
+
+    document = FormDocument.query.filter_by(form_id=form.id).one()
+    checksum = hashlib.sha256(CSV_CONTENT).hexdigest()
+    assert document.file_name == 'sales.csv'
+    assert os.path.basename(document.file_path) == f"{checksum}.csv"
+    with open(document.file_path, 'rb') as f:
+        assert f.read() == CSV_CONTENT
+    assert StoredFile.query.filter_by(checksum=checksum).count() == 1
+    assert document.ingest_status == 'done'
+    assert (document.row_count, document.column_count) == (3, 2)
+    assert _incoming_files() == []
+
+
+def test_invalid_form_discards_its_uploads(client):
+    fields = dict(FORM_FIELDS, pricing_analyst_name='analyst')
+
+    response = _post_form(client, fields, [('sales.csv', CSV_CONTENT)])
+
+    assert response.status_code == 400
+    assert 'pricing_analyst_name' in response.json['errors']
+    assert PricingForm.query.count() == 0
+    assert _incoming_files() == []
+
+
+def test_truncated_body_is_rejected_without_storing_anything(client):
+    boundary = 'test-boundary'
+    body = ''.join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+        for name, value in FORM_FIELDS.items()
+    )
+    body += (
+        f'--{boundary}\r\n'
+        'Content-Disposition: form-data; name="files"; filename="sales.csv"\r\n'
+        'Content-Type: text/csv\r\n\r\n'
+    )
+    body = body.encode('utf-8') + CSV_CONTENT  # the closing boundary never arrives
+
+    response = client.post('/api/forms', data=body,
+                           content_type=f'multipart/form-data; boundary={boundary}')
+
+    assert response.status_code == 400
+    assert PricingForm.query.count() == 0
+    assert StoredFile.query.count() == 0
+    assert _incoming_files() == []
+
+
+def test_submit_form_accepts_the_form_ui_payload(client):
+    response = client.post('/api/forms', content_type='multipart/form-data', data={
+        'data': json.dumps(FRONTEND_DATA),
+        'files': [(io.BytesIO(CSV_CONTENT), 'sales.csv')]
+    })
+    assert response.status_code == 201, response.json
+
+    form = db.session.get(PricingForm, response.json['form_id'])
+    assert form.currency == 'EUR'
+    assert form.reference_links == 'https://a.example,https://b.example'
+    assert form.demo_verticals == 'Retail,Finance'
+    assert form.number_of_verticals is None
+    assert (form.timezone, form.meeting_link, form.next_steps) == \
+        ('Europe/Berlin', 'https://meet.example/demo', 'Send the deck')
+    assert form.client_type_tag == 'demo'
+    assert FormDocument.query.filter_by(form_id=form.id).count() == 1
+
+
+def test_submit_form_rejects_a_malformed_data_part(client):
+    response = client.post('/api/forms', content_type='multipart/form-data',
+                           data={'data': '{"client_name": '})
+
+    assert response.status_code == 400
+    assert PricingForm.query.count() == 0
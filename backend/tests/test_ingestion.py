@@ -0,0 +1,39 @@
+import io
+
+import pytest
+
+from utils import ingestion
+from utils.ingestion import _json_array_items, profile_data_file
+
+
+def test_json_array_items_streams_elements(monkeypatch):
+    monkeypatch.setattr(ingestion, 'READ_CHUNK_SIZE', 4)
+    document = io.StringIO('[{"a": 1}, {"a": 2, "b": "x,y]"}, [1, 2, 3]]')
+
+    assert list(_json_array_items(document)) == [{'a': 1}, {'a': 2, 'b': 'x,y]'}, [1, 2, 3]]
+
+
+def test_json_array_items_bounds_the_buffer(monkeypatch):
+    monkeypatch.setattr(ingestion, 'READ_CHUNK_SIZE', 16)
+    monkeypatch.setattr(ingestion, 'MAX_JSON_ELEMENT_CHARS', 64)
+    reads = []
+
+    class Document(io.StringIO):
+        def read(self, size=-1):
+            reads.append(size)
+            return super().read(size)
+
+    # An unterminated string never decodes; reading stops at the bound, not at EOF
+    document = Document('[{"a": "' + 'x' * 10000)
+    with pytest.raises(ValueError, match='exceeds 64 characters'):
+        list(_json_array_items(document))
+    assert len(reads) < 10
+
+
+def test_profile_json_array(tmp_path):
+    path = tmp_path / 'rows.json'
+    path.write_text('[{"region": "north", "revenue": 10}, {"region": "south", "units": 3}]')
+
+    profile = profile_data_file(str(path), 'json')
+
+    assert (profile['row_count'], profile['column_count']) == (2, 3)
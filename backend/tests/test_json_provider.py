@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from routes import pipeline_routes
+from utils.json_provider import stream_json_array
+
+
+def _failing_items():
+    yield {'id': 1}
+    yield {'id': 2}
+    raise RuntimeError('connection lost')
+
+
+def _body(app, *args, **kwargs):
+    with app.test_request_context():
+        response = stream_json_array(*args, **kwargs)
+        return ''.join(chunk if isinstance(chunk, str) else chunk.decode('utf-8') for chunk in response.response)
+
+
+def test_stream_closes_an_enveloped_array_with_an_error(app):
+    body = _body(app, _failing_items(), {'total': 3}, key='forms')
+
+    assert json.loads(body) == {
+        'total': 3,
+        'forms': [{'id': 1}, {'id': 2}],
+        'error': 'Response truncated by a server error'
+    }
+
+
+def test_stream_aborts_a_bare_array(app):
+    with app.test_request_context():
+        response = stream_json_array(_failing_items())
+        chunks = []
+        with pytest.raises(RuntimeError, match='connection lost'):
+            for chunk in response.response:
+                chunks.append(chunk if isinstance(chunk, str) else chunk.decode('utf-8'))
+
+    # What the client received before the abort must not parse as a complete list
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(''.join(chunks))
+
+
+def test_streamed_pipeline_list_aborts_on_error(client, make_form, monkeypatch):
+    make_form()
+    make_form()
+    item_data = pipeline_routes._pipeline_item_data
+    seen = []
+
+    def fail_on_second_item(item, include_change_log):
+        seen.append(item)
+        if len(seen) == 2:
+            raise RuntimeError('connection lost')
+        return item_data(item, include_change_log)
+
+    monkeypatch.setattr(pipeline_routes, '_pipeline_item_data', fail_on_second_item)
+
+    response = client.get('/api/pipeline?stream=true', buffered=False)
+    assert response.status_code == 200
+    with pytest.raises(RuntimeError, match='connection lost'):
+        response.get_data()
+
+
+def test_stream_envelope_without_failure(app):
+    body = _body(app, iter([{'id': 1}]), {}, key='forms')
+
+    assert json.loads(body) == {'forms': [{'id': 1}]}
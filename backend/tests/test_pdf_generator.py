@@ -0,0 +1,40 @@
+import re
+
+import pytest
+
+from utils.pdf_generator import TEMPLATE, QuotePdfTemplate, render_project_quote_pdf, render_quote_pdf
+
+
+QUOTE_DATA = {
+    'client_name': 'Acme GmbH',
+    'project_title': 'Sales dashboards',
+    'form_data': {'client_name': 'Acme GmbH', 'project_title': 'Sales dashboards'},
+    'breakdown': {'dashboards': 3000, 'widgets': 500, 'data_files': 100, 'bi_developer': 24000},
+    'total': 27600,
+    'valid_until': '2026-11-17'
+}
+
+
+def _without_creation_date(document):
+    return re.sub(rb'/CreationDate \([^)]*\)', b'', bytes(document))
+
+
+def _render_uncached(monkeypatch, render):
+    with monkeypatch.context() as patched:
+        patched.setattr(QuotePdfTemplate, 'static_cell',
+                        lambda self, pdf, *args, **kwargs: QuotePdfTemplate.cell(pdf, *args, **kwargs))
+        return render(QUOTE_DATA)
+
+
+@pytest.mark.parametrize('render', [render_quote_pdf, render_project_quote_pdf])
+def test_replayed_static_cells_match_fpdf_output(monkeypatch, render):
+    # static_cell replays content stream bytes through fpdf2 internals, which is
+    # why fpdf2 is pinned exactly; this catches an upgrade that changes either
+    expected = _without_creation_date(_render_uncached(monkeypatch, render))
+
+    TEMPLATE.clear()
+    first = render(QUOTE_DATA)
+    replayed = render(QUOTE_DATA)
+
+    assert _without_creation_date(first) == expected
+    assert _without_creation_date(replayed) == expected
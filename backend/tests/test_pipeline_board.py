@@ -0,0 +1,33 @@
+import pytest
+
+
+def _board_page_queries(client, count_queries, **params):
+    count_queries.clear()
+    response = client.get('/api/pipeline', query_string={'view': 'board', **params})
+    assert response.status_code == 200
+    return len(count_queries), response.get_json()
+
+
+@pytest.mark.parametrize('items', [1, 5, 40])
+def test_board_page_query_count_is_constant(client, make_form, count_queries, items):
+    for i in range(items):
+        make_form(client_name=f"Client {i}", project_title=f"Project {i}")
+
+    queries, page = _board_page_queries(client, count_queries, limit=50)
+
+    assert len(page['items']) == items
+    assert all(item['form_data']['id'] == item['form_id'] for item in page['items'])
+    assert queries == 1
+
+
+def test_board_cursor_pages_query_count(client, make_form, count_queries):
+    for i in range(12):
+        make_form(client_name=f"Client {i}")
+
+    queries, first = _board_page_queries(client, count_queries, limit=5)
+    assert queries == 1
+    assert first['has_more'] is True
+
+    queries, second = _board_page_queries(client, count_queries, limit=5, cursor=first['next_cursor'])
+    assert queries == 1
+    assert [item['id'] for item in second['items']] == list(range(6, 11))
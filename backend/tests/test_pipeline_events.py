@@ -0,0 +1,68 @@
+import pytest
+from models import db, PipelineEvent
+from utils.pipeline_events import stream_pipeline_events
+
+
+@pytest.fixture
+def fast_stream(app):
+    app.config.update(
+        PIPELINE_EVENTS_POLL_SECONDS=0,
+        PIPELINE_EVENTS_HEARTBEAT_SECONDS=0,
+        PIPELINE_EVENTS_MAX_STREAM_SECONDS=60
+    )
+    return app
+
+
+def _add_event(event_id):
+    db.session.add(PipelineEvent(id=event_id, event_type='stage-change', payload={'id': event_id}))
+    db.session.commit()
+
+
+def _next_event_ids(stream, limit=10):
+    """Ids of the events sent before the next keep-alive"""
+    ids = []
+    for frame in stream:
+        if frame.startswith(': keep-alive'):
+            return ids
+        if frame.startswith('id: '):
+            ids.append(int(frame.split('\n')[0][4:]))
+        if len(ids) >= limit:
+            return ids
+    return ids
+
+
+def test_events_after_a_gap_wait_for_the_late_commit(fast_stream):
+    fast_stream.config['PIPELINE_EVENTS_GAP_GRACE_SECONDS'] = 60
+    _add_event(1)
+    _add_event(3)  # id 2 belongs to a transaction that has not committed yet
+    stream = stream_pipeline_events(0)
+    next(stream)  # retry: frame
+
+    assert _next_event_ids(stream) == [1]
+    assert _next_event_ids(stream) == []
+
+    _add_event(2)
+    assert _next_event_ids(stream) == [2, 3]
+    stream.close()
+
+
+def test_gap_is_skipped_after_the_grace_period(fast_stream):
+    fast_stream.config['PIPELINE_EVENTS_GAP_GRACE_SECONDS'] = 0
+    _add_event(1)
+    _add_event(3)
+    stream = stream_pipeline_events(0)
+    next(stream)
+
+    assert _next_event_ids(stream) == [1, 3]
+    stream.close()
+
+
+def test_resume_from_last_event_id(fast_stream):
+    fast_stream.config['PIPELINE_EVENTS_GAP_GRACE_SECONDS'] = 60
+    for event_id in (1, 2, 3):
+        _add_event(event_id)
+    stream = stream_pipeline_events(2)
+    next(stream)
+
+    assert _next_event_ids(stream) == [3]
+    stream.close()
@@ -0,0 +1,42 @@
+import routes.pipeline_routes as pipeline_routes
+from models import db, PdfJob, PipelineEvent, PipelineStageSummary, PricingForm, ProjectPipeline, StageTransition
+from utils.pipeline_summary import rebuild_stage_summary
+
+
+def test_auto_quote_commits_with_stage_change(client, make_form):
+    form = make_form()
+    rebuild_stage_summary()
+
+    response = client.put('/api/pipeline/1', json={'current_stage': 'Quote Generated', 'changed_by': 'tester'})
+    assert response.status_code == 200
+
+    db.session.expire_all()
+    item = db.session.get(ProjectPipeline, 1)
+    form = db.session.get(PricingForm, form.id)
+    assert item.current_stage == 'Quote Generated'
+    assert item.quote_amount == form.quote_total > 0
+    assert StageTransition.query.filter_by(pipeline_id=1, stage='Quote Generated').count() == 1
+    assert db.session.get(PipelineStageSummary, 'Quote Generated').item_count == 1
+    job = PdfJob.query.filter_by(form_id=form.id).one()
+    assert job.status == 'done'
+    assert form.quote_pdf_url == job.pdf_url
+
+
+def test_failure_after_auto_quote_rolls_back_everything(client, make_form, monkeypatch):
+    form = make_form()
+    rebuild_stage_summary()
+
+    def fail(before, after):
+        raise pipeline_routes.SQLAlchemyError('summary update failed')
+    monkeypatch.setattr(pipeline_routes, 'apply_summary_change', fail)
+
+    response = client.put('/api/pipeline/1', json={'current_stage': 'Quote Generated'})
+    assert response.status_code == 500
+
+    db.session.expire_all()
+    assert db.session.get(ProjectPipeline, 1).current_stage == 'Pricing Submissions'
+    assert db.session.get(PricingForm, form.id).quote_total is None
+    assert PdfJob.query.count() == 0
+    assert StageTransition.query.count() == 0
+    assert PipelineEvent.query.count() == 0
+    assert db.session.get(PipelineStageSummary, 'Pricing Submissions').item_count == 1
@@ -0,0 +1,17 @@
+from utils.process_pool import discard_pool, get_pool
+
+
+def test_pools_are_shared_by_name(app):
+    app.config['INGEST_WORKERS'] = 2
+    app.config['PDF_RENDER_WORKERS'] = 1
+    try:
+        ingest = get_pool('ingest')
+        assert get_pool('ingest') is ingest
+        assert get_pool('pdf_render') is not ingest
+        assert ingest._max_workers == 2
+
+        discard_pool('ingest')
+        assert get_pool('ingest') is not ingest
+    finally:
+        discard_pool('ingest')
+        discard_pool('pdf_render')
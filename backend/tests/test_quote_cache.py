@@ -0,0 +1,45 @@
+from utils import quote_cache as quote_cache_module
+from utils.quote_cache import cached_calculate_quote, quote_cache, quote_cache_key
+from utils.quote_calculator import calculate_quote
+
+
+QUOTE_INPUT = {'num_dashboards': 2, 'num_widgets': 10, 'data_sources': ['CSV']}
+
+
+def test_cache_hit_stamps_a_fresh_validity_date(app, monkeypatch):
+    quote_cache.clear()
+    first = cached_calculate_quote(QUOTE_INPUT)
+    assert first == calculate_quote(QUOTE_INPUT)
+
+    # A hit on a later day carries that day's validity date, not the cached one
+    monkeypatch.setattr(quote_cache_module, 'quote_valid_until', lambda rules=None: '2099-01-31')
+    hits = quote_cache.stats()['hits']
+    second = cached_calculate_quote(QUOTE_INPUT)
+
+    assert quote_cache.stats()['hits'] == hits + 1
+    assert second['valid_until'] == '2099-01-31'
+    assert {k: v for k, v in second.items() if k != 'valid_until'} == \
+        {k: v for k, v in first.items() if k != 'valid_until'}
+    assert 'valid_until' not in quote_cache.get(quote_cache_key(QUOTE_INPUT))
+
+
+def test_cached_errors_have_no_validity_date(app):
+    quote_cache.clear()
+    data = {'data_sources': [{'type': 'csv', 'size_mb': 31}]}
+
+    assert cached_calculate_quote(data) == calculate_quote(data)
+    assert cached_calculate_quote(data) == {'success': False, 'error': 'Total file size exceeds 30MB limit'}
+
+
+def test_malformed_input_returns_the_error_instead_of_raising(app):
+    data = {'database_tables': ['orders']}
+
+    assert cached_calculate_quote(data) == calculate_quote(data)
+    assert cached_calculate_quote(data)['success'] is False
+
+
+def test_generate_quote_rejects_malformed_tables(client):
+    response = client.post('/api/generate-quote', json={'database_tables': ['orders']})
+
+    assert response.status_code == 400
+    assert 'error' in response.json
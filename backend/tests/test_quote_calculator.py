@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from utils.quote_calculator import calculate_quote, calculate_quotes_batch
+
+
+RECORD_COUNTS = [0, 999, 1000, 5000, 10000, 99999, 100000, 500000, 1000000, 9999999, 10000000, 50000000]
+
+
+def random_calculation_input(rng):
+    """A calculation input mixing the engine's shape, legacy keys and edge cases"""
+    data = {
+        'num_dashboards': rng.randint(0, 6),
+        'num_widgets': rng.randint(0, 40),
+        'drilldowns_per_widget': rng.randint(0, 3),
+        'include_logo': rng.random() < 0.5,
+        'support_plan': rng.choice(['basic', 'priority', 'dedicated', 'manager_monthly', 'unknown']),
+        'support_hours': rng.randint(0, 20),
+        'support_months': rng.randint(0, 12),
+        'bi_developer_level': rng.choice([None, 'entry', 'mid', 'senior', 'advanced']),
+        'bi_dev_months': rng.randint(1, 6)
+    }
+    if rng.random() < 0.5:
+        data['features'] = rng.sample(['filters', 'export', 'alerts', 'sharing'], rng.randint(0, 4))
+    for option in ('widget_brand_color', 'dashboard_brand_color', 'widget_font_style', 'localize_headings'):
+        if rng.random() < 0.3:
+            data[option] = True
+
+    # Data files: empty, legacy type names, or sized files that may exceed the limit
+    shape = rng.choice(['empty', 'legacy', 'sized'])
+    if shape == 'empty':
+        data['data_sources'] = []
+    elif shape == 'legacy':
+        data['data_sources'] = [rng.choice(['CSV', 'Excel', 'JSON', 'API', 'PDF']) for _ in range(rng.randint(1, 4))]
+    else:
+        data['data_sources'] = [
+            {'type': rng.choice(['csv', 'xml', 'xlsx', 'json', 'pdf']), 'size_mb': rng.uniform(0, 15)}
+            for _ in range(rng.randint(1, 5))
+        ]
+
+    # Databases: engine shape, legacy database_tables, or none
+    shape = rng.choice(['none', 'legacy', 'sources'])
+    if shape == 'legacy':
+        data['database_tables'] = [{'records': rng.choice(RECORD_COUNTS)} for _ in range(rng.randint(0, 4))]
+    elif shape == 'sources':
+        data['database_sources'] = [
+            {'tables_info': [{'record_count': rng.choice(RECORD_COUNTS)} for _ in range(rng.randint(0, 4))]}
+            for _ in range(rng.randint(0, 3))
+        ]
+
+    # Integrations: legacy num_apis or integrations with optional hosted tables
+    if rng.random() < 0.5:
+        data['num_apis'] = rng.randint(0, 3)
+    else:
+        data['integrations'] = [
+            {'db_tables': [{'record_count': rng.choice(RECORD_COUNTS)} for _ in range(rng.randint(0, 2))]}
+            if rng.random() < 0.5 else {}
+            for _ in range(rng.randint(0, 3))
+        ]
+    return data
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_batch_matches_single_quotes(app, seed):
+    rng = random.Random(seed)
+    forms = [random_calculation_input(rng) for _ in range(100)]
+
+    assert calculate_quotes_batch(forms) == [calculate_quote(form) for form in forms]
+
+
+def test_batch_matches_single_quotes_on_edge_cases(app):
+    forms = [
+        {},
+        {'data_sources': [], 'database_sources': [], 'integrations': []},
+        {'data_sources': ['CSV', 'xml']},
+        {'data_sources': [{'type': 'csv', 'size_mb': 31}]},
+        {'data_sources': [{'type': 'csv', 'size_mb': 30}]},
+        # Malformed legacy rows report an error rather than raising
+        {'database_tables': ['orders']},
+        {'num_apis': '2'},
+        {'data_sources': [{'size_mb': 1}]}
+    ]
+
+    results = calculate_quotes_batch(forms)
+
+    assert results == [calculate_quote(form) for form in forms]
+    assert results[3] == {'success': False, 'error': 'Total file size exceeds 30MB limit'}
+    assert results[4]['success']
+    assert not any(result['success'] for result in results[5:])
+    assert calculate_quotes_batch([]) == []
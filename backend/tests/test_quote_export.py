@@ -0,0 +1,61 @@
+import io
+import re
+import zipfile
+import zlib
+from datetime import date
+
+from models import db, PricingForm
+from utils.pdf_generator import quote_pdf_filename
+
+
+BREAKDOWN = {'dashboards': 1000, 'widgets': 200}
+
+
+def _page_text(document):
+    """Decompressed content streams of a PDF"""
+    streams = re.findall(rb'stream\n(.*?)\nendstream', document, re.S)
+    return b''.join(zlib.decompress(stream) for stream in streams if stream.startswith(b'x'))
+
+
+def _export(client):
+    response = client.get('/api/pipeline/export/quotes?stage=Pricing Submissions')
+    assert response.status_code == 200
+    return zipfile.ZipFile(io.BytesIO(response.data))
+
+
+def test_export_draws_the_stored_validity_date(client, make_form):
+    form = make_form(client_name='Dated', quote_total=1200, quote_breakdown=BREAKDOWN,
+                     quote_valid_until=date(2026, 11, 17))
+
+    archive = _export(client)
+
+    document = archive.read('Dated-Project-form1.pdf')
+    assert b'Valid until: 2026-11-17' in _page_text(document)
+    filename = quote_pdf_filename('quote', {
+        'total': 1200.0, 'breakdown': BREAKDOWN, 'valid_until': '2026-11-17',
+        'client_name': 'Dated', 'project_title': 'Project'
+    })
+    assert db.session.get(PricingForm, form.id).quote_pdf_url.endswith(filename)
+
+
+def test_export_omits_validity_for_quotes_stored_without_one(client, make_form):
+    form = make_form(client_name='Historical', quote_total=1200, quote_breakdown=BREAKDOWN)
+
+    archive = _export(client)
+
+    document = archive.read('Historical-Project-form1.pdf')
+    assert b'Valid until' not in _page_text(document)
+    filename = quote_pdf_filename('quote', {
+        'total': 1200.0, 'breakdown': BREAKDOWN, 'client_name': 'Historical', 'project_title': 'Project'
+    })
+    assert db.session.get(PricingForm, form.id).quote_pdf_url.endswith(filename)
+
+
+def test_generated_quote_keeps_its_validity_date(client, make_form):
+    form = make_form()
+
+    response = client.post(f'/api/forms/{form.id}/generate-quote')
+    assert response.status_code == 200
+
+    db.session.expire_all()
+    assert db.session.get(PricingForm, form.id).quote_valid_until.isoformat() == response.json['quote']['valid_until']
@@ -0,0 +1,104 @@
+import copy
+import random
+
+import pytest
+
+from utils.validators import VALID_SUBSCRIPTION_PLANS, validate_form_data
+
+
+VALID_FORM = {
+    'pricing_analyst_name': 'pricing analyst',
+    'client_name': 'Acme GmbH',
+    'client_type': 'B2B',
+    'industry_sector': 'Retail',
+    'company_size': 250,
+    'annual_revenue': 1.5e6,
+    'country': 'Germany',
+    'email': 'buyer@example.com',
+    'project_title': 'Sales dashboards',
+    'subscription_plan': 'Starter Lite (Monthly)',
+    'expected_deliverables': [{'type': 'Dashboard', 'quantity': 2, 'widgets': 8}],
+    'data_sources': '["CSV", "JSON"]',
+    'databases': ['MySQL'],
+    'number_of_widgets': 16,
+    'volume_of_data': 'Medium (1M–10M)',
+    'start_date': '2026-11-01',
+    'end_date': '2027-01-31',
+    'engagement_type': 'One-time Project',
+    'support_plan_required': 'Priority',
+    'has_bi_team': 'true',
+    'wants_demo': False
+}
+
+# Values that each field should accept or reject in the same way on both paths
+FIELD_VALUES = {
+    'pricing_analyst_name': ['pricing lead', 'analyst', '', None, 42],
+    'client_name': ['Beta', '', 'x' * 256, None, ['a']],
+    'client_type': ['B2B2B', 'Private Individual', 'B2C', None],
+    'company_size': [1, '12', 0, -5, 'many', 3.7, None, True],
+    'annual_revenue': [0, '10.5', -1, 'lots', None],
+    'country': ['France', '', 'x' * 101, None],
+    'currency': ['EUR', 'x' * 11, None],
+    'email': ['a@b.co', 'not-an-email', 'a@b', '', None],
+    'subscription_plan': VALID_SUBSCRIPTION_PLANS + ['Free', '', None],
+    'expected_deliverables': ['[{"type": "Report"}]', [{'quantity': 1}], [{'type': 'Dashboard', 'quantity': '2'}],
+                              'not json', None],
+    'databases': [['PostgreSQL', 'Snowflake'], ['Oracle'], '["MongoDB"]', None],
+    'number_of_widgets': [0, '7', -1, 'seven', None],
+    'volume_of_data': ['Small (<1M)', 'Huge', None],
+    'start_date': ['2026-12-01', '2026-12-01T09:00:00', '01/12/2026', '', None],
+    'end_date': ['2026-10-01', '2027-06-30', 'soon', None],
+    'support_plan_required': ['Basic', 'Dedicated Account Manager', 'Gold', None],
+    'has_bi_team': [True, 'false', 'yes', 'maybe', 1, None],
+    'wants_demo': [True, 'true', None],
+    'company_website': ['https://acme.example', None],
+    'demo_scheduled_at': ['2026-11-05T10:00:00', 'tomorrow', None],
+    'wants_business_analysis': [True, False],
+    'problem_statement': ['Churn is rising', None],
+    'primary_contact_name': ['Sam', None],
+    'number_of_verticals': [3, '2', '', -1, None],
+    'demo_verticals': [['Retail', 'Finance'], 'Retail', [], None],
+    'timezone': ['Europe/Berlin', 'x' * 51, None],
+    'client_type_tag': ['demo', 'both', '', 'other', None],
+    'unexpected_field': ['value']
+}
+
+
+def _validate(data, compiled):
+    try:
+        return validate_form_data(copy.deepcopy(data), compiled=compiled)
+    except (TypeError, ValueError) as e:
+        # e.g. an unparseable start_date read by the end_date rule
+        return type(e), str(e)
+
+
+def assert_same_result(data):
+    assert _validate(data, compiled=True) == _validate(data, compiled=False), data
+
+
+def test_compiled_schema_accepts_a_valid_form():
+    is_valid, result = validate_form_data(copy.deepcopy(VALID_FORM))
+    assert is_valid, result
+    assert_same_result(VALID_FORM)
+
+
+@pytest.mark.parametrize('field', sorted(FIELD_VALUES))
+def test_compiled_schema_matches_schema_per_field(field):
+    for value in FIELD_VALUES[field]:
+        assert_same_result(dict(VALID_FORM, **{field: value}))
+    data = dict(VALID_FORM)
+    data.pop(field, None)
+    assert_same_result(data)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_compiled_schema_matches_schema_on_random_forms(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        data = dict(VALID_FORM)
+        for field in rng.sample(sorted(FIELD_VALUES), rng.randint(1, 6)):
+            if rng.random() < 0.15:
+                data.pop(field, None)
+            else:
+                data[field] = rng.choice(FIELD_VALUES[field])
+        assert_same_result(data)
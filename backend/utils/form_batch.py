@@ -0,0 +1,126 @@
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from utils.process_pool import discard_pool, get_pool
+from utils.validators import pricing_form_validator, validate_form_data
+
+VALIDATE_POOL = 'form_validate'
+
+
+def validate_chunk(rows):
+    """
+    Validate forms without persisting them; runs in the pool's workers
+
+    Returns:
+        list: None for a valid form, else its error map, in input order
+    """
+    results = []
+    for row in rows:
+        if isinstance(row, ValueError):
+            results.append({'_schema': [str(row)]})
+            continue
+        if not isinstance(row, dict):
+            results.append({'_schema': [pricing_form_validator.type_message]})
+            continue
+        try:
+            is_valid, loaded = validate_form_data(row)
+        except (TypeError, ValueError, AttributeError) as e:
+            # e.g. an unparseable start_date read by the end_date rule
+            results.append({'_schema': [str(e)]})
+            continue
+        results.append(None if is_valid else loaded)
+    return results
+
+
+def _chunks(rows, chunk_size, max_rows):
+    """Lists of up to chunk_size (index, row) pairs; the error pair for max_rows comes alone"""
+    chunk = []
+    for index, row in enumerate(rows):
+        if max_rows is not None and index >= max_rows:
+            if chunk:
+                yield chunk
+            yield [(index, ValueError(f"Batch is limited to {max_rows} rows"))]
+            return
+        chunk.append((index, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_rows(rows, chunk_size, max_rows=None):
+    """
+    Validate forms chunk by chunk, in a process pool once the batch is big enough
+
+    The first FORM_VALIDATE_PARALLEL_MIN_ROWS rows are buffered. A batch that
+    ends before that is validated on the request thread, since starting
+    workers and pickling rows would cost more than it saves. Larger batches
+    go to the pool with at most two chunks per worker in flight, so memory
+    stays bounded for long NDJSON streams.
+
+    Yields:
+        tuple: (index, None or error map) in input order
+    """
+    config = current_app.config
+    workers = config['FORM_VALIDATE_WORKERS']
+    min_parallel = config['FORM_VALIDATE_PARALLEL_MIN_ROWS']
+
+    chunks = _chunks(rows, chunk_size, max_rows)
+    buffered = []
+    buffered_rows = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        buffered_rows += len(chunk)
+        if buffered_rows >= min_parallel:
+            break
+    else:
+        workers = 0
+
+    pool = None
+    if workers > 0:
+        try:
+            pool = get_pool(VALIDATE_POOL)
+        except (OSError, RuntimeError) as e:
+            current_app.logger.warning(f"Validation pool unavailable, validating inline: {str(e)}")
+
+    pending = deque()
+
+    def submit(chunk):
+        nonlocal pool
+        if pool is not None:
+            try:
+                pending.append((chunk, pool.submit(validate_chunk, [row for _, row in chunk])))
+                return
+            except (BrokenProcessPool, RuntimeError) as e:
+                current_app.logger.warning(f"Validation pool unavailable, validating inline: {str(e)}")
+                discard_pool(VALIDATE_POOL)
+                pool = None
+        pending.append((chunk, None))
+
+    def finish():
+        chunk, future = pending.popleft()
+        results = None
+        if future is not None:
+            try:
+                results = future.result()
+            except BrokenProcessPool as e:
+                current_app.logger.warning(f"Validation worker died, validating inline: {str(e)}")
+                discard_pool(VALIDATE_POOL)
+        if results is None:
+            results = validate_chunk([row for _, row in chunk])
+        for (index, _), errors in zip(chunk, results):
+            yield index, errors
+
+    max_in_flight = max(1, 2 * workers)
+    for chunk in buffered:
+        submit(chunk)
+        while len(pending) > max_in_flight:
+            yield from finish()
+    del buffered
+    for chunk in chunks:
+        submit(chunk)
+        while len(pending) > max_in_flight:
+            yield from finish()
+    while pending:
+        yield from finish()
@@ -0,0 +1,324 @@
+import csv
+import json
+import os
+import re
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from xml.etree.ElementTree import iterparse
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from models import db
+from models.models import FormDocument
+from utils.process_pool import discard_pool, get_pool
+
+READ_CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 64 * 1024
+MAX_JSON_ELEMENT_CHARS = 16 * 1024 * 1024  # a larger array element is treated as malformed
+BYTES_PER_MB = 1024 * 1024
+
+# file_type -> the data_sources type it is priced as
+INGESTED_TYPES = {
+    'csv': 'csv',
+    'tsv': 'csv',
+    'xlsx': 'xlsx',
+    'json': 'json',
+    'jsonl': 'json',
+    'ndjson': 'json'
+}
+
+INGEST_POOL = 'ingest'
+
+
+# Profilers run in the pool's worker processes: plain functions of a path
+
+def _profile_csv(path, delimiter=None):
+    with open(path, encoding='utf-8', errors='replace', newline='') as f:
+        if delimiter is None:
+            sample = f.read(SNIFF_BYTES)
+            f.seek(0)
+            try:
+                delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t|').delimiter
+            except csv.Error:
+                delimiter = ','
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return 0, 0
+        rows = sum(1 for row in reader if row)
+    return rows, len(header)
+
+
+def _json_array_items(f):
+    """
+    Yield the elements of a top-level JSON array without loading the whole array
+
+    Only the element being decoded is buffered; one that grows past
+    MAX_JSON_ELEMENT_CHARS, e.g. an unterminated string, raises ValueError
+    instead of reading the rest of the file into memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        # Skip whitespace and separators between elements
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != '[':
+                raise ValueError('Expected a JSON array')
+            started = True
+            position += 1
+            continue
+        if started and position < len(buffer) and buffer[position] == ']':
+            return
+        if position < len(buffer):
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield item
+                position = end
+                continue
+        if eof:
+            raise ValueError('Unexpected end of JSON array')
+        chunk = f.read(READ_CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+        if len(buffer) > MAX_JSON_ELEMENT_CHARS:
+            raise ValueError(f"JSON array element exceeds {MAX_JSON_ELEMENT_CHARS} characters")
+
+
+def _count_records(items):
+    rows = 0
+    columns = set()
+    width = 0
+    for item in items:
+        rows += 1
+        if isinstance(item, dict):
+            columns.update(item)
+        elif isinstance(item, list):
+            width = max(width, len(item))
+    return rows, max(len(columns), width)
+
+
+def _profile_json(path):
+    with open(path, encoding='utf-8') as f:
+        first = f.read(SNIFF_BYTES).lstrip()[:1]
+        f.seek(0)
+        if first == '[':
+            return _count_records(_json_array_items(f))
+        try:
+            return _profile_ndjson(f)
+        except json.JSONDecodeError:
+            # A single pretty-printed object: one record
+            f.seek(0)
+            return _count_records([json.load(f)])
+
+
+def _profile_ndjson(f):
+    return _count_records(json.loads(line) for line in f if line.strip())
+
+
+SPREADSHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+RELATIONSHIP_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+CELL_REF_RE = re.compile(r'([A-Z]+)')
+
+
+def _first_sheet(archive):
+    """Archive member of the workbook's first sheet"""
+    with archive.open('xl/workbook.xml') as f:
+        sheet = next((el for _, el in iterparse(f) if el.tag == f"{SPREADSHEET_NS}sheet"), None)
+    if sheet is not None:
+        rel_id = sheet.get(f"{RELATIONSHIP_NS}id")
+        with archive.open('xl/_rels/workbook.xml.rels') as f:
+            for _, el in iterparse(f):
+                if el.tag == f"{PACKAGE_REL_NS}Relationship" and el.get('Id') == rel_id:
+                    target = el.get('Target').lstrip('/')
+                    return target if target.startswith('xl/') else f"xl/{target}"
+    return sorted(name for name in archive.namelist() if name.startswith('xl/worksheets/sheet'))[0]
+
+
+def _column_index(ref):
+    index = 0
+    for letter in CELL_REF_RE.match(ref).group(1):
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index
+
+
+def _profile_xlsx(path):
+    """Rows and columns of the first sheet, streaming its XML and dropping each row once counted"""
+    rows = 0
+    columns = 0
+    with zipfile.ZipFile(path) as archive, archive.open(_first_sheet(archive)) as sheet:
+        for _, el in iterparse(sheet):
+            if el.tag != f"{SPREADSHEET_NS}row":
+                continue
+            filled = [
+                cell for cell in el.iter(f"{SPREADSHEET_NS}c")
+                if cell.find(f"{SPREADSHEET_NS}v") is not None or cell.find(f"{SPREADSHEET_NS}is") is not None
+            ]
+            if filled:
+                rows += 1
+                columns = max(columns, max(
+                    _column_index(cell.get('r')) if cell.get('r') else len(filled) for cell in filled
+                ))
+            el.clear()
+    return max(rows - 1, 0), columns  # the first row is the header
+
+
+def profile_data_file(path, file_type):
+    """
+    Size, row count and column count of an uploaded data file, read once as a stream
+
+    Returns:
+        dict: size_bytes, row_count, column_count
+    """
+    if file_type == 'tsv':
+        rows, columns = _profile_csv(path, delimiter='\t')
+    elif file_type == 'csv':
+        rows, columns = _profile_csv(path)
+    elif file_type == 'xlsx':
+        rows, columns = _profile_xlsx(path)
+    elif file_type == 'json':
+        rows, columns = _profile_json(path)
+    else:
+        with open(path, encoding='utf-8') as f:
+            rows, columns = _profile_ndjson(f)
+    return {'size_bytes': os.path.getsize(path), 'row_count': rows, 'column_count': columns}
+
+
+def enqueue_ingestion(documents):
+    """
+    Profile uploaded data files in the background
+
+    Documents that are not CSV/XLSX/JSON are only sized. A file shared with an
+    already profiled document (uploads are deduplicated) reuses its results.
+    With INGEST_WORKERS = 0 files are profiled on the calling thread. Commits.
+    """
+    workers = current_app.config['INGEST_WORKERS']
+    app = current_app._get_current_object()
+    for doc in documents:
+        if doc.file_type not in INGESTED_TYPES:
+            doc.ingest_status = 'skipped'
+            doc.size_bytes = os.path.getsize(doc.file_path) if os.path.isfile(doc.file_path) else None
+            doc.ingested_at = datetime.utcnow()
+            continue
+        profiled = FormDocument.query.filter(
+            FormDocument.file_path == doc.file_path,
+            FormDocument.ingest_status == 'done'
+        ).first()
+        if profiled is not None:
+            _store_profile(doc, {
+                'size_bytes': profiled.size_bytes,
+                'row_count': profiled.row_count,
+                'column_count': profiled.column_count
+            })
+            continue
+        doc.ingest_status = 'queued'
+    db.session.commit()
+
+    for doc in documents:
+        if doc.ingest_status != 'queued':
+            continue
+        if workers > 0:
+            try:
+                future = get_pool(INGEST_POOL).submit(profile_data_file, doc.file_path, doc.file_type)
+            except (BrokenProcessPool, RuntimeError) as e:
+                current_app.logger.warning(f"Ingestion pool unavailable, profiling inline: {str(e)}")
+                discard_pool(INGEST_POOL)
+            else:
+                future.add_done_callback(lambda f, doc_id=doc.id: _on_profile_done(app, doc_id, f))
+                continue
+        ingest_document(doc)
+
+
+def ingest_document(doc):
+    """Profile one document on the calling thread and commit the result"""
+    try:
+        profile = profile_data_file(doc.file_path, doc.file_type)
+    except Exception as e:
+        current_app.logger.warning(f"Could not ingest document {doc.id}: {str(e)}")
+        _store_profile(doc, None, error=str(e))
+    else:
+        _store_profile(doc, profile)
+    db.session.commit()
+
+
+def _on_profile_done(app, doc_id, future):
+    """Runs on the pool's callback thread"""
+    profile, error = None, None
+    try:
+        profile = future.result()
+    except BrokenProcessPool as e:
+        error = f"Ingestion worker died: {str(e)}"
+        discard_pool(INGEST_POOL)
+    except Exception as e:
+        error = str(e) or e.__class__.__name__
+
+    with app.app_context():
+        try:
+            doc = db.session.get(FormDocument, doc_id)
+            if doc is None:
+                return
+            if error:
+                app.logger.warning(f"Could not ingest document {doc_id}: {error}")
+            _store_profile(doc, profile, error=error)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Could not record ingestion of document {doc_id}: {str(e)}")
+
+
+def _store_profile(doc, profile, error=None):
+    doc.ingest_status = 'failed' if error else 'done'
+    doc.ingest_error = error
+    doc.ingested_at = datetime.utcnow()
+    if profile:
+        doc.size_bytes = profile['size_bytes']
+        doc.row_count = profile['row_count']
+        doc.column_count = profile['column_count']
+
+
+def ingested_data_files(form_id):
+    """Profiled data files of a form, in the shape form_to_calculation_input expects"""
+    documents = FormDocument.query.filter_by(form_id=form_id, ingest_status='done') \
+        .order_by(FormDocument.id).all()
+    return [
+        {
+            'name': doc.file_name,
+            'type': INGESTED_TYPES[doc.file_type],
+            'size_mb': round(doc.size_bytes / BYTES_PER_MB, 3),
+            'row_count': doc.row_count,
+            'column_count': doc.column_count
+        }
+        for doc in documents if doc.file_type in INGESTED_TYPES
+    ]
+
+
+@click.command('ingest-uploads')
+@click.option('--retry-failed', is_flag=True, help='Also retry documents whose ingestion failed')
+@with_appcontext
+def ingest_uploads_command(retry_failed):
+    """Profile uploaded data files that were never ingested, e.g. after a restart"""
+    statuses = ['queued'] + (['failed'] if retry_failed else [])
+    query = FormDocument.query.filter(
+        db.or_(FormDocument.ingest_status.is_(None), FormDocument.ingest_status.in_(statuses))
+    ).order_by(FormDocument.id)
+    done = failed = 0
+    for doc in query.all():
+        if doc.file_type not in INGESTED_TYPES:
+            continue
+        ingest_document(doc)
+        if doc.ingest_status == 'done':
+            done += 1
+        else:
+            failed += 1
+    click.echo(f"Ingested {done} documents, {failed} failed")
@@ -0,0 +1,155 @@
+import copy
+
+OPERATIONS = ('add', 'remove', 'replace', 'move', 'copy', 'test')
+
+
+class JsonPatchError(ValueError):
+    """A malformed patch, or an operation that cannot apply to the document"""
+
+
+class JsonPatchTestFailed(JsonPatchError):
+    """A 'test' operation did not match"""
+
+
+def parse_pointer(pointer):
+    """RFC 6901 JSON Pointer to its list of reference tokens"""
+    if not isinstance(pointer, str):
+        raise JsonPatchError(f"Invalid JSON Pointer: {pointer!r}")
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise JsonPatchError(f"JSON Pointer must start with '/': {pointer}")
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def patch_root_keys(operations):
+    """
+    Check the shape of a patch and return the top-level members it reads or writes
+
+    Raises:
+        JsonPatchError: if the patch is not a list of valid operations
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError('A JSON Patch must be an array of operations')
+    keys = set()
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+            raise JsonPatchError(f"Operation {index} must be an object with op one of {', '.join(OPERATIONS)}")
+        if 'path' not in operation:
+            raise JsonPatchError(f"Operation {index} is missing 'path'")
+        pointers = [operation['path']]
+        if operation['op'] in ('add', 'replace', 'test') and 'value' not in operation:
+            raise JsonPatchError(f"Operation {index} is missing 'value'")
+        if operation['op'] in ('move', 'copy'):
+            if 'from' not in operation:
+                raise JsonPatchError(f"Operation {index} is missing 'from'")
+            pointers.append(operation['from'])
+        for pointer in pointers:
+            tokens = parse_pointer(pointer)
+            if not tokens:
+                raise JsonPatchError(f"Operation {index} targets the whole document, which is not supported")
+            keys.add(tokens[0])
+    return keys
+
+
+def _array_index(array, token, allow_end=False):
+    if token == '-' and allow_end:
+        return len(array)
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise JsonPatchError(f"Invalid array index: {token}")
+    index = int(token)
+    if index > len(array) or (index == len(array) and not allow_end):
+        raise JsonPatchError(f"Array index out of range: {token}")
+    return index
+
+
+def _parent(document, tokens, pointer):
+    """Container holding the last token of a pointer"""
+    target = document
+    for token in tokens[:-1]:
+        if isinstance(target, dict):
+            if token not in target:
+                raise JsonPatchError(f"Path not found: {pointer}")
+            target = target[token]
+        elif isinstance(target, list):
+            target = target[_array_index(target, token)]
+        else:
+            raise JsonPatchError(f"Path not found: {pointer}")
+    if not isinstance(target, (dict, list)):
+        raise JsonPatchError(f"Path not found: {pointer}")
+    return target
+
+
+def _get(document, pointer):
+    tokens = parse_pointer(pointer)
+    parent = _parent(document, tokens, pointer)
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise JsonPatchError(f"Path not found: {pointer}")
+        return parent[tokens[-1]]
+    return parent[_array_index(parent, tokens[-1])]
+
+
+def _add(document, pointer, value):
+    tokens = parse_pointer(pointer)
+    parent = _parent(document, tokens, pointer)
+    if isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    else:
+        parent.insert(_array_index(parent, tokens[-1], allow_end=True), value)
+
+
+def _remove(document, pointer):
+    tokens = parse_pointer(pointer)
+    parent = _parent(document, tokens, pointer)
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise JsonPatchError(f"Path not found: {pointer}")
+        return parent.pop(tokens[-1])
+    return parent.pop(_array_index(parent, tokens[-1]))
+
+
+def _json_equal(a, b):
+    """Equality per RFC 6902 'test': 1 == 1.0, but true != 1"""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b
+    return type(a) is type(b) and a == b
+
+
+def apply_patch(document, operations):
+    """
+    Apply RFC 6902 operations to a document in place
+
+    The caller discards the document when this raises, which keeps the
+    patch atomic.
+
+    Raises:
+        JsonPatchTestFailed: a 'test' operation did not match
+        JsonPatchError: any other operation could not be applied
+    """
+    for operation in operations:
+        op, path = operation['op'], operation['path']
+        if op == 'add':
+            _add(document, path, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            _remove(document, path)
+        elif op == 'replace':
+            _remove(document, path)
+            _add(document, path, copy.deepcopy(operation['value']))
+        elif op == 'move':
+            source = operation['from']
+            if path != source and path.startswith(source + '/'):
+                raise JsonPatchError(f"Cannot move {source} into one of its children")
+            _add(document, path, _remove(document, source))
+        elif op == 'copy':
+            _add(document, path, copy.deepcopy(_get(document, operation['from'])))
+        elif op == 'test':
+            if not _json_equal(_get(document, path), operation['value']):
+                raise JsonPatchTestFailed(f"Test failed at {path}")
+    return document
@@ -0,0 +1,118 @@
+import math
+from datetime import date, time
+from flask import Response, current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # encode with the standard library instead
+    orjson = None
+
+
+def _default(o):
+    """Types the encoders do not handle themselves; dates and times as ISO 8601"""
+    if isinstance(o, (date, time)):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider encoding with orjson when it is installed
+
+    datetime, date and time values are written as ISO 8601 by either encoder,
+    so to_dict() methods can return them as they are. Keys are sorted and
+    debug responses indented like the default provider; non-ASCII text is
+    written as UTF-8 rather than escaped. Anything orjson rejects, such as
+    integers beyond 64 bits, is retried with the standard library encoder.
+    """
+    default = staticmethod(_default)
+
+    def _encode(self, obj, indent=False):
+        """UTF-8 JSON bytes"""
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=self.default, option=option)
+            except orjson.JSONEncodeError:
+                pass
+        kwargs = {'indent': 2} if indent else {'separators': (',', ':')}
+        return super().dumps(obj, **kwargs).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self._encode(obj, indent) + b'\n', mimetype=self.mimetype)
+
+
+def _iter_json_array(items, envelope, key):
+    encode = current_app.json.dumps
+    if envelope is None:
+        yield '['
+    else:
+        head = encode(envelope)[:-1]
+        yield f"{head}{',' if envelope else ''}{encode(key)}:["
+    try:
+        for index, item in enumerate(items):
+            yield f"{',' if index else ''}{encode(item)}"
+    except Exception as e:
+        # The 200 and part of the body are already sent, so the failure has to show in the body
+        current_app.logger.error(f"Streamed JSON response failed: {str(e)}")
+        if envelope is None:
+            # A bare array has nowhere to report it; abort the connection rather than end on a short list
+            raise
+        yield f"],{encode('error')}:{encode('Response truncated by a server error')}}}"
+        return
+    yield ']' if envelope is None else ']}'
+
+
+def stream_json_array(items, envelope=None, key='items'):
+    """
+    JSON response written one array element at a time
+
+    items is iterated lazily, e.g. a query with yield_per(), so neither the
+    rows nor the encoded body are ever held in memory as a whole.
+
+    The status line is sent before the first element, so an error while
+    iterating cannot become a 500. It is logged; an enveloped response then
+    closes the array and carries an "error" member after it, while a bare
+    array re-raises so the server aborts the connection and the client is
+    left with incomplete JSON instead of a valid but short list.
+
+    Args:
+        items: iterable of JSON-serializable elements
+        envelope (dict): other members of the response object; the array is
+            then written under key, after them. None sends a bare array.
+    """
+    return Response(stream_with_context(_iter_json_array(items, envelope, key)), mimetype='application/json')
+
+
+def stream_page(query, page, per_page, serialize, envelope=None, key='items'):
+    """
+    One page of a query as a streamed JSON object, with the members Flask-SQLAlchemy pagination reports
+
+    The rows are fetched JSON_STREAM_BATCH_SIZE at a time while the page is written.
+    """
+    # Out of range arguments are corrected like paginate(error_out=False) does
+    page = max(page, 1)
+    if per_page < 1:
+        per_page = 20
+    total = query.order_by(None).count()
+    rows = query.limit(per_page).offset((page - 1) * per_page) \
+        .yield_per(current_app.config['JSON_STREAM_BATCH_SIZE'])
+    envelope = dict(envelope or {})
+    envelope.update({
+        'total': total,
+        'pages': math.ceil(total / per_page),
+        'current_page': page
+    })
+    return stream_json_array((serialize(row) for row in rows), envelope, key)
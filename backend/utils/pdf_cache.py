@@ -0,0 +1,126 @@
+import io
+import mimetypes
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+import click
+from flask import Response, abort, current_app, send_file, send_from_directory
+from flask.cli import with_appcontext
+from models import db, PricingForm, StoredFile
+from utils.storage import QUOTE_PDF, locate_stored_file, remove_stored_file, storage_root
+
+def resolve_quote_pdf(pdf_url):
+    """Path of the file behind a stored quote_pdf_url, or None when it is gone"""
+    if not pdf_url:
+        return None
+    return locate_stored_file(os.path.basename(pdf_url))
+
+
+def send_stored_file(filename, mimetype=None):
+    """
+    Serve a file from upload storage with ETag/Last-Modified, 304s and byte ranges
+
+    With PDF_SENDFILE_MODE set, the body is left to the reverse proxy:
+    'x-sendfile' sends the absolute path (Apache mod_xsendfile, lighttpd) and
+    'x-accel-redirect' sends PDF_ACCEL_REDIRECT_PREFIX + the path relative to
+    the upload folder (nginx internal location aliased to that folder).
+    """
+    config = current_app.config
+    path = locate_stored_file(filename) if filename == os.path.basename(filename) else None
+    if path is None:
+        abort(404)
+
+    mode = (config.get('PDF_SENDFILE_MODE') or '').lower()
+    if mode in ('x-sendfile', 'x-accel-redirect'):
+        response = Response(mimetype=mimetype or mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        if mode == 'x-sendfile':
+            response.headers['X-Sendfile'] = os.path.abspath(path)
+        else:
+            relative = os.path.relpath(path, storage_root()).replace(os.sep, '/')
+            response.headers['X-Accel-Redirect'] = config['PDF_ACCEL_REDIRECT_PREFIX'].rstrip('/') + '/' + relative
+        return response
+
+    return send_from_directory(
+        os.path.dirname(path), filename,
+        mimetype=mimetype,
+        conditional=True,
+        etag=True,
+        max_age=config['PDF_MAX_AGE_SECONDS']
+    )
+
+
+def send_pdf_bytes(data, filename, etag=None):
+    """Return a freshly rendered PDF from memory; nothing is written to disk"""
+    return send_file(
+        io.BytesIO(data),
+        mimetype='application/pdf',
+        download_name=filename,
+        conditional=True,
+        etag=etag or False,
+        max_age=0
+    )
+
+
+def quote_pdf_reference_counts():
+    """Filename -> number of forms whose quote_pdf_url points at it"""
+    counts = Counter()
+    urls = db.session.query(PricingForm.quote_pdf_url).filter(PricingForm.quote_pdf_url.isnot(None))
+    for (url,) in urls:
+        counts[os.path.basename(url)] += 1
+    return counts
+
+
+def collect_orphaned_pdfs(min_age_seconds=None, dry_run=False):
+    """
+    Delete quote PDFs no form references
+
+    Identical quotes share one content-addressed file, so a file is only
+    garbage once its reference count drops to zero. Files used within
+    min_age_seconds are kept: direct quotes and in-flight renders are not
+    attached to a form yet, and cache hits refresh the file's mtime. The
+    candidates come from the storage index; only those are stat'ed.
+    """
+    if min_age_seconds is None:
+        min_age_seconds = current_app.config['PDF_CACHE_GC_MIN_AGE_SECONDS']
+    cutoff = datetime.utcnow() - timedelta(seconds=min_age_seconds)
+    references = quote_pdf_reference_counts()
+    root = storage_root()
+
+    stats = {'scanned': 0, 'referenced': 0, 'recent': 0, 'deleted': 0, 'bytes_freed': 0}
+    candidates = StoredFile.query.filter(StoredFile.kind == QUOTE_PDF, StoredFile.mtime < cutoff) \
+        .order_by(StoredFile.id).all()
+    for entry in candidates:
+        stats['scanned'] += 1
+        if references[entry.storage_key]:
+            stats['referenced'] += 1
+            continue
+        try:
+            mtime = datetime.utcfromtimestamp(os.path.getmtime(os.path.join(root, entry.relative_path)))
+        except FileNotFoundError:
+            mtime = None
+        if mtime and mtime > cutoff:
+            # Served from the cache since it was indexed
+            entry.mtime = mtime
+            stats['recent'] += 1
+            continue
+        stats['deleted'] += 1
+        stats['bytes_freed'] += entry.size
+        if not dry_run:
+            remove_stored_file(entry)
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+    return stats
+
+
+@click.command('gc-quote-pdfs')
+@click.option('--min-age', type=int, default=None, help='Keep files used within this many seconds')
+@click.option('--dry-run', is_flag=True, help='Report what would be deleted')
+@with_appcontext
+def gc_quote_pdfs_command(min_age, dry_run):
+    """Delete generated quote PDFs that no form references"""
+    stats = collect_orphaned_pdfs(min_age, dry_run)
+    verb = 'Would delete' if dry_run else 'Deleted'
+    click.echo(f"{verb} {stats['deleted']} of {stats['scanned']} quote PDFs "
+               f"({stats['bytes_freed']} bytes); {stats['referenced']} referenced, {stats['recent']} recent")
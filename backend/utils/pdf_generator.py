@@ -1,62 +1,257 @@
 from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+import hashlib
+import json
 import os
+import time
 import uuid
 from flask import current_app, url_for
-from datetime import datetime
+from models import db
+from utils.storage import QUOTE_PDF, index_stored_file, storage_path
 
-def generate_quote_pdf(quote_data):
-    """Generate a PDF quote with proper error handling"""
-    try:
+# Bump when a layout changes so cached documents are not reused
+PDF_LAYOUT_VERSION = 1
+
+
+class QuotePdfTemplate:
+    """
+    Page furniture shared by both quote layouts, prepared once per process
+
+    Fonts are registered up front in a fixed order, so font resource numbers
+    are the same in every document. Static cells (titles, table headers, row
+    labels) are laid out by FPDF the first time they are drawn; their content
+    stream bytes are cached by font and position and replayed afterwards, so
+    only the per-quote text goes through FPDF's text layout. Replaying relies
+    on fpdf2 internals, which is why requirements.txt pins it exactly;
+    tests/test_pdf_generator.py compares the output with the uncached layout.
+    """
+    FONTS = (('helvetica', 'B'), ('helvetica', ''))
+    MAX_CACHED_CELLS = 4096
+
+    def __init__(self):
+        self._cells = {}
+
+    def clear(self):
+        self._cells.clear()
+
+    def new_document(self):
         pdf = FPDF()
+        for family, style in self.FONTS:
+            pdf.set_font(family, style, 12)
         pdf.add_page()
-        
-        # Set font and title
-        pdf.set_font("Arial", 'B', 16)
-        pdf.cell(200, 10, txt="QUOTE", ln=1, align='C')
-        pdf.ln(10)
-        
-        # Add client/project info if available
-        pdf.set_font("Arial", size=12)
-        if 'client_name' in quote_data:
-            pdf.cell(200, 10, txt=f"Client: {quote_data['client_name']}", ln=1)
-        if 'project_title' in quote_data:
-            pdf.cell(200, 10, txt=f"Project: {quote_data['project_title']}", ln=1)
-        pdf.ln(10)
-        
-        # Add quote breakdown
-        pdf.set_font("Arial", 'B', 12)
-        pdf.cell(100, 10, "Item", border=1)
-        pdf.cell(50, 10, "Amount", border=1, align='R')
+        return pdf
+
+    @staticmethod
+    def cell(pdf, w, h, txt, border=0, align='L', next_line=False):
+        """Lay out one cell; next_line moves to the start of the next line like ln=1"""
+        if next_line:
+            pdf.cell(w, h, txt, border=border, align=align, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        else:
+            pdf.cell(w, h, txt, border=border, align=align)
+
+    def static_cell(self, pdf, w, h, txt, border=0, align='L', next_line=False):
+        """A cell whose text does not depend on the quote, replayed from the cache"""
+        key = (pdf.current_font['i'], pdf.font_size_pt, pdf.x, pdf.y, w, h, txt, border, align, next_line)
+        cached = self._cells.get(key)
+        if cached is not None:
+            contents, pdf.x, pdf.y = cached
+            pdf.pages[pdf.page].contents += contents
+            pdf._lasth = h
+            return
+
+        page = pdf.page
+        start = len(pdf.pages[page].contents)
+        self.cell(pdf, w, h, txt, border, align, next_line)
+        # A page break inside the cell leaves nothing reusable
+        if pdf.page == page and len(self._cells) < self.MAX_CACHED_CELLS:
+            self._cells[key] = (bytes(pdf.pages[page].contents[start:]), pdf.x, pdf.y)
+
+
+TEMPLATE = QuotePdfTemplate()
+
+
+def render_quote_pdf(quote_data, filepath=None):
+    """Draw the form quote layout ("QUOTE"); writes filepath, or returns the bytes without one"""
+    pdf = TEMPLATE.new_document()
+
+    # Set font and title
+    pdf.set_font("helvetica", 'B', 16)
+    TEMPLATE.static_cell(pdf, 200, 10, "QUOTE", align='C', next_line=True)
+    pdf.ln(10)
+
+    # Add client/project info if available
+    pdf.set_font("helvetica", size=12)
+    if 'client_name' in quote_data:
+        TEMPLATE.cell(pdf, 200, 10, f"Client: {quote_data['client_name']}", next_line=True)
+    if 'project_title' in quote_data:
+        TEMPLATE.cell(pdf, 200, 10, f"Project: {quote_data['project_title']}", next_line=True)
+    pdf.ln(10)
+
+    # Add quote breakdown
+    pdf.set_font("helvetica", 'B', 12)
+    TEMPLATE.static_cell(pdf, 100, 10, "Item", border=1)
+    TEMPLATE.static_cell(pdf, 50, 10, "Amount", border=1, align='R')
+    pdf.ln()
+
+    pdf.set_font("helvetica", size=10)
+    for item, amount in quote_data.get('breakdown', {}).items():
+        TEMPLATE.static_cell(pdf, 100, 10, item.replace('_', ' ').title(), border=1)
+        TEMPLATE.cell(pdf, 50, 10, f"${amount:,}", border=1, align='R')
         pdf.ln()
-        
-        pdf.set_font("Arial", size=10)
-        for item, amount in quote_data.get('breakdown', {}).items():
-            pdf.cell(100, 10, item.replace('_', ' ').title(), border=1)
-            pdf.cell(50, 10, f"${amount:,}", border=1, align='R')
-            pdf.ln()
-        
-        # Add total
-        pdf.set_font("Arial", 'B', 12)
-        pdf.cell(100, 10, "TOTAL", border=1)
-        pdf.cell(50, 10, f"${quote_data.get('total', 0):,}", border=1, align='R')
-        pdf.ln(15)
-        
-        # Add validity date
-        valid_until = quote_data.get('valid_until', datetime.now().strftime('%Y-%m-%d'))
-        pdf.cell(200, 10, txt=f"Valid until: {valid_until}", ln=1)
-        
-        # Ensure upload folder exists
-        upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Generate unique filename
-        filename = f"quote_{quote_data.get('id', uuid.uuid4().hex[:8])}.pdf"
-        filepath = os.path.join(upload_folder, filename)
-        
-        pdf.output(filepath)
-        
+
+    # Add total
+    pdf.set_font("helvetica", 'B', 12)
+    TEMPLATE.static_cell(pdf, 100, 10, "TOTAL", border=1)
+    TEMPLATE.cell(pdf, 50, 10, f"${quote_data.get('total', 0):,}", border=1, align='R')
+    pdf.ln(15)
+
+    # Add validity date; quotes stored without one are drawn without it
+    if quote_data.get('valid_until'):
+        TEMPLATE.cell(pdf, 200, 10, f"Valid until: {quote_data['valid_until']}", next_line=True)
+
+    return pdf.output(filepath)
+
+
+def render_project_quote_pdf(quote_data, filepath=None):
+    """Draw the direct quote layout ("Project Quote"); writes filepath, or returns the bytes without one"""
+    pdf = TEMPLATE.new_document()
+    pdf.set_font("helvetica", size=12)
+
+    # Add title
+    pdf.set_font("helvetica", 'B', 16)
+    TEMPLATE.static_cell(pdf, 200, 10, "Project Quote", align='C', next_line=True)
+    pdf.ln(10)
+
+    # Add client/project info
+    pdf.set_font("helvetica", size=12)
+    if quote_data.get('form_data', {}).get('client_name'):
+        TEMPLATE.cell(pdf, 200, 10, f"Client: {quote_data['form_data']['client_name']}", next_line=True)
+    if quote_data.get('form_data', {}).get('project_title'):
+        TEMPLATE.cell(pdf, 200, 10, f"Project: {quote_data['form_data']['project_title']}", next_line=True)
+    pdf.ln(10)
+
+    # Add quote details
+    pdf.set_font("helvetica", 'B', 14)
+    TEMPLATE.cell(pdf, 200, 10, f"Total: ${quote_data['total']:,}", next_line=True)
+    pdf.ln(10)
+
+    # Add breakdown table
+    pdf.set_font("helvetica", 'B', 12)
+    TEMPLATE.static_cell(pdf, 120, 10, "Item", border=1)
+    TEMPLATE.static_cell(pdf, 50, 10, "Cost", border=1, align='R')
+    pdf.ln()
+
+    pdf.set_font("helvetica", size=10)
+    for item, cost in quote_data['breakdown'].items():
+        TEMPLATE.static_cell(pdf, 120, 10, item.replace('_', ' ').title(), border=1)
+        TEMPLATE.cell(pdf, 50, 10, f"${cost:,}", border=1, align='R')
+        pdf.ln()
+
+    # Add total row
+    pdf.set_font("helvetica", 'B', 12)
+    TEMPLATE.static_cell(pdf, 120, 10, "TOTAL", border=1)
+    TEMPLATE.cell(pdf, 50, 10, f"${quote_data['total']:,}", border=1, align='R')
+    pdf.ln()
+
+    # Add validity
+    pdf.ln(10)
+    TEMPLATE.cell(pdf, 200, 10, f"Valid until: {quote_data['valid_until'][:10]}", next_line=True)
+
+    return pdf.output(filepath)
+
+
+# Layout name -> renderer; names are what PDF jobs store and send to the pool
+PDF_LAYOUTS = {
+    'quote': render_quote_pdf,
+    'project_quote': render_project_quote_pdf
+}
+
+
+def render_pdf(layout, quote_data, filepath):
+    """
+    Render one document and return the render time in milliseconds
+
+    Needs no app context, so it can run in a worker process. The file is
+    written under a temporary name and moved into place, so a content-addressed
+    path never exposes a half-written document. Errors are re-raised as
+    RuntimeError: some FPDF exceptions cannot be unpickled, which would break
+    the whole process pool instead of failing one render.
+    """
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp_path = f"{filepath}.{uuid.uuid4().hex}.tmp"
+    try:
+        PDF_LAYOUTS[layout](quote_data, tmp_path)
+        os.replace(tmp_path, filepath)
+    except Exception as e:
+        raise RuntimeError(f"{e.__class__.__name__}: {e}") from None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return (time.perf_counter() - start) * 1000
+
+
+def render_pdf_bytes(layout, quote_data):
+    """Render one document in memory"""
+    return bytes(PDF_LAYOUTS[layout](quote_data))
+
+
+def _rendered_fields(layout, quote_data):
+    """The values a layout actually draws; anything else must not change the hash"""
+    if layout == 'project_quote':
+        form_data = quote_data.get('form_data') or {}
+        return {
+            'client_name': form_data.get('client_name'),
+            'project_title': form_data.get('project_title'),
+            'total': quote_data['total'],
+            'breakdown': quote_data['breakdown'],
+            'valid_until': quote_data['valid_until'][:10]
+        }
+    return {
+        'client_name': quote_data.get('client_name'),
+        'project_title': quote_data.get('project_title'),
+        'total': quote_data.get('total', 0),
+        'breakdown': quote_data.get('breakdown', {}),
+        'valid_until': quote_data.get('valid_until')
+    }
+
+
+def quote_pdf_filename(layout, quote_data):
+    """Content-addressed filename: identical quote documents share one file"""
+    canonical = json.dumps(
+        [layout, PDF_LAYOUT_VERSION, _rendered_fields(layout, quote_data)],
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return f"quote_{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]}.pdf"
+
+
+def reuse_cached_pdf(filepath):
+    """
+    True when the document already exists
+
+    Touches the file so garbage collection treats it as recently used.
+    """
+    try:
+        os.utime(filepath)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def generate_quote_pdf(quote_data):
+    """Generate a PDF quote with proper error handling"""
+    try:
+        # Identical quotes map to the same file
+        filename = quote_pdf_filename('quote', quote_data)
+        filepath = storage_path(filename)
+
+        if not reuse_cached_pdf(filepath):
+            render_pdf('quote', quote_data, filepath)
+            index_stored_file(filename, kind=QUOTE_PDF, path=filepath)
+            db.session.commit()
+
         return url_for('quote.serve_pdf', filename=filename)
-        
+
     except Exception as e:
         current_app.logger.error(f"PDF generation failed: {str(e)}")
-        raise  # Re-raise the exception to be handled by the calling function
\ No newline at end of file
+        raise  # Re-raise the exception to be handled by the calling function
@@ -0,0 +1,264 @@
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from flask import current_app, url_for
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, PdfJob, PricingForm
+from utils.pdf_generator import render_pdf, reuse_cached_pdf
+from utils.process_pool import discard_pool, get_pool
+from utils.storage import QUOTE_PDF, index_stored_file
+
+RENDER_SAMPLES = 1000  # recent render times kept for the metrics endpoint
+PENDING_RENDERS_KEY = 'pending_pdf_renders'  # Session.info entry of renders awaiting commit
+
+PDF_POOL = 'pdf_render'
+
+_lock = threading.Lock()
+_in_flight = 0
+_counters = {'submitted': 0, 'inline': 0, 'cached': 0, 'done': 0, 'failed': 0}
+_render_ms = deque(maxlen=RENDER_SAMPLES)
+
+
+def _reserve_slot(workers, max_queue):
+    global _in_flight
+    with _lock:
+        if workers <= 0 or _in_flight >= max_queue:
+            return False
+        _in_flight += 1
+        _counters['submitted'] += 1
+        return True
+
+
+def _release_slot():
+    global _in_flight
+    with _lock:
+        _in_flight -= 1
+
+
+def enqueue_pdf_render(layout, quote_data, filepath, pdf_url, form_id=None):
+    """
+    Record a PDF job in the current transaction
+
+    Only adds and flushes the job row; nothing is rendered until the caller
+    commits and calls start_pdf_renders(), so the job, the form changes and
+    anything else the request writes commit together. A rollback drops the
+    pending render.
+
+    Returns:
+        dict: job reference with id, status, pdf_url and status_url;
+            start_pdf_renders() updates it in place
+    """
+    job_id = uuid.uuid4().hex
+    db.session.add(PdfJob(id=job_id, layout=layout, status='queued', form_id=form_id))
+    db.session.flush()
+
+    reference = {
+        'id': job_id,
+        'status': 'queued',
+        'pdf_url': None,
+        'status_url': url_for('quote.get_pdf_job_status', job_id=job_id)
+    }
+    db.session.info.setdefault(PENDING_RENDERS_KEY, []).append(
+        (reference, layout, quote_data, filepath, pdf_url)
+    )
+    return reference
+
+
+def start_pdf_renders():
+    """
+    Start the renders queued by enqueue_pdf_render, once their jobs are committed
+
+    Filenames are content-addressed, so an existing file completes the job at
+    once without rendering. When the pool is disabled or PDF_RENDER_MAX_QUEUE
+    renders are already in flight, the document is rendered on the calling
+    thread instead, which applies backpressure.
+    """
+    for reference, layout, quote_data, filepath, pdf_url in db.session.info.pop(PENDING_RENDERS_KEY, []):
+        _start_render(reference, layout, quote_data, filepath, pdf_url)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending_renders(session):
+    session.info.pop(PENDING_RENDERS_KEY, None)
+
+
+def _start_render(reference, layout, quote_data, filepath, pdf_url):
+    config = current_app.config
+    job_id = reference['id']
+
+    if reuse_cached_pdf(filepath):
+        with _lock:
+            _counters['cached'] += 1
+        _complete_job(job_id, pdf_url, render_ms=0.0, record_time=False)
+        reference.update(status='done', pdf_url=pdf_url)
+        return
+
+    if _reserve_slot(config['PDF_RENDER_WORKERS'], config['PDF_RENDER_MAX_QUEUE']):
+        app = current_app._get_current_object()
+        try:
+            future = get_pool(PDF_POOL).submit(render_pdf, layout, quote_data, filepath)
+        except (BrokenProcessPool, RuntimeError) as e:
+            current_app.logger.warning(f"PDF pool unavailable, rendering inline: {str(e)}")
+            _release_slot()
+            discard_pool(PDF_POOL)
+        else:
+            future.add_done_callback(lambda f: _on_render_done(app, job_id, pdf_url, f))
+            return
+
+    with _lock:
+        _counters['inline'] += 1
+    try:
+        render_ms = render_pdf(layout, quote_data, filepath)
+    except Exception as e:
+        current_app.logger.error(f"PDF generation error: {str(e)}")
+        _complete_job(job_id, None, error=str(e))
+        reference['status'] = 'failed'
+    else:
+        _complete_job(job_id, pdf_url, render_ms=render_ms)
+        reference.update(status='done', pdf_url=pdf_url)
+
+
+def submit_pdf_render(layout, quote_data, filepath):
+    """
+    Render without a job row, e.g. for exports that wait on the result themselves
+
+    Returns a Future resolving to the render time in milliseconds. Uses the
+    same pool and queue bound as start_pdf_renders, and likewise renders on
+    the calling thread when the pool is disabled or full.
+    """
+    config = current_app.config
+    if _reserve_slot(config['PDF_RENDER_WORKERS'], config['PDF_RENDER_MAX_QUEUE']):
+        try:
+            future = get_pool(PDF_POOL).submit(render_pdf, layout, quote_data, filepath)
+        except (BrokenProcessPool, RuntimeError) as e:
+            current_app.logger.warning(f"PDF pool unavailable, rendering inline: {str(e)}")
+            _release_slot()
+            discard_pool(PDF_POOL)
+        else:
+            future.add_done_callback(_on_untracked_render_done)
+            return future
+
+    with _lock:
+        _counters['inline'] += 1
+    future = Future()
+    try:
+        future.set_result(render_pdf(layout, quote_data, filepath))
+    except Exception as e:
+        future.set_exception(e)
+    _on_untracked_render_done(future, release=False)
+    return future
+
+
+def _on_untracked_render_done(future, release=True):
+    if release:
+        _release_slot()
+    if future.exception() is not None:
+        if isinstance(future.exception(), BrokenProcessPool):
+            discard_pool(PDF_POOL)
+        with _lock:
+            _counters['failed'] += 1
+        return
+    with _lock:
+        _counters['done'] += 1
+        _render_ms.append(future.result())
+
+
+def _on_render_done(app, job_id, pdf_url, future):
+    """Runs on the pool's callback thread once the render finishes or fails"""
+    _release_slot()
+    render_ms, error = None, None
+    try:
+        render_ms = future.result()
+    except BrokenProcessPool as e:
+        error = f"Render worker died: {str(e)}"
+        discard_pool(PDF_POOL)
+    except Exception as e:
+        error = str(e) or e.__class__.__name__
+
+    with app.app_context():
+        if error:
+            app.logger.error(f"PDF job {job_id} failed: {error}")
+        try:
+            _complete_job(job_id, None if error else pdf_url, render_ms=render_ms, error=error)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Could not record PDF job {job_id}: {str(e)}")
+
+
+def _complete_job(job_id, pdf_url, render_ms=None, error=None, record_time=True):
+    """Mark the job finished and point its form at the new PDF, unless a newer job superseded it"""
+    job = db.session.get(PdfJob, job_id)
+    if job is None:
+        return
+    job.status = 'failed' if error else 'done'
+    job.pdf_url = pdf_url
+    job.error = error
+    job.render_ms = render_ms
+    job.finished_at = datetime.utcnow()
+    if pdf_url:
+        index_stored_file(pdf_url, kind=QUOTE_PDF)
+
+    if pdf_url and job.form_id:
+        latest = PdfJob.query.filter_by(form_id=job.form_id) \
+            .order_by(PdfJob.created_at.desc()).first()
+        if latest is None or latest.id == job_id:
+            PricingForm.query.filter_by(id=job.form_id).update(
+                {'quote_pdf_url': pdf_url}, synchronize_session=False
+            )
+    db.session.commit()
+
+    with _lock:
+        _counters['failed' if error else 'done'] += 1
+        if record_time and render_ms is not None:
+            _render_ms.append(render_ms)
+
+
+def get_pdf_job(job_id):
+    """Load a job, failing it if it has been queued past PDF_RENDER_TIMEOUT_SECONDS"""
+    job = db.session.get(PdfJob, job_id)
+    if job is None or job.status != 'queued':
+        return job
+    timeout = timedelta(seconds=current_app.config['PDF_RENDER_TIMEOUT_SECONDS'])
+    if job.created_at and datetime.utcnow() - job.created_at > timeout:
+        # The process that owned the render went away (restart, crash)
+        job.status = 'failed'
+        job.error = 'Render timed out'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    return job
+
+
+def _percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+def pdf_metrics():
+    """Queue depth and render times; counters are per worker process, job counts are global"""
+    with _lock:
+        samples = sorted(_render_ms)
+        counters = dict(_counters)
+        in_flight = _in_flight
+    config = current_app.config
+
+    render_ms = {'count': len(samples)}
+    if samples:
+        render_ms.update(
+            avg=round(sum(samples) / len(samples), 2),
+            p50=round(_percentile(samples, 0.50), 2),
+            p95=round(_percentile(samples, 0.95), 2),
+            max=round(samples[-1], 2)
+        )
+
+    return {
+        'workers': config['PDF_RENDER_WORKERS'],
+        'max_queue': config['PDF_RENDER_MAX_QUEUE'],
+        'in_flight': in_flight,
+        'queued_jobs': PdfJob.query.filter_by(status='queued').count(),
+        'failed_jobs': PdfJob.query.filter_by(status='failed').count(),
+        **counters,
+        'render_ms': render_ms
+    }
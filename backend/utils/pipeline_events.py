@@ -0,0 +1,115 @@
+import json
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, insert
+from models import db, PipelineEvent
+
+STAGE_CHANGE = 'stage-change'
+QUOTE_UPDATE = 'quote-update'
+NEW_ITEM = 'new-item'
+
+EVENT_BATCH_SIZE = 100
+
+
+def record_pipeline_event(event_type, payload):
+    """Queue an event in the current transaction; it becomes visible when the caller commits"""
+    db.session.add(PipelineEvent(event_type=event_type, payload=payload))
+
+
+def record_pipeline_events(event_type, payloads):
+    """Queue many events of one type with a single batched insert"""
+    if not payloads:
+        return
+    now = datetime.utcnow()
+    db.session.execute(insert(PipelineEvent), [
+        {'event_type': event_type, 'payload': payload, 'created_at': now}
+        for payload in payloads
+    ])
+
+
+def latest_event_id():
+    return db.session.query(func.max(PipelineEvent.id)).scalar() or 0
+
+
+def format_sse(event):
+    return f"id: {event.id}\nevent: {event.event_type}\ndata: {json.dumps(event.payload)}\n\n"
+
+
+def stream_pipeline_events(last_event_id):
+    """
+    Yield SSE frames for events newer than last_event_id
+    
+    Every worker polls the shared pipeline_events table, so writes from any
+    worker reach every connected client. The stream ends after
+    PIPELINE_EVENTS_MAX_STREAM_SECONDS and the browser resumes with Last-Event-ID.
+    
+    Ids are allocated at insert but become visible at commit, so a lower id
+    can appear after a higher one. Events are therefore sent strictly in id
+    order: an event following a missing id is held back until the id shows
+    up or PIPELINE_EVENTS_GAP_GRACE_SECONDS pass (a rolled back write never
+    fills its id). Everything up to the last sent id is settled, which keeps
+    Last-Event-ID a safe resume point.
+    """
+    config = current_app.config
+    poll_seconds = config['PIPELINE_EVENTS_POLL_SECONDS']
+    heartbeat_seconds = config['PIPELINE_EVENTS_HEARTBEAT_SECONDS']
+    gap_grace_seconds = config['PIPELINE_EVENTS_GAP_GRACE_SECONDS']
+    deadline = time.monotonic() + config['PIPELINE_EVENTS_MAX_STREAM_SECONDS']
+    last_sent = time.monotonic()
+    gaps_seen = {}  # event id -> when an id just below it was first found missing
+    
+    yield f"retry: {int(poll_seconds * 1000)}\n\n"
+    try:
+        while time.monotonic() < deadline:
+            events = PipelineEvent.query.filter(PipelineEvent.id > last_event_id) \
+                .order_by(PipelineEvent.id.asc()).limit(EVENT_BATCH_SIZE).all()
+            # Hand the connection back to the pool between polls
+            db.session.close()
+            
+            now = time.monotonic()
+            previous_id = last_event_id
+            for event in events:
+                if event.id > previous_id + 1:
+                    gaps_seen.setdefault(event.id, now)
+                previous_id = event.id
+            
+            sent = 0
+            for event in events:
+                if event.id > last_event_id + 1 and now - gaps_seen[event.id] < gap_grace_seconds:
+                    break
+                last_event_id = event.id
+                sent += 1
+                yield format_sse(event)
+            for event_id in [event_id for event_id in gaps_seen if event_id <= last_event_id]:
+                del gaps_seen[event_id]
+                
+            if sent:
+                last_sent = time.monotonic()
+                if sent == EVENT_BATCH_SIZE:
+                    continue
+            elif time.monotonic() - last_sent >= heartbeat_seconds:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+                
+            time.sleep(poll_seconds)
+    finally:
+        db.session.remove()
+
+
+def prune_pipeline_events():
+    """Delete events older than PIPELINE_EVENTS_RETENTION"""
+    cutoff = datetime.utcnow() - current_app.config['PIPELINE_EVENTS_RETENTION']
+    deleted = PipelineEvent.query.filter(PipelineEvent.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+@click.command('prune-pipeline-events')
+@with_appcontext
+def prune_pipeline_events_command():
+    """Delete pipeline events past the retention window"""
+    deleted = prune_pipeline_events()
+    click.echo(f"Deleted {deleted} pipeline events")
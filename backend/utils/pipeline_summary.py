@@ -0,0 +1,96 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func
+from models import db, ProjectPipeline, PipelineStageSummary
+
+
+def summary_snapshot(item):
+    """Capture the values of a pipeline item that feed the stage rollup"""
+    return (item.current_stage, item.quote_amount or 0, item.contract_amount or 0)
+
+
+def apply_summary_change(before, after):
+    """
+    Move a pipeline item's contribution between rollup rows
+    
+    Args:
+        before (tuple): summary_snapshot() taken before the write, or None for new items
+        after (tuple): summary_snapshot() taken after the write
+        
+    Runs in the caller's transaction so the rollup commits together with the item.
+    """
+    if before == after:
+        return
+    if before is not None:
+        _adjust_stage(before[0], -1, -before[1], -before[2])
+    if after is not None:
+        _adjust_stage(after[0], 1, after[1], after[2])
+
+
+def apply_bulk_stage_move(snapshots, target_stage):
+    """
+    Move many items' contributions to target_stage with one delta per source stage
+    
+    Args:
+        snapshots (list): summary_snapshot() tuples of the items being moved
+        target_stage (str): stage the items are moving into
+    """
+    deltas = {}
+    for stage, quote_amount, contract_amount in snapshots:
+        count, quote_total, contract_total = deltas.get(stage, (0, 0, 0))
+        deltas[stage] = (count + 1, quote_total + quote_amount, contract_total + contract_amount)
+        
+    moved = [0, 0, 0]
+    for stage, (count, quote_total, contract_total) in deltas.items():
+        _adjust_stage(stage, -count, -quote_total, -contract_total)
+        moved[0] += count
+        moved[1] += quote_total
+        moved[2] += contract_total
+    if moved[0]:
+        _adjust_stage(target_stage, *moved)
+
+
+def _adjust_stage(stage, count, quote_amount, contract_amount):
+    # Relative UPDATE so concurrent writers don't overwrite each other's deltas
+    updated = PipelineStageSummary.query.filter_by(stage=stage).update({
+        PipelineStageSummary.item_count: PipelineStageSummary.item_count + count,
+        PipelineStageSummary.quote_amount_total: PipelineStageSummary.quote_amount_total + quote_amount,
+        PipelineStageSummary.contract_amount_total: PipelineStageSummary.contract_amount_total + contract_amount
+    }, synchronize_session=False)
+    if not updated:
+        db.session.add(PipelineStageSummary(
+            stage=stage,
+            item_count=count,
+            quote_amount_total=quote_amount,
+            contract_amount_total=contract_amount
+        ))
+        db.session.flush()
+
+
+def rebuild_stage_summary():
+    """Recompute the whole rollup from project_pipeline"""
+    rows = db.session.query(
+        ProjectPipeline.current_stage,
+        func.count(ProjectPipeline.id),
+        func.coalesce(func.sum(ProjectPipeline.quote_amount), 0),
+        func.coalesce(func.sum(ProjectPipeline.contract_amount), 0)
+    ).group_by(ProjectPipeline.current_stage).all()
+    
+    PipelineStageSummary.query.delete()
+    for stage, count, quote_total, contract_total in rows:
+        db.session.add(PipelineStageSummary(
+            stage=stage,
+            item_count=count,
+            quote_amount_total=quote_total,
+            contract_amount_total=contract_total
+        ))
+    db.session.commit()
+    return len(rows)
+
+
+@click.command('rebuild-pipeline-summary')
+@with_appcontext
+def rebuild_pipeline_summary_command():
+    """Rebuild the per-stage pipeline summary table"""
+    stages = rebuild_stage_summary()
+    click.echo(f"Rebuilt pipeline summary for {stages} stages")
@@ -0,0 +1,41 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+
+# Pool name -> config key holding its worker count
+POOL_WORKERS = {
+    'pdf_render': 'PDF_RENDER_WORKERS',
+    'ingest': 'INGEST_WORKERS',
+    'form_validate': 'FORM_VALIDATE_WORKERS'
+}
+
+_lock = threading.Lock()
+_pools = {}  # name -> (pid, executor)
+
+
+def get_pool(name):
+    """
+    This process's pool for name, created on first use
+
+    Each pool is sized from its POOL_WORKERS config key and started with the
+    spawn method; a forked web worker gets its own pool instead of sharing
+    the parent's.
+    """
+    with _lock:
+        entry = _pools.get(name)
+        if entry is None or entry[0] != os.getpid():
+            workers = current_app.config[POOL_WORKERS[name]]
+            entry = (os.getpid(), ProcessPoolExecutor(max_workers=workers,
+                                                      mp_context=multiprocessing.get_context('spawn')))
+            _pools[name] = entry
+        return entry[1]
+
+
+def discard_pool(name):
+    """Shut down a broken pool; the next get_pool(name) starts a fresh one"""
+    with _lock:
+        entry = _pools.pop(name, None)
+    if entry is not None:
+        entry[1].shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,83 @@
+import json
+from utils.quote_calculator import calculate_quote, calculate_quotes_batch
+from utils.validators import validate_quote_input
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+
+def iter_ndjson(stream):
+    """
+    Yield one parsed value per non-blank line of an NDJSON byte stream
+
+    Lines that are not valid JSON are yielded as ValueError instances so the
+    caller can report them against their row index.
+    """
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"Invalid JSON: {str(e)}")
+
+
+def price_rows(rows, chunk_size, max_rows=None):
+    """
+    Validate and price calculation inputs chunk by chunk
+
+    Args:
+        rows (iterable): calculation inputs (or ValueError for unparseable rows)
+        chunk_size (int): rows priced per calculate_quotes_batch call
+        max_rows (int): stop with an error row after this many inputs
+
+    Yields:
+        tuple: (index, input, result) in input order; result is a
+        calculate_quote-shaped dict, with 'errors' for validation failures
+    """
+    chunk = []
+    for index, row in enumerate(rows):
+        if max_rows is not None and index >= max_rows:
+            yield from _price_chunk(chunk)
+            chunk = []
+            yield index, None, {'success': False, 'error': f"Batch is limited to {max_rows} rows"}
+            return
+        chunk.append((index, row))
+        if len(chunk) >= chunk_size:
+            yield from _price_chunk(chunk)
+            chunk = []
+    yield from _price_chunk(chunk)
+
+
+def _price_chunk(chunk):
+    results = {}
+    valid = []
+    for index, row in chunk:
+        if isinstance(row, ValueError):
+            results[index] = (None, {'success': False, 'error': str(row)})
+            continue
+        is_valid, loaded = validate_quote_input(row)
+        if is_valid:
+            valid.append((index, loaded))
+        else:
+            results[index] = (row, {'success': False, 'errors': loaded})
+
+    if valid:
+        try:
+            priced = calculate_quotes_batch([row for _, row in valid])
+        except (TypeError, KeyError, AttributeError):
+            # A malformed nested value breaks the whole chunk; isolate it per row
+            priced = [_price_one(row) for _, row in valid]
+        for (index, row), result in zip(valid, priced):
+            results[index] = (row, result)
+
+    for index, _ in chunk:
+        row, result = results[index]
+        yield index, row, result
+
+
+def _price_one(row):
+    try:
+        return calculate_quote(row)
+    except (TypeError, KeyError, AttributeError) as e:
+        return {'success': False, 'error': f"Could not price row: {str(e)}"}
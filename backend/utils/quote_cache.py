@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from utils.quote_calculator import (
+    MALFORMED_INPUT_ERRORS, calculate_quote, calculation_inputs, get_pricing_rules, quote_valid_until
+)
+
+QUOTE_CACHE_SIZE = int(os.environ.get('QUOTE_CACHE_SIZE', 2048))
+QUOTE_CACHE_TTL_SECONDS = int(os.environ.get('QUOTE_CACHE_TTL_SECONDS', 3600))
+
+
+class QuoteCache:
+    """
+    Size-bounded LRU of pricing results with per-entry expiry
+
+    Each worker process keeps its own cache.
+    """
+
+    def __init__(self, maxsize=QUOTE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+quote_cache = QuoteCache()
+
+
+def quote_cache_key(data, rules=None):
+    """SHA-256 of the canonical calculation inputs and the pricing rules version"""
+    rules = rules or get_pricing_rules()
+    canonical = json.dumps(
+        calculation_inputs(data, rules),
+        sort_keys=True,
+        separators=(',', ':'),
+        default=str
+    )
+    return hashlib.sha256(f"{rules.version}|{canonical}".encode('utf-8')).hexdigest()
+
+
+def cached_calculate_quote(data):
+    """
+    calculate_quote with memoization on the canonical input hash
+
+    Only the pricing is cached; valid_until is stamped fresh on every call,
+    so a quote served from the cache carries the same date as a new one.
+    Returns a fresh copy so callers can't mutate the cached entry. Input too
+    malformed to hash bypasses the cache and gets calculate_quote's error.
+    """
+    rules = get_pricing_rules()
+    try:
+        key = quote_cache_key(data, rules)
+    except MALFORMED_INPUT_ERRORS:
+        return calculate_quote(data)
+    result = quote_cache.get(key)
+    if result is None:
+        result = calculate_quote(data)
+        result.pop('valid_until', None)
+        quote_cache.set(key, result, time.time() + QUOTE_CACHE_TTL_SECONDS)
+    copy = dict(result)
+    if copy.get('success'):
+        copy['breakdown'] = dict(copy['breakdown'])
+        copy['valid_until'] = quote_valid_until(rules)
+    return copy
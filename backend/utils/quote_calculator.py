@@ -1,139 +1,452 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
 from datetime import datetime, timedelta
 
-def calculate_db_table_cost(record_count):
-    if record_count < 1000:
-        return 40
-    elif 1000 <= record_count < 10000:
-        return 100
-    elif 10000 <= record_count < 100000:
-        return 200
-    elif 100000 <= record_count < 1000000:
-        return 300
-    elif 1000000 <= record_count < 10000000:
-        return 300
-    else:  # > 10,000,000
-        return 700
-
-def calculate_widget_cost(num_widgets):
-    return num_widgets * 20  # $20 per widget
-
-def calculate_data_file_cost(data_sources):
+logger = logging.getLogger(__name__)
+
+# Versioned rate/tier table; override the location with PRICING_RULES_PATH
+PRICING_RULES_PATH = os.environ.get(
+    'PRICING_RULES_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pricing_rules.json')
+)
+# How often workers stat the rules file to pick up edits without a restart
+PRICING_RULES_CHECK_SECONDS = 5
+
+
+class PricingRules:
+    """
+    Rate/tier table compiled for fast lookups
+
+    Record-count tiers become parallel bound/cost lists so that
+    bisect_right(tier_bounds, n) indexes tier_costs directly.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.version = table['version']
+        self.currency = table.get('currency', 'USD')
+        self.valid_days = table.get('valid_days', 30)
+        self.notes = table.get('notes', '')
+        self.max_total_file_size_mb = table['max_total_file_size_mb']
+        self.priced_file_types = frozenset(table['priced_file_types'])
+        self.rates = dict(table['rates'])
+        self.integration_base = (
+            self.rates['integration_api'] +
+            self.rates['integration_db'] +
+            self.rates['integration_backend_deployment']
+        )
+        self.branding_options = dict(table['branding_options'])
+        self.support_plans = dict(table['support_plans'])
+        self.bi_developer_monthly_rates = dict(table['bi_developer_monthly_rates'])
+
+        tiers = table['db_table_tiers']
+        if not tiers or tiers[-1]['below'] is not None:
+            raise ValueError("The last db_table_tiers entry must have \"below\": null")
+        self.tier_bounds = [tier['below'] for tier in tiers[:-1]]
+        if self.tier_bounds != sorted(self.tier_bounds):
+            raise ValueError("db_table_tiers bounds must be ascending")
+        self.tier_costs = [tier['cost'] for tier in tiers]
+
+    def db_table_cost(self, record_count):
+        return self.tier_costs[bisect_right(self.tier_bounds, record_count)]
+
+
+_rules = None
+_rules_mtime = None
+_rules_checked_at = 0.0
+_rules_lock = threading.Lock()
+
+
+def load_pricing_rules(path=PRICING_RULES_PATH):
+    """Read and compile a rules table from disk"""
+    with open(path, encoding='utf-8') as f:
+        return PricingRules(json.load(f))
+
+
+def get_pricing_rules():
+    """
+    Return the compiled rules, reloading them if the file changed on disk
+
+    A broken edit is logged and the previously compiled rules stay in use.
+    """
+    global _rules, _rules_mtime, _rules_checked_at
+    now = time.monotonic()
+    if _rules is not None and now - _rules_checked_at < PRICING_RULES_CHECK_SECONDS:
+        return _rules
+
+    with _rules_lock:
+        if _rules is not None and now - _rules_checked_at < PRICING_RULES_CHECK_SECONDS:
+            return _rules
+        _rules_checked_at = now
+        mtime = os.stat(PRICING_RULES_PATH).st_mtime_ns
+        if mtime != _rules_mtime:
+            try:
+                _rules = load_pricing_rules()
+                _rules_mtime = mtime
+                logger.info(f"Loaded pricing rules version {_rules.version}")
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                if _rules is None:
+                    raise
+                logger.error(f"Keeping pricing rules {_rules.version}, reload failed: {str(e)}")
+    return _rules
+
+
+def calculate_db_table_cost(record_count, rules=None):
+    rules = rules or get_pricing_rules()
+    return rules.db_table_cost(record_count)
+
+def calculate_dashboard_cost(num_dashboards, rules=None):
+    rules = rules or get_pricing_rules()
+    return num_dashboards * rules.rates['dashboard']
+
+def calculate_widget_cost(num_widgets, rules=None):
+    rules = rules or get_pricing_rules()
+    return num_widgets * rules.rates['widget']
+
+def calculate_data_file_cost(data_sources, rules=None):
+    rules = rules or get_pricing_rules()
     total_size = 0
     cost = 0
-    
-    # First check if total size exceeds 30MB
+
+    # First check if total size exceeds the limit
     for file in data_sources:
         total_size += file.get('size_mb', 0)
-    
-    if total_size > 30:
-        raise ValueError("Total file size exceeds 30MB limit")
-    
+
+    if total_size > rules.max_total_file_size_mb:
+        raise ValueError(f"Total file size exceeds {rules.max_total_file_size_mb}MB limit")
+
     # Calculate cost for each file type
     for file in data_sources:
-        if file['type'] in ['csv', 'xml', 'xls', 'xlsx', 'json']:
-            cost += 40
-    
+        if file['type'] in rules.priced_file_types:
+            cost += rules.rates['data_file']
+
     return cost
 
-def calculate_database_cost(db_sources):
+def calculate_database_cost(db_sources, rules=None):
+    rules = rules or get_pricing_rules()
     cost = 0
     for db in db_sources:
-        db_type = db.get('type')
         for table in db.get('tables_info', []):
-            cost += calculate_db_table_cost(table.get('record_count', 0))
+            cost += rules.db_table_cost(table.get('record_count', 0))
     return cost
 
-def calculate_integration_cost(integrations):
+def calculate_integration_cost(integrations, rules=None):
+    rules = rules or get_pricing_rules()
     cost = 0
     for integration in integrations:
-        # Base API cost
-        cost += 400
-        
-        # DB integration cost
-        cost += 400
-        
-        # Backend deployment
-        cost += 400
-        
+        # Base API, DB integration and backend deployment
+        cost += rules.integration_base
+
         # Add DB hosting cost if applicable
         if integration.get('db_tables'):
             for table in integration['db_tables']:
-                cost += calculate_db_table_cost(table.get('record_count', 0))
+                cost += rules.db_table_cost(table.get('record_count', 0))
     return cost
 
-def calculate_features_cost(drilldowns_per_widget, num_widgets):
-    return drilldowns_per_widget * num_widgets * 20
+def calculate_features_cost(drilldowns_per_widget, num_widgets, features=None, rules=None):
+    rules = rules or get_pricing_rules()
+    cost = drilldowns_per_widget * num_widgets * rules.rates['feature_drilldown']
+    if features:
+        cost += len(features) * rules.rates['feature_option']
+    return cost
 
-def calculate_branding_cost(data):
+def calculate_branding_cost(data, rules=None):
+    rules = rules or get_pricing_rules()
     cost = 0
     if data.get('include_logo'):
-        cost += 40
-        
+        cost += rules.rates['branding_logo']
+
     num_widgets = data.get('num_widgets', 0)
     num_dashboards = data.get('num_dashboards', 0)
-    
-    # Widget brand color
-    if data.get('widget_brand_color'):
-        cost += num_widgets * 20
-    
-    # Dashboard brand color
-    if data.get('dashboard_brand_color'):
-        cost += num_dashboards * 20
-    
-    # Widget font style
-    if data.get('widget_font_style'):
-        cost += num_widgets * 20
-    
-    # Dashboard name style
-    if data.get('dashboard_name_style'):
-        cost += num_dashboards * 20
-    
-    # Localization
-    if data.get('localize_widgets'):
-        cost += num_widgets * 20
-    if data.get('localize_headings'):
-        cost += num_dashboards * 20
-    
+
+    # Brand colors, font/name styles and localization, per widget or per dashboard
+    for option, applies_to in rules.branding_options.items():
+        if data.get(option):
+            if applies_to == 'widget':
+                cost += num_widgets * rules.rates['branding_per_widget']
+            else:
+                cost += num_dashboards * rules.rates['branding_per_dashboard']
+
     return cost
 
-def calculate_support_cost(data):
-    plan = data.get('support_plan', 'basic')
-    if plan == 'priority':
-        return 40 * data.get('support_hours', 0)
-    elif plan == 'manager_20hr':
-        return 400
-    elif plan == 'manager_40hr':
-        return 800
-    elif plan == 'manager_contract':
-        return 1200 * 6  # 6-month contract
-    return 0
-
-def calculate_bi_developer_cost(data):
+def calculate_support_cost(data, rules=None):
+    rules = rules or get_pricing_rules()
+    plan = rules.support_plans.get(data.get('support_plan', 'basic'))
+    if not plan:
+        return 0
+    if 'per_hour' in plan:
+        return plan['per_hour'] * data.get('support_hours', 0)
+    if 'per_month' in plan:
+        return plan['per_month'] * data.get('support_months', 0)
+    return plan.get('flat', 0)
+
+def calculate_bi_developer_cost(data, rules=None):
+    rules = rules or get_pricing_rules()
     dev_level = data.get('bi_developer_level')
     months = data.get('bi_dev_months', 1)
-    rates = {
-        'entry': 800,
-        'mid': 1200,
-        'senior': 2000,
-        'advanced': 3000
+    return rules.bi_developer_monthly_rates.get(dev_level, 0) * months
+
+
+def normalize_calculation_input(data):
+    """
+    Map the legacy /api/generate-quote payload onto the engine's input shape
+
+    Older clients send database_tables [{records}], num_apis, custom_colors,
+    custom_fonts and data_sources as plain type names. Keys already in the
+    engine's shape are left untouched.
+    """
+    data = dict(data)
+
+    if 'database_tables' in data and 'database_sources' not in data:
+        data['database_sources'] = [{
+            'tables_info': [
+                {'record_count': table.get('records', 0)} for table in data['database_tables'] or []
+            ]
+        }]
+    if 'num_apis' in data and 'integrations' not in data:
+        data['integrations'] = [{} for _ in range(data['num_apis'] or 0)]
+    if data.get('custom_colors'):
+        data.setdefault('widget_brand_color', True)
+        data.setdefault('dashboard_brand_color', True)
+    if data.get('custom_fonts'):
+        data.setdefault('widget_font_style', True)
+    if data.get('data_sources'):
+        data['data_sources'] = [
+            {'type': source.lower(), 'size_mb': 0} if isinstance(source, str) else source
+            for source in data['data_sources']
+        ]
+
+    return data
+
+
+# Raised by rule checks and by malformed input rows (e.g. a legacy table that is not an object)
+MALFORMED_INPUT_ERRORS = (ValueError, TypeError, AttributeError, KeyError)
+
+
+# Inputs read by calculate_quote, besides the rules' branding options
+CALCULATION_KEYS = (
+    'num_dashboards', 'num_widgets', 'drilldowns_per_widget', 'data_sources',
+    'database_sources', 'integrations', 'features', 'include_logo',
+    'support_plan', 'support_hours', 'support_months',
+    'bi_developer_level', 'bi_dev_months'
+)
+
+
+def calculation_inputs(data, rules=None):
+    """Keep only the normalized fields that affect the price"""
+    rules = rules or get_pricing_rules()
+    data = normalize_calculation_input(data)
+    keys = CALCULATION_KEYS + tuple(rules.branding_options)
+    return {key: data[key] for key in keys if key in data}
+
+
+def form_to_calculation_input(form_data, data_files=None):
+    """
+    Build engine input from PricingForm.to_dict()
+
+    Args:
+        form_data (dict): serialized PricingForm with JSON fields parsed
+        data_files (list): profiled uploads from ingested_data_files(); they
+            replace the declared data source of the same type and are hosted
+            as tables priced by their row count
+
+    Returns:
+        dict: input for calculate_quote
+    """
+    deliverables = form_data.get('expected_deliverables') or []
+    if not isinstance(deliverables, list):
+        deliverables = []
+    num_dashboards = sum(
+        d.get('quantity') or 1 if isinstance(d, dict) else 1 for d in deliverables
+    )
+    num_widgets = form_data.get('number_of_widgets')
+    if num_widgets is None:
+        num_widgets = sum(d.get('widgets') or 0 for d in deliverables if isinstance(d, dict))
+
+    databases = form_data.get('databases') or []
+    if not isinstance(databases, list):
+        databases = []
+    customization = [
+        c.lower() for c in (form_data.get('customization_needs') or []) if isinstance(c, str)
+    ]
+    interactivity = form_data.get('interactivity_needed') or []
+
+    support_plan = {
+        'Basic': 'basic',
+        'Priority': 'priority',
+        'Dedicated Account Manager': 'dedicated'
+    }.get(form_data.get('support_plan_required'), 'basic')
+
+    data_sources = form_data.get('data_sources') or []
+    database_sources = [
+        {
+            'type': db.get('type') if isinstance(db, dict) else db,
+            'tables_info': db.get('tables_info', []) if isinstance(db, dict) else []
+        }
+        for db in databases
+    ]
+    if data_files:
+        ingested_types = {f['type'] for f in data_files}
+        data_sources = [
+            source for source in data_sources
+            if not (isinstance(source, str) and source.lower() in ingested_types)
+        ] + [{'type': f['type'], 'size_mb': f['size_mb']} for f in data_files]
+        database_sources.append({
+            'type': 'uploaded_files',
+            'tables_info': [{'name': f['name'], 'record_count': f['row_count']} for f in data_files]
+        })
+
+    return {
+        'num_dashboards': num_dashboards,
+        'num_widgets': num_widgets,
+        'data_sources': data_sources,
+        'database_sources': database_sources,
+        'integrations': [{} for _ in range(form_data.get('number_of_integrations') or 0)],
+        'features': interactivity if isinstance(interactivity, list) else [],
+        'include_logo': any('branding' in c or 'logo' in c for c in customization),
+        'custom_colors': any('color' in c for c in customization),
+        'custom_fonts': any('font' in c for c in customization),
+        'support_plan': support_plan,
+        'support_hours': 10 if support_plan == 'priority' else 0,
+        'support_months': 1 if support_plan == 'dedicated' else 0
     }
-    return rates.get(dev_level, 0) * months
 
-def calculate_quote(form_data):
+
+# Breakdown components in output order: the inputs each one reads and how
+# to price it. Branding also reads every key in rules.branding_options.
+BREAKDOWN_COMPONENTS = {
+    'dashboards': (
+        ('num_dashboards',),
+        lambda data, rules: calculate_dashboard_cost(data.get('num_dashboards', 0), rules)
+    ),
+    'widgets': (
+        ('num_widgets',),
+        lambda data, rules: calculate_widget_cost(data.get('num_widgets', 0), rules)
+    ),
+    'data_files': (
+        ('data_sources',),
+        lambda data, rules: calculate_data_file_cost(data.get('data_sources', []), rules)
+    ),
+    'database_tables': (
+        ('database_sources',),
+        lambda data, rules: calculate_database_cost(data.get('database_sources', []), rules)
+    ),
+    'integrations': (
+        ('integrations',),
+        lambda data, rules: calculate_integration_cost(data.get('integrations', []), rules)
+    ),
+    'features': (
+        ('drilldowns_per_widget', 'num_widgets', 'features'),
+        lambda data, rules: calculate_features_cost(
+            data.get('drilldowns_per_widget', 0),
+            data.get('num_widgets', 0),
+            data.get('features'),
+            rules
+        )
+    ),
+    'branding': (
+        ('include_logo', 'num_widgets', 'num_dashboards'),
+        calculate_branding_cost
+    ),
+    'support': (
+        ('support_plan', 'support_hours', 'support_months'),
+        calculate_support_cost
+    ),
+    'bi_developer': (
+        ('bi_developer_level', 'bi_dev_months'),
+        calculate_bi_developer_cost
+    )
+}
+
+
+def component_inputs(rules=None):
+    """Map each breakdown component to the set of input keys it reads"""
+    rules = rules or get_pricing_rules()
+    inputs = {name: set(keys) for name, (keys, _) in BREAKDOWN_COMPONENTS.items()}
+    inputs['branding'].update(rules.branding_options)
+    # Legacy keys that normalize_calculation_input maps onto the ones above
+    inputs['database_tables'].add('database_tables')
+    inputs['integrations'].add('num_apis')
+    inputs['branding'].update(('custom_colors', 'custom_fonts'))
+    return inputs
+
+
+# PricingForm columns read by form_to_calculation_input and the inputs they feed
+FORM_FIELD_INPUTS = {
+    'expected_deliverables': ('num_dashboards', 'num_widgets'),
+    'number_of_widgets': ('num_widgets',),
+    'data_sources': ('data_sources',),
+    'databases': ('database_sources',),
+    'number_of_integrations': ('integrations',),
+    'interactivity_needed': ('features',),
+    'customization_needs': ('include_logo', 'custom_colors', 'custom_fonts'),
+    'support_plan_required': ('support_plan', 'support_hours', 'support_months')
+}
+
+
+def dirty_components(changed_fields, rules=None):
+    """
+    Breakdown components affected by a set of changed PricingForm columns
+
+    Returns an empty set when none of the fields feed the price.
+    """
+    touched = set()
+    for field in changed_fields:
+        touched.update(FORM_FIELD_INPUTS.get(field, ()))
+    if not touched:
+        return set()
+    return {name for name, keys in component_inputs(rules).items() if keys & touched}
+
+
+def patch_quote_breakdown(breakdown, calculation_data, components, rules=None):
+    """
+    Re-price only the given components of a stored breakdown
+
+    Args:
+        breakdown (dict): previously stored breakdown
+        calculation_data (dict): current calculation input
+        components (set): names of the components to recompute
+
+    Returns:
+        tuple: (total, patched breakdown)
+
+    Raises:
+        ValueError: if a recomputed component rejects its input
+    """
+    rules = rules or get_pricing_rules()
+    data = normalize_calculation_input(calculation_data)
+    patched = dict(breakdown)
+    patched.update(calculate_components(data, rules, components))
+    return sum(patched.values()), patched
+
+
+def calculate_components(data, rules, components=None):
+    """
+    Price the given breakdown components (all of them by default)
+
+    data must already be normalized. Raises ValueError like the cost helpers.
+    """
+    return {
+        name: price(data, rules)
+        for name, (_, price) in BREAKDOWN_COMPONENTS.items()
+        if components is None or name in components
+    }
+
+
+def quote_valid_until(rules=None):
+    """Validity date stamped on a quote priced now"""
+    rules = rules or get_pricing_rules()
+    return (datetime.now() + timedelta(days=rules.valid_days)).strftime('%Y-%m-%d')
+
+
+def _price(form_data, rules, valid_until):
     try:
-        breakdown = {
-            'widgets': calculate_widget_cost(form_data.get('num_widgets', 0)),
-            'data_files': calculate_data_file_cost(form_data.get('data_sources', [])),
-            'database_tables': calculate_database_cost(form_data.get('database_sources', [])),
-            'integrations': calculate_integration_cost(form_data.get('integrations', [])),
-            'features': calculate_features_cost(
-                form_data.get('drilldowns_per_widget', 0),
-                form_data.get('num_widgets', 0)
-            ),
-            'branding': calculate_branding_cost(form_data),
-            'support': calculate_support_cost(form_data),
-            'bi_developer': calculate_bi_developer_cost(form_data)
-        }
+        form_data = normalize_calculation_input(form_data)
+        breakdown = calculate_components(form_data, rules)
 
         total = sum(breakdown.values())
 
@@ -141,13 +454,37 @@ def calculate_quote(form_data):
             'success': True,
             'total': total,
             'breakdown': breakdown,
-            'currency': 'USD',
-            'valid_until': (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d'),
-            'notes': 'Server and DB hosting costs not included in this estimate'
+            'currency': rules.currency,
+            'valid_until': valid_until,
+            'notes': rules.notes,
+            'pricing_version': rules.version
         }
-    
-    except ValueError as e:
+
+    except MALFORMED_INPUT_ERRORS as e:
         return {
             'success': False,
             'error': str(e)
-        }
\ No newline at end of file
+        }
+
+
+def calculate_quote(form_data):
+    rules = get_pricing_rules()
+    return _price(form_data, rules, quote_valid_until(rules))
+
+
+def calculate_quotes_batch(forms):
+    """
+    Price many forms at once
+
+    Each form goes through the same BREAKDOWN_COMPONENTS as calculate_quote;
+    the rules are looked up and the validity date computed once per batch.
+
+    Args:
+        forms (list): calculation inputs as accepted by calculate_quote
+
+    Returns:
+        list: one calculate_quote-shaped result per form, in input order
+    """
+    rules = get_pricing_rules()
+    valid_until = quote_valid_until(rules)
+    return [_price(form, rules, valid_until) for form in forms]
@@ -0,0 +1,211 @@
+import json
+import os
+import zipfile
+from collections import deque
+from flask import current_app, url_for
+from sqlalchemy import update
+from werkzeug.utils import secure_filename
+from models import db, ProjectPipeline, PricingForm
+from utils.ingestion import ingested_data_files
+from utils.pdf_cache import resolve_quote_pdf
+from utils.pdf_generator import quote_pdf_filename, reuse_cached_pdf
+from utils.pdf_jobs import submit_pdf_render
+from utils.quote_calculator import form_to_calculation_input
+from utils.quote_cache import cached_calculate_quote
+from utils.storage import QUOTE_PDF, index_stored_file, storage_path
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+MAX_REPORTED_FAILURES = 1000
+
+
+class ZipStream:
+    """
+    Write-only, unseekable sink for zipfile.ZipFile
+
+    zipfile falls back to data descriptors when it cannot seek, so entries
+    are written front to back and the caller drains the bytes as they come.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    @property
+    def buffered(self):
+        return len(self._buffer)
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def iter_stage_quotes(stage, batch_size):
+    """Pipeline items in a stage with their form's quote columns, fetched in keyset pages"""
+    last_id = 0
+    while True:
+        rows = db.session.query(
+            ProjectPipeline.id, PricingForm.id, PricingForm.client_name, PricingForm.project_title,
+            PricingForm.quote_total, PricingForm.quote_breakdown, PricingForm.quote_valid_until,
+            PricingForm.quote_pdf_url
+        ).join(PricingForm, ProjectPipeline.form_id == PricingForm.id) \
+            .filter(ProjectPipeline.current_stage == stage, ProjectPipeline.id > last_id) \
+            .order_by(ProjectPipeline.id.asc()).limit(batch_size).all()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def export_entry_name(form_id, client_name, project_title):
+    parts = [secure_filename(client_name or ''), secure_filename(project_title or ''), f"form{form_id}"]
+    return '-'.join(part for part in parts if part) + '.pdf'
+
+
+def _stored_quote(row):
+    """
+    Quote data for the form layout from the stored quote, or None when the form was never priced
+
+    Quotes stored before their validity date was kept are drawn without one.
+    """
+    _, form_id, client_name, project_title, total, breakdown, valid_until, _ = row
+    if isinstance(breakdown, str):  # rows written before the breakdown was stored as JSON
+        breakdown = json.loads(breakdown)
+    if total is None or not isinstance(breakdown, dict):
+        return None
+    quote_data = {'total': total, 'breakdown': breakdown, 'client_name': client_name, 'project_title': project_title}
+    if valid_until is not None:
+        quote_data['valid_until'] = valid_until.isoformat()
+    return quote_data
+
+
+def _price_form(form_id):
+    form = db.session.get(PricingForm, form_id)
+    calculation_data = form_to_calculation_input(form.to_dict(), ingested_data_files(form.id))
+    result = cached_calculate_quote(calculation_data)
+    if not result['success']:
+        raise ValueError(result['error'])
+    return {
+        'total': result['total'],
+        'breakdown': result['breakdown'],
+        'valid_until': result['valid_until'],
+        'client_name': form.client_name,
+        'project_title': form.project_title
+    }
+
+
+def _plan_entry(row):
+    """
+    Find or start the PDF for one pipeline item
+
+    Returns (entry name, path, future or None, url to store on the form or None).
+    Stored quotes keep their PDF; a re-rendered one is written back to the form.
+    Forms without a stored quote are priced for the export only.
+    """
+    _, form_id, client_name, project_title, _, _, _, pdf_url = row
+    name = export_entry_name(form_id, client_name, project_title)
+    path = resolve_quote_pdf(pdf_url)
+    if path:
+        return name, path, None, None
+
+    quote_data = _stored_quote(row)
+    persist = quote_data is not None
+    if quote_data is None:
+        quote_data = _price_form(form_id)
+    filename = quote_pdf_filename('quote', quote_data)
+    path = storage_path(filename)
+    future = None if reuse_cached_pdf(path) else submit_pdf_render('quote', quote_data, path)
+    return name, path, future, url_for('quote.serve_pdf', filename=filename) if persist else None
+
+
+def _write_entry(archive, sink, name, path):
+    with open(path, 'rb') as src, archive.open(name, 'w') as dst:
+        while True:
+            chunk = src.read(EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            dst.write(chunk)
+            if sink.buffered >= EXPORT_CHUNK_SIZE:
+                yield sink.drain()
+    yield sink.drain()
+
+
+def _store_pdf_urls(urls):
+    """Write back re-rendered PDF URLs and commit them with the new storage index rows"""
+    if urls:
+        db.session.execute(update(PricingForm), urls)
+        urls.clear()
+    db.session.commit()
+
+
+def stream_quote_export(stage):
+    """
+    Yield a ZIP of the quote PDFs of every pipeline item in a stage
+
+    Existing PDFs are copied in chunks; missing ones are rendered through the
+    PDF pool, up to PIPELINE_EXPORT_RENDER_AHEAD ahead of the entry being
+    written. Memory stays bounded by the page size, the render window and one
+    chunk. Items that cannot be priced or rendered are listed in errors.txt.
+    """
+    config = current_app.config
+    batch_size = config['PIPELINE_EXPORT_BATCH_SIZE']
+    render_ahead = config['PIPELINE_EXPORT_RENDER_AHEAD']
+
+    sink = ZipStream()
+    archive = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED)
+    pending = deque()
+    rendered_urls = []
+    failures = []
+    failure_count = 0
+
+    def finish(entry):
+        nonlocal failure_count
+        pipeline_id, form_id, name, path, future, pdf_url = entry
+        if future is not None:
+            try:
+                future.result(timeout=config['PDF_RENDER_TIMEOUT_SECONDS'])
+            except Exception as e:
+                failure_count += 1
+                if len(failures) < MAX_REPORTED_FAILURES:
+                    failures.append(f"pipeline item {pipeline_id} (form {form_id}): render failed: {e}")
+                return
+            index_stored_file(os.path.basename(path), kind=QUOTE_PDF, path=path)
+        if pdf_url:
+            rendered_urls.append({'id': form_id, 'quote_pdf_url': pdf_url})
+        yield from _write_entry(archive, sink, name, path)
+
+    for row in iter_stage_quotes(stage, batch_size):
+        try:
+            planned = _plan_entry(row)
+        except Exception as e:
+            failure_count += 1
+            if len(failures) < MAX_REPORTED_FAILURES:
+                failures.append(f"pipeline item {row[0]} (form {row[1]}): {e}")
+            continue
+        pending.append((row[0], row[1], *planned))
+        while len(pending) > render_ahead:
+            yield from finish(pending.popleft())
+        if len(rendered_urls) >= batch_size:
+            _store_pdf_urls(rendered_urls)
+
+    while pending:
+        yield from finish(pending.popleft())
+    _store_pdf_urls(rendered_urls)
+
+    if failure_count:
+        if failure_count > len(failures):
+            failures.append(f"... and {failure_count - len(failures)} more")
+        archive.writestr('errors.txt', '\n'.join(failures) + '\n')
+    archive.close()
+    yield sink.drain()
@@ -0,0 +1,126 @@
+from itertools import product
+from utils.quote_calculator import (
+    BREAKDOWN_COMPONENTS, calculate_components, component_inputs,
+    get_pricing_rules, normalize_calculation_input
+)
+from utils.validators import validate_quote_input
+
+SWEEP_PARAMETERS = (
+    'num_dashboards', 'num_widgets', 'drilldowns_per_widget',
+    'support_plan', 'support_hours', 'support_months',
+    'bi_developer_level', 'bi_dev_months'
+)
+
+
+def expand_range(name, spec):
+    """
+    Turn a range spec into a list of validated values
+
+    A spec is either an explicit list or {"start", "stop", "step"} with an
+    inclusive stop.
+    """
+    if isinstance(spec, dict):
+        try:
+            start, stop, step = spec['start'], spec['stop'], spec.get('step', 1)
+        except KeyError:
+            raise ValueError(f"{name}: range needs start and stop")
+        if not all(isinstance(v, (int, float)) for v in (start, stop, step)) or step <= 0:
+            raise ValueError(f"{name}: start, stop and a positive step must be numbers")
+        values = []
+        value = start
+        while value <= stop:
+            values.append(value)
+            value = start + step * len(values)
+    elif isinstance(spec, list):
+        values = spec
+    else:
+        raise ValueError(f"{name}: expected a list or a start/stop/step object")
+
+    if not values:
+        raise ValueError(f"{name}: range is empty")
+    loaded = []
+    for value in values:
+        is_valid, result = validate_quote_input({name: value})
+        if not is_valid:
+            raise ValueError(f"{name}: {result[name][0]}")
+        loaded.append(result[name])
+    return loaded
+
+
+def sweep_quotes(base, ranges, max_cells):
+    """
+    Price the cartesian grid of parameter ranges around a base input
+
+    Components that don't read any swept parameter are priced once. Each
+    remaining component is priced once per combination of only the swept
+    parameters it reads, and the grid is assembled from those lookups.
+
+    Args:
+        base (dict): validated calculation input
+        ranges (dict): parameter name -> range spec
+        max_cells (int): upper bound on the grid size
+
+    Returns:
+        dict: grid axes, row-major totals and per-component columns
+
+    Raises:
+        ValueError: for unknown parameters, bad ranges, oversized grids or
+            a base input that can't be priced
+    """
+    if not isinstance(ranges, dict) or not ranges:
+        raise ValueError("ranges must be a non-empty object")
+    unknown = [name for name in ranges if name not in SWEEP_PARAMETERS]
+    if unknown:
+        raise ValueError(
+            f"Cannot sweep {', '.join(unknown)}. Sweepable parameters: {', '.join(SWEEP_PARAMETERS)}"
+        )
+
+    names = list(ranges)
+    values = [expand_range(name, ranges[name]) for name in names]
+    cells = 1
+    for axis in values:
+        cells *= len(axis)
+    if cells > max_cells:
+        raise ValueError(f"Grid has {cells} cells, the limit is {max_cells}")
+
+    rules = get_pricing_rules()
+    base = normalize_calculation_input(base)
+    base_breakdown = calculate_components(base, rules)
+
+    inputs = component_inputs(rules)
+    swept = set(names)
+    dirty = [name for name in BREAKDOWN_COMPONENTS if inputs[name] & swept]
+
+    # Price each dirty component over only the axes it depends on
+    lookups = {}
+    for component in dirty:
+        axes = [k for k, name in enumerate(names) if name in inputs[component]]
+        table = {}
+        for index in product(*(range(len(values[k])) for k in axes)):
+            data = dict(base)
+            for k, i in zip(axes, index):
+                data[names[k]] = values[k][i]
+            table[index] = calculate_components(data, rules, (component,))[component]
+        lookups[component] = (axes, table)
+
+    totals = []
+    columns = {component: [] for component in dirty}
+    for index in product(*(range(len(axis)) for axis in values)):
+        breakdown = dict(base_breakdown)
+        for component, (axes, table) in lookups.items():
+            cost = table[tuple(index[k] for k in axes)]
+            breakdown[component] = cost
+            columns[component].append(cost)
+        totals.append(sum(breakdown.values()))
+
+    return {
+        'parameters': names,
+        'values': values,
+        'shape': [len(axis) for axis in values],
+        'cells': cells,
+        'totals': totals,
+        'breakdowns': columns,
+        'fixed': {name: cost for name, cost in base_breakdown.items() if name not in columns},
+        'currency': rules.currency,
+        'pricing_version': rules.version
+    }
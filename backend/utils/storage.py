@@ -0,0 +1,141 @@
+import hashlib
+import os
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import IntegrityError
+from models import db, StoredFile
+
+UPLOAD = 'upload'
+QUOTE_PDF = 'quote_pdf'
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+def storage_root():
+    return current_app.config['UPLOAD_FOLDER']
+
+
+def shard_relative_path(filename):
+    """
+    ab/cd/<filename>, from the sha256 of the filename
+
+    Derived from the name alone, so URLs keep using the bare filename and
+    any worker can find a file without a lookup.
+    """
+    digest = hashlib.sha256(filename.encode('utf-8')).hexdigest()
+    return os.path.join(digest[:2], digest[2:4], filename)
+
+
+def storage_path(filename, root=None):
+    """Sharded absolute path for a stored filename"""
+    return os.path.join(root or storage_root(), shard_relative_path(os.path.basename(filename)))
+
+
+def locate_stored_file(filename, root=None):
+    """Path of an existing file, falling back to the flat layout for files not migrated yet"""
+    filename = os.path.basename(filename)
+    root = root or storage_root()
+    for path in (storage_path(filename, root), os.path.join(root, filename)):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def file_kind(filename):
+    return QUOTE_PDF if filename.startswith('quote_') and filename.endswith('.pdf') else UPLOAD
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def index_stored_file(filename, kind=None, path=None, size=None, checksum=None):
+    """
+    Insert or refresh the index row of a file already in storage
+
+    Runs in a savepoint so a concurrent insert of the same content-addressed
+    file does not roll back the caller's transaction. The caller commits.
+    """
+    filename = os.path.basename(filename)
+    root = storage_root()
+    path = path or locate_stored_file(filename, root)
+    if path is None:
+        return None
+    stat = os.stat(path)
+    values = {
+        'kind': kind or file_kind(filename),
+        'relative_path': os.path.relpath(path, root),
+        'size': stat.st_size if size is None else size,
+        'checksum': checksum or file_checksum(path),
+        'mtime': datetime.utcfromtimestamp(stat.st_mtime)
+    }
+
+    entry = StoredFile.query.filter_by(storage_key=filename).first()
+    if entry is None:
+        try:
+            with db.session.begin_nested():
+                entry = StoredFile(storage_key=filename, **values)
+                db.session.add(entry)
+            return entry
+        except IntegrityError:
+            entry = StoredFile.query.filter_by(storage_key=filename).first()
+    for key, value in values.items():
+        setattr(entry, key, value)
+    return entry
+
+
+def remove_stored_file(entry):
+    """Delete a file and its index row; the caller commits"""
+    try:
+        os.remove(os.path.join(storage_root(), entry.relative_path))
+    except FileNotFoundError:
+        pass
+    db.session.delete(entry)
+
+
+def verify_stored_files(checksums=False):
+    """Compare the index with the disk: missing files, size and (optionally) checksum mismatches"""
+    root = storage_root()
+    report = {'checked': 0, 'missing': [], 'size_mismatch': [], 'checksum_mismatch': []}
+    for entry in StoredFile.query.order_by(StoredFile.id).yield_per(500):
+        report['checked'] += 1
+        path = os.path.join(root, entry.relative_path)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            report['missing'].append(entry.storage_key)
+            continue
+        if size != entry.size:
+            report['size_mismatch'].append(entry.storage_key)
+        elif checksums and file_checksum(path) != entry.checksum:
+            report['checksum_mismatch'].append(entry.storage_key)
+    return report
+
+
+def storage_usage():
+    """Total files and bytes per kind, straight from the index"""
+    rows = db.session.query(StoredFile.kind, db.func.count(StoredFile.id), db.func.sum(StoredFile.size)) \
+        .group_by(StoredFile.kind).all()
+    return {kind: {'files': count, 'bytes': int(total or 0)} for kind, count, total in rows}
+
+
+@click.command('verify-uploads')
+@click.option('--checksums', is_flag=True, help='Also re-hash every file')
+@with_appcontext
+def verify_uploads_command(checksums):
+    """Check indexed uploads and quote PDFs against the disk"""
+    report = verify_stored_files(checksums)
+    for kind, usage in storage_usage().items():
+        click.echo(f"{kind}: {usage['files']} files, {usage['bytes']} bytes")
+    click.echo(f"Checked {report['checked']} files: {len(report['missing'])} missing, "
+               f"{len(report['size_mismatch'])} size mismatches, "
+               f"{len(report['checksum_mismatch'])} checksum mismatches")
+    for problem in ('missing', 'size_mismatch', 'checksum_mismatch'):
+        for key in report[problem]:
+            click.echo(f"  {problem}: {key}")
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import uuid
+from flask import current_app
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+from werkzeug.utils import secure_filename
+from models import StoredFile
+from utils.storage import COPY_CHUNK_SIZE, UPLOAD, index_stored_file, locate_stored_file, storage_path, storage_root
+
+INCOMING_DIR = '.incoming'
+
+
+class SpooledUpload:
+    """An uploaded file written to a temporary path, hashed but not yet stored"""
+
+    def __init__(self, field, filename, tmp_path):
+        self.field = field
+        self.filename = filename
+        self.tmp_path = tmp_path
+        self.size = 0
+        self.checksum = None
+
+    @property
+    def file_type(self):
+        return self.filename.rsplit('.', 1)[-1].lower() if '.' in self.filename else ''
+
+
+def discard_uploads(uploads):
+    for upload in uploads:
+        try:
+            os.remove(upload.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def parse_multipart_stream(request):
+    """
+    Parse a multipart/form-data request straight from the socket
+
+    Unlike request.form/request.files, file parts are never spooled as a
+    whole: each chunk is hashed and appended to a temporary file as it
+    arrives, and UPLOAD_MAX_FILE_BYTES / UPLOAD_MAX_REQUEST_BYTES are checked
+    on every chunk, so an oversized upload is cut off mid-stream.
+
+    Returns:
+        tuple: (MultiDict of form fields, list of SpooledUpload)
+
+    Raises:
+        RequestEntityTooLarge: a limit was exceeded; nothing is left on disk
+        ValueError: the body is not valid multipart data or was cut short;
+            nothing is left on disk
+    """
+    config = current_app.config
+    max_file = config['UPLOAD_MAX_FILE_BYTES']
+    max_request = config['UPLOAD_MAX_REQUEST_BYTES']
+    if request.content_length is not None and request.content_length > max_request:
+        raise RequestEntityTooLarge()
+
+    _, options = parse_options_header(request.headers.get('Content-Type', ''))
+    boundary = options.get('boundary')
+    if not boundary:
+        raise ValueError('Missing multipart boundary')
+
+    decoder = MultipartDecoder(boundary.encode('latin-1'), max_form_memory_size=config['UPLOAD_MAX_FIELD_BYTES'])
+    incoming = os.path.join(storage_root(), INCOMING_DIR)
+    os.makedirs(incoming, exist_ok=True)
+
+    fields = MultiDict()
+    uploads = []
+    received = 0
+    part, field_data, out, digest = None, bytearray(), None, None
+    try:
+        while True:
+            chunk = request.stream.read(COPY_CHUNK_SIZE)
+            received += len(chunk)
+            if received > max_request:
+                raise RequestEntityTooLarge()
+            decoder.receive_data(chunk or None)
+
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, File):
+                    part = SpooledUpload(
+                        field=event.name,
+                        filename=secure_filename(event.filename or ''),
+                        tmp_path=os.path.join(incoming, f"{uuid.uuid4().hex}.tmp")
+                    )
+                    uploads.append(part)
+                    out, digest = open(part.tmp_path, 'wb'), hashlib.sha256()
+                elif isinstance(event, Field):
+                    part = event
+                    field_data.clear()
+                elif isinstance(event, Data):
+                    if isinstance(part, SpooledUpload):
+                        part.size += len(event.data)
+                        if part.size > max_file:
+                            raise RequestEntityTooLarge()
+                        digest.update(event.data)
+                        out.write(event.data)
+                        if not event.more_data:
+                            out.close()
+                            out = None
+                            part.checksum = digest.hexdigest()
+                    else:
+                        field_data += event.data
+                        if not event.more_data:
+                            fields.add(part.name, field_data.decode('utf-8', 'replace'))
+                event = decoder.next_event()
+
+            if isinstance(event, Epilogue):
+                break
+            if not chunk:
+                raise ValueError('Multipart body ended before the closing boundary')
+    except Exception:
+        if out is not None:
+            out.close()
+        discard_uploads(uploads)
+        raise
+
+    # Parts without a filename are empty file inputs
+    discard_uploads([upload for upload in uploads if not upload.filename or upload.size == 0])
+    return fields, [upload for upload in uploads if upload.filename and upload.size]
+
+
+def store_upload(upload):
+    """
+    Move a spooled upload into storage, reusing an existing blob with the same content
+
+    Blobs are keyed by their sha256, so the same deck uploaded with several
+    forms is written once and every FormDocument points at that file. The
+    caller commits the index row.
+
+    Returns:
+        str: absolute path of the stored blob
+    """
+    existing = StoredFile.query.filter_by(checksum=upload.checksum, size=upload.size, kind=UPLOAD).first()
+    if existing is not None:
+        path = locate_stored_file(existing.storage_key)
+        if path is not None:
+            os.remove(upload.tmp_path)
+            return path
+
+    extension = f".{upload.file_type}" if upload.file_type else ''
+    filename = f"{upload.checksum}{extension}"
+    path = storage_path(filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(upload.tmp_path, path)
+    index_stored_file(filename, kind=UPLOAD, path=path, size=upload.size, checksum=upload.checksum)
+    return path
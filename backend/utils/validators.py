@@ -1,6 +1,10 @@
+import math
 import re
+from collections.abc import Mapping
 from datetime import datetime
-from marshmallow import Schema, fields, validate, ValidationError, validates, pre_load, post_load
+from marshmallow import Schema, fields, validate, ValidationError, validates, pre_load, post_load, INCLUDE
+from marshmallow.decorators import POST_LOAD, PRE_LOAD, VALIDATES, VALIDATES_SCHEMA
+from marshmallow.utils import missing
 import json
 
 VALID_SUBSCRIPTION_PLANS = [
@@ -98,9 +102,25 @@ class PricingFormSchema(Schema):
     company_website = fields.String(validate=validate.Length(max=500), allow_none=True)
     use_case_description = fields.String(allow_none=True)
     demo_scheduled_at = fields.DateTime(allow_none=True)
+    reference_links = fields.String(allow_none=True)  # comma-separated
+    number_of_verticals = fields.Integer(validate=validate.Range(min=0), allow_none=True)
+    demo_verticals = fields.Raw(allow_none=True)  # list of names, stored comma-separated
+    custom_vertical = fields.String(validate=validate.Length(max=100), allow_none=True)
+    timezone = fields.String(validate=validate.Length(max=50), allow_none=True)
+    meeting_link = fields.String(validate=validate.Length(max=255), allow_none=True)
+    next_steps = fields.String(allow_none=True)
+    client_suggestions = fields.String(allow_none=True)
     wants_business_analysis = fields.Boolean(allow_none=True)
     problem_statement = fields.String(allow_none=True)
+    case_description = fields.String(allow_none=True)
+    stakeholders = fields.String(allow_none=True)
     visualization_goal = fields.String(allow_none=True)
+    resources_status = fields.String(validate=validate.Length(max=100), allow_none=True)
+    has_support_team = fields.String(validate=validate.Length(max=20), allow_none=True)
+    has_complex_math = fields.String(validate=validate.Length(max=20), allow_none=True)
+    client_type_tag = fields.String(
+        validate=validate.OneOf(['', 'demo', 'business-analysis', 'both']), allow_none=True
+    )
     
     # BI Questions
     has_bi_team = fields.Boolean(allow_none=True)
@@ -181,6 +201,11 @@ class PricingFormSchema(Schema):
         # Auto-map currency based on country
         if 'country' in data and data['country'] and not data.get('currency'):
             data['currency'] = COUNTRY_CURRENCY_MAP.get(data['country'], 'USD')
+        
+        # The form UI sends untouched number, date and email inputs as ''
+        for field in BLANK_AS_MISSING_FIELDS:
+            if data.get(field) == '':
+                data[field] = None
                     
         return data
     
@@ -317,6 +342,13 @@ class PricingFormSchema(Schema):
         
         return value
 
+    @post_load
+    def join_demo_verticals(self, data, **kwargs):
+        """demo_verticals is stored comma-separated, like the form UI's multi-select"""
+        if isinstance(data.get('demo_verticals'), list):
+            data['demo_verticals'] = ','.join(str(vertical) for vertical in data['demo_verticals'])
+        return data
+
     @post_load
     def validate_conditional_fields(self, data, **kwargs):
         """Validate conditional fields based on wants_demo and wants_business_analysis"""
@@ -343,41 +375,274 @@ class PricingFormSchema(Schema):
         
         return data
 
-def validate_form_data(data):
+# Optional fields where '' cannot be a valid value and means "not given"
+BLANK_AS_MISSING_FIELDS = frozenset(
+    name for name, field in PricingFormSchema._declared_fields.items()
+    if not field.required and type(field) not in (fields.String, fields.Raw)
+)
+
+class _HookContext:
+    """Stands in for the schema instance when calling its hooks, so context stays per call"""
+    __slots__ = ('context',)
+    
+    def __init__(self, context):
+        self.context = context
+
+class CompiledSchema:
+    """
+    A marshmallow schema compiled once into plain per-field loaders
+    
+    load() follows Schema.load step by step (pre_load, fields, @validates,
+    unknown fields, post_load) and calls the schema's own hooks, but skips
+    building a schema per request and marshmallow's generic dispatch. Values
+    already of the field's type take a direct path; anything else goes
+    through the field's own deserialize(), and so does any value a validator
+    rejects, so error messages are exactly marshmallow's.
+    """
+    
+    def __init__(self, schema_class):
+        schema = schema_class()
+        hooks = schema._hooks
+        if hooks[(VALIDATES_SCHEMA, False)] or hooks[(VALIDATES_SCHEMA, True)] \
+                or hooks[(PRE_LOAD, True)] or hooks[(POST_LOAD, True)]:
+            raise ValueError(f"{schema_class.__name__} uses hooks CompiledSchema does not support")
+        
+        self.type_message = schema.error_messages['type']
+        self.unknown_message = schema.error_messages['unknown']
+        self.loaders = []
+        for attr_name, field in schema.load_fields.items():
+            data_key = field.data_key if field.data_key is not None else attr_name
+            self.loaders.append((
+                data_key,
+                field.attribute or attr_name,
+                self._compile_field(field),
+                [field.error_messages['required']] if field.required else None,
+                field.allow_none,
+                [field.error_messages['null']]
+            ))
+        self.data_keys = frozenset(loader[0] for loader in self.loaders)
+        
+        self.pre_load = [getattr(schema_class, name) for name in hooks[(PRE_LOAD, False)]]
+        self.post_load = [getattr(schema_class, name) for name in hooks[(POST_LOAD, False)]]
+        for hook in self.pre_load + self.post_load:
+            for key in ((PRE_LOAD, False), (POST_LOAD, False)):
+                if hook.__marshmallow_hook__.get(key, {}).get('pass_original'):
+                    raise ValueError(f"{schema_class.__name__} uses hooks CompiledSchema does not support")
+        
+        self.field_validators = []
+        for name in hooks[VALIDATES]:
+            hook = getattr(schema_class, name)
+            field_name = hook.__marshmallow_hook__[VALIDATES]['field_name']
+            field = schema.load_fields.get(field_name)
+            if field is None:
+                continue
+            data_key = field.data_key if field.data_key is not None else field_name
+            self.field_validators.append((field.attribute or field_name, data_key, hook))
+    
+    @staticmethod
+    def _compile_field(field):
+        """Loader for a present, non-None value"""
+        validators = tuple(field.validators)
+        deserialize = field.deserialize
+        
+        if isinstance(field, fields.String):
+            accepts = lambda value: type(value) is str
+        elif isinstance(field, fields.Boolean):
+            accepts = lambda value: value is True or value is False
+        elif isinstance(field, fields.Integer):
+            accepts = lambda value: type(value) is int
+        elif isinstance(field, fields.Float):
+            accepts = lambda value: type(value) is float and (field.allow_nan or math.isfinite(value))
+        elif type(field) is fields.Raw:
+            accepts = lambda value: True
+        else:
+            return deserialize
+        
+        def load(value):
+            if not accepts(value):
+                return deserialize(value)
+            try:
+                for validator in validators:
+                    validator(value)
+            except ValidationError:
+                # Let the field collect every message, like And() does
+                return deserialize(value)
+            return value
+        return load
+    
+    def load(self, data, context=None, partial=None):
+        """
+        Deserialize and validate like schema_class(context=context).load(data, partial=partial)
+        
+        partial is True or a collection of field names allowed to be missing.
+        
+        Raises:
+            ValidationError: with the same messages marshmallow would give
+        """
+        holder = _HookContext(context or {})
+        for hook in self.pre_load:
+            try:
+                data = hook(holder, data, many=False, partial=partial)
+            except ValidationError as err:
+                raise ValidationError(err.normalized_messages(), data=data)
+        if not isinstance(data, Mapping):
+            raise ValidationError({'_schema': [self.type_message]}, data=data)
+        
+        result = {}
+        errors = {}
+        for data_key, attribute, load, required, allow_none, null in self.loaders:
+            value = data.get(data_key, missing)
+            if value is missing:
+                if required and not (partial is True or (partial and attribute in partial)):
+                    errors[data_key] = required
+                continue
+            if value is None:
+                if allow_none:
+                    result[attribute] = None
+                else:
+                    errors[data_key] = null
+                continue
+            try:
+                result[attribute] = load(value)
+            except ValidationError as err:
+                errors[data_key] = err.messages
+        
+        for attribute, data_key, hook in self.field_validators:
+            if attribute not in result:
+                continue
+            try:
+                if hook(holder, result[attribute]) is missing:
+                    result.pop(attribute, None)
+            except ValidationError as err:
+                errors[data_key] = err.messages
+        
+        for key in data.keys() - self.data_keys:
+            errors[key] = [self.unknown_message]
+        
+        if not errors:
+            for hook in self.post_load:
+                try:
+                    result = hook(holder, result, many=False, partial=partial)
+                except ValidationError as err:
+                    errors = err.normalized_messages()
+                    break
+        if errors:
+            raise ValidationError(errors, data=data, valid_data=result)
+        return result
+
+pricing_form_validator = CompiledSchema(PricingFormSchema)
+
+# Fields validated together because a rule reads more than one of them:
+# pre_load currency mapping, the end_date check against start_date, the
+# subscription plan rules and the demo / business analysis requirements
+FORM_FIELD_GROUPS = (
+    frozenset(('country', 'currency')),
+    frozenset(('start_date', 'end_date')),
+    frozenset(('subscription_plan', 'company_size', 'primary_contact_name')),
+    frozenset(('wants_demo', 'company_website', 'use_case_description', 'demo_scheduled_at')),
+    frozenset(('wants_business_analysis', 'problem_statement', 'visualization_goal'))
+)
+FORM_FIELDS = frozenset(pricing_form_validator.data_keys)
+
+def form_field_group(fields):
+    """The given fields plus every field that shares a validation rule with one of them"""
+    group = set(fields)
+    for rule_fields in FORM_FIELD_GROUPS:
+        if rule_fields & group:
+            group |= rule_fields
+    return group
+
+def _form_context(data):
+    context = {
+        'company_size': data.get('company_size'),
+        'has_sales_contact': data.get('primary_contact_name') is not None
+    }
+    if 'start_date' in data:
+        context['start_date'] = data['start_date']
+    return context
+
+def validate_partial_form_data(data, fields):
+    """
+    Validate some fields of a form, e.g. the ones a patch touched
+    
+    Args:
+        data (dict): values of form_field_group(fields); untouched fields
+            that are missing or None are not required
+        fields (set): the fields being changed; these must be valid on their own
+        
+    Returns:
+        tuple: (is_valid, errors or validated_data)
+    """
+    data = {
+        key: value for key, value in data.items()
+        if key in fields or value is not None
+    }
+    try:
+        result = pricing_form_validator.load(data, _form_context(data), partial=FORM_FIELDS - set(fields))
+        return True, result
+    except ValidationError as err:
+        return False, err.messages
+
+def validate_form_data(data, compiled=True):
     """
     Validate form data using the schema
     
     Args:
         data (dict): Form data to validate
+        compiled (bool): use the precompiled validator; False builds a
+            PricingFormSchema, with the same results
         
     Returns:
         tuple: (is_valid, errors or validated_data)
     """
     # Add context for cross-field validation
-    context = {
-        'company_size': data.get('company_size'),
-        'has_sales_contact': data.get('primary_contact_name') is not None
-    }
+    context = _form_context(data)
+    try:
+        if compiled:
+            result = pricing_form_validator.load(data, context)
+        else:
+            result = PricingFormSchema(context=context).load(data)
+        return True, result
+    except ValidationError as err:
+        return False, err.messages
+
+class QuoteInputSchema(Schema):
+    """
+    Schema for quote calculation inputs (/api/generate-quote payloads)
+    """
+    class Meta:
+        unknown = INCLUDE  # client_name, project_title, branding flags, ...
     
-    schema = PricingFormSchema(context=context)
+    num_dashboards = fields.Integer(validate=validate.Range(min=0))
+    num_widgets = fields.Integer(validate=validate.Range(min=0))
+    drilldowns_per_widget = fields.Integer(validate=validate.Range(min=0))
+    num_apis = fields.Integer(validate=validate.Range(min=0))
+    data_sources = fields.List(fields.Raw())
+    database_sources = fields.List(fields.Dict())
+    database_tables = fields.List(fields.Dict())
+    integrations = fields.List(fields.Dict())
+    features = fields.List(fields.Raw())
+    support_plan = fields.String()
+    support_hours = fields.Float(validate=validate.Range(min=0))
+    support_months = fields.Integer(validate=validate.Range(min=0))
+    bi_developer_level = fields.String(allow_none=True)
+    bi_dev_months = fields.Integer(validate=validate.Range(min=0))
+
+quote_input_schema = QuoteInputSchema()
+
+def validate_quote_input(data):
+    """
+    Validate quote calculation input
     
-    if 'start_date' in data:
-        context['start_date'] = data['start_date']
+    Args:
+        data (dict): Calculation input to validate
         
-    schema = PricingFormSchema(context=context)
+    Returns:
+        tuple: (is_valid, errors or validated_data)
+    """
+    if not isinstance(data, dict):
+        return False, {'_schema': ['Input must be a JSON object']}
     try:
-        result = schema.load(data)
-        
-        # Ensure JSON fields are properly formatted for storage
-        json_fields = ['expected_deliverables', 'target_audience', 'data_sources', 
-                      'required_integrations', 'interactivity_needed', 'user_access_levels', 
-                      'customization_needs', 'delivery_model', 'databases']
-        
-        for field in json_fields:
-            if field in result and result[field] is not None:
-                if not isinstance(result[field], str):
-                    result[field] = json.dumps(result[field])
-                    
-        return True, result
+        return True, quote_input_schema.load(data)
     except ValidationError as err:
-        return False, err.messages
\ No newline at end of file
+        return False, err.messages
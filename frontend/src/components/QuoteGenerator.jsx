@@ -45,6 +45,16 @@ const QuoteGenerator = ({ formData }) => {
     };
   };
 
+  // PDFs render in the background; poll the job until its URL is ready
+  const waitForPdf = async (pdfJob, apiBase) => {
+    let job = pdfJob;
+    for (let attempt = 0; job?.status === 'queued' && attempt < 60; attempt++) {
+      await new Promise(resolve => setTimeout(resolve, 1000));
+      job = (await axios.get(`${apiBase}${job.status_url}`)).data;
+    }
+    return job?.status === 'done' ? job.pdf_url : null;
+  };
+
   const handleCalculate = async () => {
     setLoading(true);
     setError(null);
@@ -59,7 +69,9 @@ const QuoteGenerator = ({ formData }) => {
           {},
           { headers: { 'Content-Type': 'application/json' } }
         );
-        setPdfUrl(`${import.meta.env.REACT_APP_API_URL || 'http://localhost:5000'}${response.data.pdf_url}`);
+        const apiBase = import.meta.env.REACT_APP_API_URL || 'http://localhost:5000';
+        const url = response.data.pdf_url || await waitForPdf(response.data.pdf_job, apiBase);
+        setPdfUrl(url ? `${apiBase}${url}` : null);
       } else {
         // Fall back to direct calculation endpoint
         const calculationData = transformFormDataForCalculation(formData);
@@ -67,7 +79,9 @@ const QuoteGenerator = ({ formData }) => {
           `${import.meta.env.REACT_APP_API_URL || 'http://localhost:5000'}/api/generate-quote`,
           calculationData
         );
-        setPdfUrl(response.data.pdf_url);
+        const apiBase = import.meta.env.REACT_APP_API_URL || 'http://localhost:5000';
+        const url = response.data.pdf_url || await waitForPdf(response.data.pdf_job, apiBase);
+        setPdfUrl(url ? `${apiBase}${url}` : null);
       }
       
       setBreakdown(response.data);